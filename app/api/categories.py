@@ -1,13 +1,13 @@
 from fastapi import APIRouter, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.core.db import get_async_session
+from app.core.db import get_async_session, get_read_session
 from app.db.schemas.category import CategoryRead, CategoryCreate, CategoryShort
 from app.services import cateroties as service
 
 router = APIRouter()
 
 @router.get("/", response_model=list[CategoryShort])
-async def list_categories(session: AsyncSession = Depends(get_async_session)):
+async def list_categories(session: AsyncSession = Depends(get_read_session)):
     return await service.get_all(session)
 
 @router.post("/", response_model=CategoryRead)
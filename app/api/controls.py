@@ -4,13 +4,24 @@ from app.core.redis import get_redis_client
 from app.services import controls as service
 
 router = APIRouter()
+COLLECT_MESSAGES = {
+    "started": "Price collection started",
+    "running": "Task already running",
+    "requested": "Price collection requested from the leader",
+    "queued": "No ingestion worker is running, request queued",
+}
+
+
 @router.get("/collect-prices")
 async def collect_prices():
-    started = service.start_collect_prices()
-    if started:
-        return {"message": "Price collection started"}
-    else:
-        return {"message": "Task already running"}
+    result, status = await service.request_collect_prices()
+    return {"message": COLLECT_MESSAGES[result], "status": status}
+
+
+@router.get("/status")
+async def ingestion_status():
+    return await service.get_status()
+
 
 @router.get("/ping-redis")
 async def ping():
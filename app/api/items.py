@@ -1,9 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException, Path, Query, Header
+from fastapi import APIRouter, Depends, HTTPException, Path, Query, Header, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List
+from typing import List, Literal
 
-from app.core.db import get_async_session
-from app.db.schemas.item import ItemCreate, ItemOut, ItemUpdate, ItemActivity, ItemSearchOut
+from app.core.db import get_async_session, get_read_session
+from app.db.schemas.item import ItemCreate, ItemOut, ItemUpdate, ItemActivity, ItemSearchOut, ItemSuggestion
 from app.services import items as service
 from app.config import get_x_secret_key
 
@@ -24,32 +24,52 @@ async def add_item(
 
 @router.get("/", response_model=List[ItemOut])
 async def list_items(
-        db: AsyncSession = Depends(get_async_session),
-        page: int = Query(1, ge=1, description="Page number for pagination"),
+        response: Response,
+        db: AsyncSession = Depends(get_read_session),
+        cursor: str = Query(None, description="Cursor from X-Next-Cursor of the previous page"),
         page_size: int = Query(20, ge=1, le=100, description="Number of items per page")
 ):
-    return await service.get_items(db, page=page, page_size=page_size)
+    try:
+        items, next_cursor = await service.get_items(db, page_size=page_size, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return items
 
 
 @router.get("/search", response_model=ItemSearchOut)
 async def search_items(
         query: str = Query(..., min_length=1),
-        db: AsyncSession = Depends(get_async_session),
-        page: int = Query(1, ge=1, description="Page number for pagination"),
+        db: AsyncSession = Depends(get_read_session),
+        cursor: str = Query(None, description="NextCursor of the previous page"),
         page_size: int = Query(20, ge=1, le=100, description="Number of items per page")
 ):
-    items = await service.search_items(db, query, page=page, page_size=page_size)
+    try:
+        items = await service.search_items(db, query, page_size=page_size, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     if not items:
         raise HTTPException(status_code=404, detail="No items found")
     return items
 
 
+@router.get("/autocomplete", response_model=List[ItemSuggestion])
+async def autocomplete_items(
+        query: str = Query(..., min_length=1),
+        limit: int = Query(10, ge=1, le=20, description="Number of suggestions"),
+        db: AsyncSession = Depends(get_read_session)
+):
+    return await service.autocomplete(db, query, limit=limit)
+
+
 @router.get("/volatility", response_model=List[ItemActivity])
 async def get_top_active_items(
-        db: AsyncSession = Depends(get_async_session),
-        category_id: int = Query(None, ge=1, description="Filter by category ID")
+        db: AsyncSession = Depends(get_read_session),
+        category_id: int = Query(None, ge=1, description="Filter by category ID"),
+        window: Literal["24h", "7d", "30d"] = Query("7d", description="Activity window")
 ):
-    volatility = await service.get_top_active_items(db=db, category_id=category_id)
+    volatility = await service.get_top_active_items(db=db, category_id=category_id, window=window)
     if not volatility:
         raise HTTPException(status_code=404, detail="Items not found")
     return volatility
@@ -58,7 +78,7 @@ async def get_top_active_items(
 @router.get("/{item_id}", response_model=ItemOut)
 async def get_item_by_id(
         item_id: int = Path(..., gt=0),
-        db: AsyncSession = Depends(get_async_session)
+        db: AsyncSession = Depends(get_read_session)
 ):
     item = await service.get_item(db=db, item_id=item_id)
     if not item:
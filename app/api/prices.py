@@ -1,18 +1,48 @@
+from datetime import datetime
+
 from fastapi import APIRouter, Depends, Query, Path, HTTPException
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional, Literal
 
-from app.core.db import get_async_session
-from app.db.schemas.price import PriceHistory
+from app.core.db import get_read_session
+from app.db.schemas.price import PriceHistory, PriceCandle, CoinRatePoint
+from app.db.types import encode_enchant_level
 from app.services import prices as service
 
 
 router = APIRouter()
 
 
+def enchant_level_param(enchant_level: Optional[str] = Query(None, description='"7", "3-5" or "Сет"')):
+    return _checked_enchant_level(enchant_level)
+
+
+def _checked_enchant_level(value: Optional[str]) -> Optional[str]:
+    if value is not None:
+        try:
+            encode_enchant_level(value)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    return value
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def _trades_response(fmt: str, filename: str, **filters) -> StreamingResponse:
+    return StreamingResponse(
+        service.export_trades(fmt, **filters),
+        media_type=EXPORT_MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{fmt}"'},
+    )
+
+
 @router.get("/coin", response_model=PriceHistory)
 async def get_coin_price(
-    db: AsyncSession = Depends(get_async_session),
+    db: AsyncSession = Depends(get_read_session),
     aggregate: str = Query("avg", description="Aggregation method for coin price. avg/min")
 ):
     coin_price = await service.get_coin_price_on_day(db=db, aggregate=aggregate)
@@ -21,14 +51,74 @@ async def get_coin_price(
 
     return coin_price
 
+@router.get("/coin/history", response_model=List[CoinRatePoint])
+async def get_coin_history(
+    resolution: Literal["hour", "day"] = Query("day", description="Bucket size"),
+    period: int = Query(30, ge=1, le=365, description="Period in days"),
+    db: AsyncSession = Depends(get_read_session)
+):
+    return await service.get_coin_history(db=db, resolution=resolution, period=period)
+
+
+@router.get("/trades")
+async def export_all_trades(
+    start: Optional[datetime] = Query(None, description="Lower timestamp bound (inclusive)"),
+    end: Optional[datetime] = Query(None, description="Upper timestamp bound (inclusive)"),
+    currency: Optional[Literal["adena", "coin"]] = Query(None),
+    source: Optional[Literal["auction_house", "world_trade", "private_store", "private_trade"]] = Query(None),
+    enchant_level: Optional[str] = Depends(enchant_level_param),
+    format: Literal["ndjson", "csv"] = Query("ndjson", description="Export format"),
+):
+    return _trades_response(
+        format, "trades",
+        start=start, end=end, currency=currency, source=source, enchant_level=enchant_level
+    )
+
+
+@router.get("/{item_id}/trades")
+async def export_item_trades(
+    item_id: int = Path(..., gt=0),
+    start: Optional[datetime] = Query(None, description="Lower timestamp bound (inclusive)"),
+    end: Optional[datetime] = Query(None, description="Upper timestamp bound (inclusive)"),
+    currency: Optional[Literal["adena", "coin"]] = Query(None),
+    source: Optional[Literal["auction_house", "world_trade", "private_store", "private_trade"]] = Query(None),
+    enchant_level: Optional[str] = Depends(enchant_level_param),
+    format: Literal["ndjson", "csv"] = Query("ndjson", description="Export format"),
+):
+    return _trades_response(
+        format, f"trades_{item_id}",
+        item_id=item_id, start=start, end=end, currency=currency, source=source, enchant_level=enchant_level
+    )
+
+
+@router.get("/{item_id}/candles", response_model=List[PriceCandle])
+async def get_item_candles(
+    item_id: int = Path(..., gt=0),
+    interval: Literal["1h", "4h", "1d", "1w"] = Query("1d", description="Candle resolution"),
+    period: int = Query(30, ge=1, le=365, description="Period in days"),
+    currency: Optional[Literal["adena", "coin"]] = Query(None),
+    db: AsyncSession = Depends(get_read_session)
+):
+    candles = await service.get_item_candles(
+        db=db, item_id=item_id, interval=interval, period=period, currency=currency
+    )
+    if not candles:
+        raise HTTPException(status_code=404, detail="Item not found")
+    return candles
+
+
 @router.get("/{item_id}", response_model=List[PriceHistory])
 async def get_item_price_history(
     item_id: int = Path(..., gt=0),
     period: int | Literal["all"] = Query(default=30, description="Price history period in days"),
     modification: str = Query(None, description="Modification to include in price history"),
-    db: AsyncSession = Depends(get_async_session)
+    max_points: Optional[int] = Query(None, ge=10, le=2000, description="Downsample to at most this many points"),
+    db: AsyncSession = Depends(get_read_session)
 ):
-    prices = await service.get_item_price_history(db=db, item_id=item_id, period=period, modification=modification)
+    prices = await service.get_item_price_history(
+        db=db, item_id=item_id, period=period, modification=_checked_enchant_level(modification),
+        max_points=max_points
+    )
     if not prices:
         raise HTTPException(status_code=404, detail="Item not found")
 
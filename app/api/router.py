@@ -1,5 +1,5 @@
 from fastapi import APIRouter, Depends
-from app.api import items, prices, categories, controls, auth
+from app.api import items, prices, categories, controls, auth, metrics
 from app.utils.auth import auth_or_403
 
 api_router = APIRouter()
@@ -28,3 +28,5 @@ api_router.include_router(
     dependencies=[Depends(auth_or_403)]
 )
 api_router.include_router(auth.router, prefix="/auth", tags=["Auth"])
+# Без авторизации: доступ к /metrics ограничивается на уровне сети
+api_router.include_router(metrics.router)
@@ -3,6 +3,7 @@ from datetime import timedelta
 from dotenv import load_dotenv
 import os
 from functools import lru_cache
+from typing import Optional
 from authx import AuthX, AuthXConfig
 
 load_dotenv()
@@ -55,6 +56,15 @@ def get_session_key() -> str:
     return os.getenv("SESSION_KEY")
 
 
+def get_archive_dir() -> str:
+    return os.getenv("ARCHIVE_DIR", "archive")
+
+
+def get_archive_retention_months() -> int:
+    # 0 — архивирование выключено
+    return int(os.getenv("ARCHIVE_RETENTION_MONTHS", 0))
+
+
 def get_database_url() -> str:
     POSTGRES_USER = os.getenv("POSTGRES_USER")
     POSTGRES_PASSWORD = os.getenv("POSTGRES_PASSWORD")
@@ -68,6 +78,37 @@ def get_database_url() -> str:
     return f"postgresql+asyncpg://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
 
 
+def get_database_read_url() -> Optional[str]:
+    # Реплика для тяжёлых чтений; без неё все запросы идут в основную БД
+    return os.getenv("DATABASE_READ_URL") or None
+
+
+def get_db_read_max_lag() -> float:
+    return float(os.getenv("DB_READ_MAX_LAG", 30))
+
+
+def get_slow_request_ms() -> float:
+    # Запросы дольше порога пишутся в лог вместе с SQL
+    return float(os.getenv("SLOW_REQUEST_MS", 1000))
+
+
+def get_request_query_budget() -> Optional[int]:
+    # Больше SQL-запросов на один HTTP-запрос — предупреждение в лог (N+1); 0 выключает
+    default = "0" if is_production() else "20"
+    return int(os.getenv("REQUEST_QUERY_BUDGET", default)) or None
+
+
+def get_classification_lookback_days() -> int:
+    # Окно поиска истории для классификации заточки: отсекает старые месячные партиции.
+    # Заточки без сделок в окне ищутся по всей истории; 0 — сразу по всей истории
+    return int(os.getenv("CLASSIFICATION_LOOKBACK_DAYS", 180))
+
+
+def is_query_budget_strict() -> bool:
+    # Для CI и тестов: превышение бюджета count_queries — исключение, а не предупреждение
+    return bool(int(os.getenv("QUERY_BUDGET_STRICT", "0")))
+
+
 origins_map = {
     "production": [
         "https://hellsmenser.github.io"
@@ -1,20 +1,107 @@
+import asyncio
 import os
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+import time
+from typing import Callable, Optional
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession, AsyncEngine
 import logging
 
-from app.config import get_database_url
+from app.config import get_database_url, get_database_read_url, get_db_read_max_lag
+from app.core import metrics, timing
 
-DATABASE_URL = get_database_url()
-logging.info("PostgreSQL backend")
+# Движки создаются при первом обращении: импорт модуля не требует POSTGRES_* и не тянет драйвер
+_engines: dict[str, Optional[AsyncEngine]] = {}
 
-engine = create_async_engine(
-    DATABASE_URL,
-    echo=bool(int(os.getenv("SQLALCHEMY_ECHO", "0"))),
-    pool_pre_ping=True,
-    pool_size=int(os.getenv("DB_POOL_SIZE", "5")),
-    max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "10")),
+
+def _create_engine(url: str, name: str):
+    engine = create_async_engine(
+        url,
+        echo=bool(int(os.getenv("SQLALCHEMY_ECHO", "0"))),
+        pool_pre_ping=True,
+        pool_size=int(os.getenv("DB_POOL_SIZE", "5")),
+        max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "10")),
+        # date_trunc в rollup и запросах режет дни и часы по зоне сессии: везде UTC,
+        # как у coin_rate и лидерборда, независимо от настроек сервера
+        connect_args={"server_settings": {"timezone": "UTC"}},
+    )
+    timing.instrument_engine(engine)
+    metrics.instrument_pool(engine, name)
+    return engine
+
+
+def get_engine() -> AsyncEngine:
+    if "primary" not in _engines:
+        _engines["primary"] = _create_engine(get_database_url(), "primary")
+        logging.info("PostgreSQL backend")
+    return _engines["primary"]
+
+
+def get_read_engine() -> Optional[AsyncEngine]:
+    if "read" not in _engines:
+        url = get_database_read_url()
+        _engines["read"] = _create_engine(url, "read") if url else None
+    return _engines["read"]
+
+
+class LazySessionmaker:
+    """async_sessionmaker, который строится при первом вызове."""
+
+    def __init__(self, engine_factory: Callable[[], Optional[AsyncEngine]]):
+        self._engine_factory = engine_factory
+        self._maker: Optional[async_sessionmaker] = None
+
+    def __call__(self, **kwargs) -> AsyncSession:
+        if self._maker is None:
+            self._maker = async_sessionmaker(self._engine_factory(), expire_on_commit=False)
+        return self._maker(**kwargs)
+
+
+AsyncSessionLocal = LazySessionmaker(get_engine)
+AsyncReadSessionLocal = LazySessionmaker(get_read_engine)
+
+# Результат проверки реплики кешируется, чтобы не платить лишний запрос на каждый хит
+REPLICA_CHECK_INTERVAL = 5.0
+REPLICA_CHECK_TIMEOUT = 2.0
+_replica_state = {"checked_at": float("-inf"), "ok": False}
+
+# Реплика догнала primary, если всё полученное WAL уже применено; иначе — возраст последней транзакции
+REPLICA_LAG_SQL = text(
+    """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE coalesce(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 'Infinity')
+    END
+    """
 )
-AsyncSessionLocal = async_sessionmaker(engine, expire_on_commit=False)
+
+
+async def get_replica_lag() -> float:
+    async with get_read_engine().connect() as conn:
+        return float((await conn.execute(REPLICA_LAG_SQL)).scalar_one())
+
+
+async def replica_available() -> bool:
+    if get_read_engine() is None:
+        return False
+    now = time.monotonic()
+    if now - _replica_state["checked_at"] < REPLICA_CHECK_INTERVAL:
+        return _replica_state["ok"]
+    _replica_state["checked_at"] = now
+    try:
+        lag = await asyncio.wait_for(get_replica_lag(), REPLICA_CHECK_TIMEOUT)
+        ok = lag <= get_db_read_max_lag()
+        if not ok:
+            logging.warning(f"Read replica lag {lag:.1f}s, routing reads to primary")
+    except Exception as e:
+        logging.warning(f"Read replica unavailable, routing reads to primary: {e}")
+        ok = False
+    _replica_state["ok"] = ok
+    return ok
+
+
+async def get_read_sessionmaker() -> LazySessionmaker:
+    return AsyncReadSessionLocal if await replica_available() else AsyncSessionLocal
 
 
 async def get_async_session() -> AsyncSession:
@@ -22,5 +109,11 @@ async def get_async_session() -> AsyncSession:
         yield session
 
 
+async def get_read_session() -> AsyncSession:
+    """Сессия для read-only роутов: реплика, если она есть и отстаёт не больше DB_READ_MAX_LAG."""
+    async with (await get_read_sessionmaker())() as session:
+        yield session
+
+
 async def init_db():
     logging.info("Init skipped (use Alembic)")
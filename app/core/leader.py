@@ -0,0 +1,122 @@
+import asyncio
+import functools
+import os
+import socket
+import uuid
+from typing import Awaitable, Callable, Optional
+
+from redis import RedisError
+
+from app.core.redis import get_redis_client
+from app.core import logger
+
+logger = logger.get_logger(__name__)
+
+LEASE_KEY = "ingest:leader"
+LEASE_TTL = 30
+# Продление заметно чаще TTL: пара пропущенных тиков не роняет лидерство
+RENEW_INTERVAL = 10
+INSTANCE_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+# Продлить/отпустить можно только свою аренду
+_RENEW_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+_RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+class LeaseLost(Exception):
+    """Аренду забрал другой процесс: запись от имени лидера прерывается."""
+
+
+class LeaderLease:
+    def __init__(self, key: str = LEASE_KEY, ttl: int = LEASE_TTL):
+        self.key = key
+        self.ttl = ttl
+        self.is_leader = False
+
+    async def acquire(self) -> bool:
+        redis = await get_redis_client()
+        self.is_leader = bool(await redis.set(self.key, INSTANCE_ID, nx=True, px=self.ttl * 1000))
+        return self.is_leader
+
+    async def renew(self) -> bool:
+        redis = await get_redis_client()
+        self.is_leader = bool(await redis.eval(_RENEW_SCRIPT, 1, self.key, INSTANCE_ID, self.ttl * 1000))
+        return self.is_leader
+
+    async def confirm(self) -> None:
+        """Продление перед записью: долгий flush мог занять цикл дольше TTL, и аренду уже забрали."""
+        if not await self.renew():
+            raise LeaseLost(f"Ingestion lease lost by {INSTANCE_ID}")
+
+    async def release(self) -> None:
+        was_leader, self.is_leader = self.is_leader, False
+        if was_leader:
+            redis = await get_redis_client()
+            await redis.eval(_RELEASE_SCRIPT, 1, self.key, INSTANCE_ID)
+
+    async def holder(self) -> Optional[str]:
+        redis = await get_redis_client()
+        return await redis.get(self.key)
+
+
+lease = LeaderLease()
+
+
+def leader_only(func: Callable[..., Awaitable]):
+    """Задача планировщика выполняется только в процессе-лидере."""
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        if not lease.is_leader:
+            return None
+        return await func(*args, **kwargs)
+
+    return wrapper
+
+
+async def run_election(
+        on_demoted: Callable[[], Awaitable] = None,
+        on_tick: Callable[[float], Awaitable] = None,
+        on_elected: Callable[[], Awaitable] = None,
+) -> None:
+    """Бесконечный цикл выборов: захват аренды, продление, on_tick лидера вместо сна."""
+    while True:
+        try:
+            if lease.is_leader:
+                if not await lease.renew():
+                    logger.warning(f"Ingestion lease lost by {INSTANCE_ID}")
+                    if on_demoted:
+                        await on_demoted()
+            elif await lease.acquire():
+                logger.info(f"Ingestion leader elected: {INSTANCE_ID}")
+                if on_elected:
+                    await on_elected()
+        except asyncio.CancelledError:
+            raise
+        except RedisError as e:
+            # Без Redis аренду не подтвердить: уступаем раньше, чем её заберёт другой процесс
+            logger.warning(f"Leader election error: {e}")
+            if lease.is_leader:
+                lease.is_leader = False
+                if on_demoted:
+                    await on_demoted()
+
+        if lease.is_leader and on_tick:
+            try:
+                await on_tick(RENEW_INTERVAL)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Leader tick error: {e}")
+                await asyncio.sleep(RENEW_INTERVAL)
+        else:
+            await asyncio.sleep(RENEW_INTERVAL)
@@ -1,10 +1,16 @@
+import atexit
 import logging
-from logging.handlers import RotatingFileHandler
+import queue
+from collections import Counter
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
 import os
 from datetime import datetime
 
 LOGS_DIR = "logs"
 _CONFIGURED = False
+_listener: QueueListener | None = None
+# Файловые и консольный обработчики текущей настройки: после stop_logging пишут напрямую
+_handlers: list[logging.Handler] = []
 
 def get_logger(name: str | None = None):
     return logging.getLogger(name)
@@ -43,13 +49,75 @@ def setup_logging():
     console_handler.setLevel(logging.INFO)
     console_handler.setFormatter(formatter)
 
+    # Запись в файлы и консоль — в фоновом потоке: вызов логгера в event loop только кладёт запись в очередь
+    global _listener
+    log_queue = queue.SimpleQueue()
+    _listener = QueueListener(log_queue, console_handler, info_handler, error_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+
     root = logging.getLogger()
     prev = len(root.handlers)
     root.handlers.clear()
+    # Повторная настройка после stop_logging: файлы прошлой настройки больше не нужны
+    for handler in _handlers:
+        handler.close()
+    _handlers[:] = [console_handler, info_handler, error_handler]
     root.setLevel(logging.INFO)
-    for h in (console_handler, info_handler, error_handler):
-        root.addHandler(h)
+    root.addHandler(QueueHandler(log_queue))
 
     logging.getLogger("sqlalchemy.engine").setLevel(logging.WARNING)
     root.info("✓ Логгирование настроено (prev_handlers=%s)", prev)
     _CONFIGURED = True
+
+
+def stop_logging():
+    """Дописывает очередь логов, останавливает фоновый поток и возвращает обработчики на root.
+
+    Записи после остановки (завершение uvicorn, atexit) пишутся напрямую, а не в очередь
+    без читателя; следующий setup_logging настраивает логирование заново.
+    """
+    global _listener, _CONFIGURED
+    if _listener is None:
+        return
+    _listener.stop()
+    _listener = None
+    atexit.unregister(stop_logging)
+    root = logging.getLogger()
+    for handler in [h for h in root.handlers if isinstance(h, QueueHandler)]:
+        root.removeHandler(handler)
+    for handler in _handlers:
+        root.addHandler(handler)
+    _CONFIGURED = False
+
+
+class WarningSummary:
+    """Сводка повторяющихся предупреждений: первые sample_limit случаев каждого вида пишутся
+    целиком, остальные только считаются; flush() выводит одну строку на пачку.
+    """
+
+    def __init__(self, logger: logging.Logger, title: str, sample_limit: int = 3):
+        self.logger = logger
+        self.title = title
+        self.sample_limit = sample_limit
+        self.counts: Counter = Counter()
+        self.details: dict[str, Counter] = {}
+        self._logged: Counter = Counter()
+
+    def add(self, kind: str, detail: str) -> None:
+        self.counts[kind] += 1
+        self.details.setdefault(kind, Counter())[detail] += 1
+        if self._logged[kind] < self.sample_limit:
+            self._logged[kind] += 1
+            self.logger.warning(f"❌ {kind}: {detail}")
+
+    def flush(self) -> None:
+        if not self.counts:
+            return
+        parts = []
+        for kind, count in self.counts.most_common():
+            top = ", ".join(f"{d[:80]!r} x{n}" for d, n in self.details[kind].most_common(5))
+            parts.append(f"{kind}: {count} ({top})")
+        self.logger.warning(f"{self.title}: " + "; ".join(parts))
+        self.counts.clear()
+        self.details.clear()
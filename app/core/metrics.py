@@ -0,0 +1,85 @@
+"""Prometheus-метрики API, кеша, пула БД и сбора цен.
+
+При нескольких воркерах uvicorn задайте PROMETHEUS_MULTIPROC_DIR (пустой каталог, очищается
+перед стартом): значения пишутся в mmap-файлы, /metrics любого воркера отдаёт сумму по всем
+процессам. Воркер сбора с тем же каталогом на том же хосте попадает туда же; иначе он
+поднимает свой /metrics на WORKER_METRICS_PORT.
+"""
+import os
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest,
+)
+
+MULTIPROC_DIR_ENV = "PROMETHEUS_MULTIPROC_DIR"
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "HTTP request latency", ["method", "route", "status"],
+)
+
+CACHE_REQUESTS = Counter("cache_requests_total", "redis_cache lookups", ["function", "result"])
+CACHE_SECONDS = Histogram(
+    "cache_lookup_duration_seconds", "redis_cache lookup latency", ["function"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0),
+)
+
+# Пул у каждого процесса свой: в multiprocess-режиме суммируем живые процессы
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out", "Connections checked out of the pool", ["engine"], multiprocess_mode="livesum",
+)
+DB_POOL_OVERFLOW = Gauge(
+    "db_pool_overflow", "Connections opened above pool_size", ["engine"], multiprocess_mode="livesum",
+)
+
+INGEST_MESSAGES_FETCHED = Counter("ingest_messages_fetched_total", "Messages fetched from the bot chat")
+INGEST_MESSAGES_PARSED = Counter("ingest_messages_parsed_total", "Messages parsed into a trade")
+INGEST_PARSE_FAILURES = Counter("ingest_parse_failures_total", "Messages the parser could not read")
+INGEST_UNKNOWN_ITEMS = Counter("ingest_unknown_items_total", "Parsed messages for items missing from the catalog")
+INGEST_UNKNOWN_CURRENCY = Counter("ingest_unknown_currency_total", "Parsed messages with an unknown currency")
+INGEST_CLASSIFIED = Counter("ingest_classified_total", "Classification results", ["outcome"])
+INGEST_ROWS_INSERTED = Counter("ingest_rows_inserted_total", "price_history rows inserted")
+INGEST_STAGE_SECONDS = Counter("ingest_stage_seconds_total", "Time spent per ingestion stage", ["stage"])
+
+
+def instrument_pool(engine, name: str) -> None:
+    """Держит gauges пула в актуальном состоянии на checkout/checkin — без опроса при скрейпе."""
+    from sqlalchemy import event
+
+    sync_engine = getattr(engine, "sync_engine", engine)
+    pool = sync_engine.pool
+    if not hasattr(pool, "overflow"):
+        return
+    checked_out = DB_POOL_CHECKED_OUT.labels(name)
+    overflow = DB_POOL_OVERFLOW.labels(name)
+
+    def on_checkout(*_):
+        checked_out.set(pool.checkedout())
+        overflow.set(max(pool.overflow(), 0))
+
+    def on_checkin(*_):
+        # Событие приходит до возврата соединения в пул: оно ещё числится занятым,
+        # а при полной очереди пул его закроет и overflow уменьшится на единицу
+        closing = pool.checkedin() >= pool.size()
+        checked_out.set(max(pool.checkedout() - 1, 0))
+        overflow.set(max(pool.overflow() - closing, 0))
+
+    event.listen(sync_engine, "checkout", on_checkout)
+    event.listen(sync_engine, "checkin", on_checkin)
+
+
+def render() -> tuple[bytes, str]:
+    if os.getenv(MULTIPROC_DIR_ENV):
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def start_worker_server() -> None:
+    port = os.getenv("WORKER_METRICS_PORT")
+    if port and not os.getenv(MULTIPROC_DIR_ENV):
+        from prometheus_client import start_http_server
+        start_http_server(int(port))
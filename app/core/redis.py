@@ -6,6 +6,7 @@ import functools
 import json
 from typing import Callable
 
+from app.core import metrics, timing
 from app.utils import tools
 
 _redis_client: Redis | None = None
@@ -36,6 +37,11 @@ async def get_redis_client() -> Redis:
 
 def redis_cache(ttl: int = 7200, model=None, is_list=False, exclude_keys=("db", "session"), prefix = "cache"):
     def decorator(func: Callable):
+        hits = metrics.CACHE_REQUESTS.labels(func.__name__, "hit")
+        misses = metrics.CACHE_REQUESTS.labels(func.__name__, "miss")
+        errors = metrics.CACHE_REQUESTS.labels(func.__name__, "error")
+        lookup_seconds = metrics.CACHE_SECONDS.labels(func.__name__)
+
         @functools.wraps(func)
         async def wrapper(*args, **kwargs):
             filtered_kwargs = {k: v for k, v in kwargs.items() if k not in exclude_keys}
@@ -44,34 +50,39 @@ def redis_cache(ttl: int = 7200, model=None, is_list=False, exclude_keys=("db",
             key = f"{prefix}:{func.__name__}:{md5}"
 
             try:
-                client = await get_redis_client()
-                cached = await client.get(key)
-                if cached is not None:
-                    data = json.loads(cached)
-                    if model:
-                        if data is None:
-                            return [] if is_list else None
-                        if isinstance(data, list):
-                            return [model.model_validate(item) for item in data]
-                        return model.model_validate(data)
-                    return data
+                with timing.phase("cache"), lookup_seconds.time():
+                    client = await get_redis_client()
+                    cached = await client.get(key)
+                    if cached is None:
+                        misses.inc()
+                    else:
+                        hits.inc()
+                        data = json.loads(cached)
+                        if model:
+                            if data is None:
+                                return [] if is_list else None
+                            if isinstance(data, list):
+                                return [model.model_validate(item) for item in data]
+                            return model.model_validate(data)
+                        return data
             except RedisError:
-                pass
+                errors.inc()
 
             result = await func(*args, **kwargs)
 
             try:
-                if model:
-                    if result is None:
-                        return [] if is_list else None
-                    if isinstance(result, list):
-                        serializable = [item.model_dump() if hasattr(item, 'model_dump') else item for item in result]
+                with timing.phase("cache"):
+                    if model:
+                        if result is None:
+                            return [] if is_list else None
+                        if isinstance(result, list):
+                            serializable = [item.model_dump() if hasattr(item, 'model_dump') else item for item in result]
+                        else:
+                            serializable = result.model_dump() if hasattr(result, 'model_dump') else result
                     else:
-                        serializable = result.model_dump() if hasattr(result, 'model_dump') else result
-                else:
-                    serializable = result
-                client = await get_redis_client()
-                await client.set(key, json.dumps(serializable, default=str), ex=ttl)
+                        serializable = result
+                    client = await get_redis_client()
+                    await client.set(key, json.dumps(serializable, default=str), ex=ttl)
             except RedisError:
                 pass
 
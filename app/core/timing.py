@@ -0,0 +1,190 @@
+"""Поэтапные тайминги запроса: Server-Timing и лог медленных запросов; счётчик SQL-запросов.
+
+Этапы пишутся в объект текущего запроса через contextvar, поэтому вне HTTP-запроса
+(воркер, скрипты) инструментирование ничего не делает. Этапы могут пересекаться:
+запросы к БД внутри auth попадают и в auth, и в db.
+
+count_queries считает запросы в любом участке кода (в том числе в воркере) и проверяет
+бюджет: так N+1 видно в логах разработки, а с QUERY_BUDGET_STRICT=1 он роняет прогон
+(python -m benchmarks.query_budgets). То же для бюджета на HTTP-запрос в TimingMiddleware.
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+
+from app.config import get_slow_request_ms, get_request_query_budget, is_query_budget_strict, is_production
+from app.core import logger, metrics
+
+logger = logger.get_logger(__name__)
+
+MAX_LOGGED_QUERIES = 50
+MAX_STATEMENT_LENGTH = 500
+
+
+class RequestTimings:
+    def __init__(self):
+        self.started = time.perf_counter()
+        # этап -> [секунды, число вызовов]
+        self.phases: dict[str, list] = {}
+        self.queries: list[tuple[str, float]] = []
+
+    def add(self, name: str, seconds: float) -> None:
+        entry = self.phases.setdefault(name, [0.0, 0])
+        entry[0] += seconds
+        entry[1] += 1
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def server_timing(self) -> str:
+        total = self.elapsed()
+        parts = [f'{name};dur={seconds * 1000:.1f};desc="{count}"' for name, (seconds, count) in self.phases.items()]
+        parts.append(f"total;dur={total * 1000:.1f}")
+        return ", ".join(parts)
+
+
+class QueryCounter:
+    def __init__(self, label: str = ""):
+        self.label = label
+        self.count = 0
+        self.seconds = 0.0
+        self.statements: list[tuple[str, float]] = []
+
+    def add(self, statement: str, seconds: float) -> None:
+        self.count += 1
+        self.seconds += seconds
+        if len(self.statements) < MAX_LOGGED_QUERIES:
+            self.statements.append((statement[:MAX_STATEMENT_LENGTH], seconds))
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+_current: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+_counters: ContextVar[tuple[QueryCounter, ...]] = ContextVar("query_counters", default=())
+
+
+@contextmanager
+def phase(name: str):
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - t0)
+
+
+@contextmanager
+def count_queries(label: str = "", budget: Optional[int] = None):
+    """Считает SQL-запросы и их время внутри блока; вложенные счётчики видят те же запросы.
+
+        with count_queries("ingest flush", budget=10) as queries:
+            ...
+        queries.count, queries.seconds
+    """
+    counter = QueryCounter(label)
+    token = _counters.set(_counters.get() + (counter,))
+    try:
+        yield counter
+    finally:
+        _counters.reset(token)
+    if budget is not None and counter.count > budget and not is_production():
+        _over_budget(f"{label or 'block'}: {counter.count} queries, budget {budget}", counter.statements,
+                     strict=is_query_budget_strict())
+
+
+def _over_budget(message: str, statements: list[tuple[str, float]], strict: bool = False) -> None:
+    lines = [f"Query budget exceeded, {message}"]
+    for statement, seconds in statements:
+        lines.append(f"  {seconds * 1000:8.1f}ms  {' '.join(statement.split())}")
+    if strict:
+        raise QueryBudgetExceeded("\n".join(lines))
+    logger.warning("\n".join(lines))
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None or _counters.get():
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    timings = _current.get()
+    counters = _counters.get()
+    started = conn.info.get("query_started")
+    if (timings is None and not counters) or not started:
+        return
+    seconds = time.perf_counter() - started.pop()
+    for counter in counters:
+        counter.add(statement, seconds)
+    if timings is not None:
+        timings.add("db", seconds)
+        if len(timings.queries) < MAX_LOGGED_QUERIES:
+            timings.queries.append((statement[:MAX_STATEMENT_LENGTH], seconds))
+
+
+def instrument_engine(engine) -> None:
+    """Время SQL-запросов движка идёт в этап db текущего запроса."""
+    sync_engine = getattr(engine, "sync_engine", engine)
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class TimingMiddleware:
+    """ASGI middleware: Server-Timing в ответе, медленные запросы в лог вместе с их SQL."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        token = _current.set(timings)
+        status = None
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", timings.server_timing().encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            elapsed = timings.elapsed()
+            route = scope.get("route")
+            metrics.HTTP_REQUEST_SECONDS.labels(
+                scope["method"], getattr(route, "path", "unmatched"), str(status or 500),
+            ).observe(elapsed)
+            if elapsed * 1000 >= get_slow_request_ms():
+                _log_slow(scope, status, elapsed, timings)
+        # Ответ уже отправлен: в strict-режиме исключение видит вызывающий (прогон бюджетов, тесты)
+        budget = get_request_query_budget()
+        queries = timings.phases.get("db", (0.0, 0))[1]
+        if budget and queries > budget:
+            _over_budget(f"{scope['method']} {getattr(scope.get('route'), 'path', scope.get('path'))}: "
+                         f"{queries} queries, budget {budget}", timings.queries, strict=is_query_budget_strict())
+
+
+def _log_slow(scope, status, elapsed: float, timings: RequestTimings) -> None:
+    path = scope.get("path", "")
+    if scope.get("query_string"):
+        path = f"{path}?{scope['query_string'].decode('latin-1')}"
+    phases = ", ".join(f"{name}={seconds * 1000:.1f}ms/{count}" for name, (seconds, count) in timings.phases.items())
+    lines = [f"Slow request {scope.get('method')} {path} -> {status}: {elapsed * 1000:.1f}ms ({phases})"]
+    for statement, seconds in timings.queries:
+        lines.append(f"  {seconds * 1000:8.1f}ms  {' '.join(statement.split())}")
+    logger.warning("\n".join(lines))
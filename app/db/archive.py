@@ -0,0 +1,170 @@
+import os
+import re
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, timezone
+from typing import Iterator, Optional
+
+from app.config import get_archive_dir
+
+# Колонки в порядке TRADE_FIELDS экспорта
+ARCHIVE_COLUMNS = ("id", "item_id", "price", "currency", "enchant_level", "source", "timestamp")
+ROW_GROUP_SIZE = 65_536
+_FILE_RE = re.compile(r"^price_history_y(\d{4})m(\d{2})\.parquet$")
+
+
+def _schema():
+    import pyarrow as pa
+    return pa.schema([
+        ("id", pa.int64()),
+        ("item_id", pa.int64()),
+        ("price", pa.int64()),
+        # Parquet сам кодирует строки словарём
+        ("currency", pa.string()),
+        ("enchant_level", pa.string()),
+        ("source", pa.string()),
+        ("timestamp", pa.timestamp("us", tz="UTC")),
+    ])
+
+
+def month_path(month: date) -> str:
+    return os.path.join(get_archive_dir(), f"price_history_y{month:%Y}m{month:%m}.parquet")
+
+
+def archived_months() -> list[date]:
+    directory = get_archive_dir()
+    if not os.path.isdir(directory):
+        return []
+    months = []
+    for name in os.listdir(directory):
+        m = _FILE_RE.match(name)
+        if m:
+            months.append(date(int(m.group(1)), int(m.group(2)), 1))
+    return sorted(months)
+
+
+class MonthWriter:
+    """Пишет месяц сделок в Parquet (zstd) пакетами; файл появляется атомарно при close()."""
+
+    def __init__(self, month: date):
+        import pyarrow.parquet as pq
+        os.makedirs(get_archive_dir(), exist_ok=True)
+        self.path = month_path(month)
+        self._tmp_path = self.path + ".tmp"
+        self._writer = pq.ParquetWriter(self._tmp_path, _schema(), compression="zstd")
+        self.rows = 0
+
+    def write(self, rows) -> None:
+        import pyarrow as pa
+        columns = list(zip(*rows)) if rows else [[] for _ in ARCHIVE_COLUMNS]
+        schema = _schema()
+        table = pa.Table.from_arrays(
+            [pa.array(col, type=field.type) for col, field in zip(columns, schema)], schema=schema
+        )
+        self._writer.write_table(table, row_group_size=ROW_GROUP_SIZE)
+        self.rows += len(rows)
+
+    def close(self) -> str:
+        self._writer.close()
+        with open(self._tmp_path, "rb") as f:
+            os.fsync(f.fileno())
+        os.replace(self._tmp_path, self.path)
+        return self.path
+
+    def abort(self) -> None:
+        self._writer.close()
+        if os.path.exists(self._tmp_path):
+            os.remove(self._tmp_path)
+
+
+def month_bounds(month: date) -> tuple[datetime, datetime]:
+    start = datetime(month.year, month.month, 1, tzinfo=timezone.utc)
+    end = datetime(month.year + month.month // 12, month.month % 12 + 1, 1, tzinfo=timezone.utc)
+    return start, end
+
+
+def _iter_month(month: date, item_id=None, start=None, end=None, **equals) -> Iterator[list[tuple]]:
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+
+    pf = pq.ParquetFile(month_path(month))
+    for i in range(pf.num_row_groups):
+        if item_id is not None:
+            # Файлы отсортированы по item_id: статистика row group отсекает лишнее
+            stats = pf.metadata.row_group(i).column(1).statistics
+            if stats is not None and stats.has_min_max and not (stats.min <= item_id <= stats.max):
+                continue
+        table = pf.read_row_group(i)
+        conditions = []
+        if item_id is not None:
+            conditions.append(pc.equal(table["item_id"], item_id))
+        for column, value in equals.items():
+            if value is not None:
+                conditions.append(pc.equal(table[column], value))
+        if start is not None:
+            conditions.append(pc.greater_equal(table["timestamp"], start))
+        if end is not None:
+            conditions.append(pc.less_equal(table["timestamp"], end))
+        if conditions:
+            mask = conditions[0]
+            for cond in conditions[1:]:
+                mask = pc.and_(mask, cond)
+            table = table.filter(mask)
+        if table.num_rows:
+            yield [tuple(r[c] for c in ARCHIVE_COLUMNS) for r in table.to_pylist()]
+
+
+def iter_archived_trades(
+        item_id: Optional[int] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        currency: Optional[str] = None,
+        source: Optional[str] = None,
+        enchant_level: Optional[str] = None,
+) -> Iterator[list[tuple]]:
+    """Архивные сделки пачками по row group; месяцы по возрастанию."""
+    for month in archived_months():
+        month_start, month_end = month_bounds(month)
+        if (start is not None and month_end <= start) or (end is not None and month_start > end):
+            continue
+        yield from _iter_month(month, item_id=item_id, start=start, end=end,
+                               currency=currency, source=source, enchant_level=enchant_level)
+
+
+def latest_archived_prices_many(
+        keys: list[tuple[int, str, str]],
+        limit: int,
+        since: Optional[datetime] = None,
+) -> dict[tuple[int, str, str], list[int]]:
+    """Последние архивные цены для классификации по ключам (item_id, currency, enchant_level).
+
+    Один проход по месяцам от новых к старым на все ключи: ключ выбывает, набрав limit цен.
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+
+    found: dict[tuple, list[tuple[datetime, int]]] = {key: [] for key in keys}
+    pending = set(keys)
+    for month in reversed(archived_months()):
+        if not pending or (since is not None and month_bounds(month)[1] <= since):
+            break
+        item_ids = sorted({key[0] for key in pending})
+        pf = pq.ParquetFile(month_path(month))
+        for i in range(pf.num_row_groups):
+            # Файлы отсортированы по item_id: row group без нужных предметов не читаем
+            stats = pf.metadata.row_group(i).column(1).statistics
+            if stats is not None and stats.has_min_max and \
+                    bisect_left(item_ids, stats.min) == bisect_right(item_ids, stats.max):
+                continue
+            table = pf.read_row_group(i, columns=["item_id", "currency", "enchant_level", "price", "timestamp"])
+            mask = pc.is_in(table["item_id"], value_set=pa.array(item_ids, type=pa.int64()))
+            if since is not None:
+                mask = pc.and_(mask, pc.greater_equal(table["timestamp"], since))
+            table = table.filter(mask)
+            columns = [table[c].to_pylist() for c in ("item_id", "currency", "enchant_level", "price", "timestamp")]
+            for item_id, currency, level, price, ts in zip(*columns):
+                prices = found.get((item_id, currency, level))
+                if prices is not None:
+                    prices.append((ts, price))
+        pending = {key for key in pending if len(found[key]) < limit}
+    return {key: [price for _, price in sorted(prices, reverse=True)[:limit]] for key, prices in found.items()}
@@ -0,0 +1,54 @@
+from typing import Iterable, Optional
+
+from sqlalchemy import select, delete, update, bindparam
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import DeadLetter
+
+
+async def add_dead_letters(db: AsyncSession, rows: list[dict]) -> None:
+    """rows: message_id, text, reason, item_name, message_date. Уже сохранённые сообщения пропускаются."""
+    if not rows:
+        return
+    stmt = pg_insert(DeadLetter).values(rows).on_conflict_do_nothing(index_elements=[DeadLetter.message_id])
+    await db.execute(stmt)
+    await db.commit()
+
+
+async def get_dead_letters(
+        db: AsyncSession,
+        after_id: int = 0,
+        limit: int = 1000,
+        reason: Optional[str] = None,
+) -> list[DeadLetter]:
+    stmt = select(DeadLetter).where(DeadLetter.id > after_id).order_by(DeadLetter.id).limit(limit)
+    if reason is not None:
+        stmt = stmt.where(DeadLetter.reason == reason)
+    result = await db.execute(stmt)
+    return list(result.scalars().all())
+
+
+async def delete_dead_letters(db: AsyncSession, ids: Iterable[int]) -> None:
+    # Без commit: удаление фиксируется вместе со вставкой восстановленных сделок
+    ids = list(ids)
+    if ids:
+        await db.execute(delete(DeadLetter).where(DeadLetter.id.in_(ids)))
+
+
+async def mark_dead_letters_retried(db: AsyncSession, retried: list[dict]) -> None:
+    """retried: id, reason, item_name — причина могла смениться (разобрали, но предмета нет). Без commit."""
+    if not retried:
+        return
+    stmt = (
+        update(DeadLetter.__table__)
+        .where(DeadLetter.__table__.c.id == bindparam("b_id"))
+        .values(
+            reason=bindparam("b_reason"),
+            item_name=bindparam("b_item_name"),
+            attempts=DeadLetter.__table__.c.attempts + 1,
+        )
+    )
+    await db.execute(stmt, [
+        {"b_id": r["id"], "b_reason": r["reason"], "b_item_name": r["item_name"]} for r in retried
+    ])
@@ -1,7 +1,7 @@
 from datetime import timedelta, date
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
-from typing import Optional
+from sqlalchemy import select, func, tuple_, or_, and_, Float
+from typing import Iterable, Optional
 import re
 
 from sqlalchemy.orm import selectinload
@@ -10,6 +10,7 @@ from app.db.models import Category
 from app.db.models.item import Item
 from app.db.schemas.item import ItemCreate, ItemUpdate
 from app.db.models.price import DailyPriceStats
+from app.utils.tools import encode_cursor, decode_cursor
 
 MIN_FTS_TOKEN_LEN = 3
 
@@ -61,23 +62,36 @@ async def get_item(db: AsyncSession, item_id: int) -> Optional[Item]:
     return res.scalars().first()
 
 
-async def get_item_by_name(db: AsyncSession, item_name: str) -> Optional[Item]:
-    stmt = select(Item).options(selectinload(Item.category)).where(Item.name == item_name)
+async def get_items_by_names(db: AsyncSession, names: Iterable[str]) -> dict[str, Item]:
+    """Предметы по точным именам одним запросом (+ один selectin для категорий)."""
+    names = set(names)
+    if not names:
+        return {}
+    stmt = select(Item).options(selectinload(Item.category)).where(Item.name.in_(names))
     result = await db.execute(stmt)
-    return result.scalar_one_or_none()
+    return {item.name: item for item in result.scalars().all()}
 
 
-async def get_items(db: AsyncSession, page: int, page_size: int):
-    offset = (page - 1) * page_size
-    result = await db.execute(
+async def get_items(db: AsyncSession, page_size: int, cursor: Optional[str] = None):
+    stmt = (
         select(Item)
         .options(
             selectinload(Item.category)
         )
-        .offset(offset)
-        .limit(page_size)
+        .order_by(Item.name.asc(), Item.id.asc())
+        .limit(page_size + 1)
     )
-    return result.scalars().all()
+    if cursor:
+        name, last_id = _cursor_key(decode_cursor(cursor), str)
+        stmt = stmt.where(tuple_(Item.name, Item.id) > tuple_(name, last_id))
+    result = await db.execute(stmt)
+    items = result.scalars().all()
+
+    next_cursor = None
+    if len(items) > page_size:
+        items = items[:page_size]
+        next_cursor = encode_cursor({"k": [items[-1].name, items[-1].id]})
+    return items, next_cursor
 
 
 async def update_item(
@@ -119,7 +133,15 @@ async def delete_item(
     return True
 
 
-async def search_items_by_name(db: AsyncSession, query: str, page: int = 1, page_size: int = 20):
+def _cursor_key(data: dict, first_type=float) -> tuple:
+    try:
+        first, last_id = data["k"]
+        return first_type(first), int(last_id)
+    except (KeyError, TypeError, ValueError):
+        raise ValueError("Invalid cursor")
+
+
+async def search_items_by_name(db: AsyncSession, query: str, page_size: int = 20, cursor: Optional[str] = None):
     from app.db.schemas.item import ItemOut, ItemSearchOut
     norm = _normalize_query(query)
     if not norm:
@@ -128,58 +150,66 @@ async def search_items_by_name(db: AsyncSession, query: str, page: int = 1, page
     if not tokens:
         return ItemSearchOut(Items=[], Total=0)
 
-    offset = (page - 1) * page_size
     fts_parts = _fts_tokens(tokens)
+    tsv = Item.search_vector
+    tsquery = func.to_tsquery('russian', " & ".join(fts_parts)) if fts_parts else None
+    fts_match = tsv.op('@@')(tsquery) if tsquery is not None else None
+    ilike_match = Item.name.ilike(f"{tokens[-1]}%")
+    # ILIKE-фаза не повторяет то, что уже отдала FTS-фаза
+    ilike_only = ilike_match if fts_match is None else and_(ilike_match, ~fts_match)
+    last_token_short = len(tokens[-1]) < MIN_FTS_TOKEN_LEN
+
+    total_count = None
+    if cursor is None:
+        # Первая страница: оба счётчика одним запросом
+        fts_count_col = func.count(Item.id).filter(fts_match) if fts_match is not None else func.count(None)
+        count_stmt = select(fts_count_col, func.count(Item.id).filter(ilike_only)).where(
+            ilike_match if fts_match is None else or_(fts_match, ilike_match)
+        )
+        fts_count, ilike_count = (await db.execute(count_stmt)).one()
+        fallback = not fts_count or last_token_short
+        total_count = fts_count + (ilike_count if fallback else 0)
+        phase, key = ("fts" if fts_count else "ilike"), None
+    else:
+        state = decode_cursor(cursor)
+        phase, fallback = state.get("p"), bool(state.get("fb"))
+        if phase not in ("fts", "ilike") or (phase == "fts" and fts_match is None):
+            raise ValueError("Invalid cursor")
+        key = _cursor_key(state, float if phase == "fts" else str) if state.get("k") else None
 
     results_ordered = []
-    seen_ids = set()
-    total_count = 0
-
-    if fts_parts:
-        tsquery_str = " & ".join(fts_parts)
-        tsquery = func.to_tsquery('russian', tsquery_str)
-        tsv = Item.search_vector
-        count_stmt = select(func.count(Item.id)).where(tsv.op('@@')(tsquery))
-        count_res = await db.execute(count_stmt)
-        total_count = count_res.scalar() or 0
-        fts_stmt = (
-            select(Item)
-            .options(selectinload(Item.category))
-            .where(tsv.op('@@')(tsquery))
-            .order_by(func.ts_rank_cd(tsv, tsquery).desc(), Item.id.asc())
-            .offset(offset)
-            .limit(page_size)
-        )
-        fts_res = await db.execute(fts_stmt)
-        for it in fts_res.scalars().unique():
-            results_ordered.append(it)
-            seen_ids.add(it.id)
-
-    last_token = tokens[-1]
-    last_token_short = len(last_token) < MIN_FTS_TOKEN_LEN
-    need_fallback = not results_ordered or last_token_short
-
-    if need_fallback:
-        prefix = last_token
-        ilike_pattern = f"{prefix}%"
-        count_stmt = select(func.count(Item.id)).where(Item.name.ilike(ilike_pattern))
-        count_res = await db.execute(count_stmt)
-        total_count = count_res.scalar() or 0
-        ilike_stmt = (
-            select(Item)
-            .options(selectinload(Item.category))
-            .where(Item.name.ilike(ilike_pattern))
-            .order_by(Item.name.asc())
-            .limit(page_size)
-        )
-        ilike_res = await db.execute(ilike_stmt)
-        for it in ilike_res.scalars().unique():
-            if it.id not in seen_ids:
-                results_ordered.append(it)
-                seen_ids.add(it.id)
+    next_cursor = None
+    while phase:
+        need = page_size - len(results_ordered)
+        if phase == "fts":
+            rank = func.ts_rank_cd(tsv, tsquery).cast(Float)
+            stmt = select(Item, rank.label("rank")).options(selectinload(Item.category)).where(fts_match)
+            if key:
+                stmt = stmt.where(or_(rank < key[0], and_(rank == key[0], Item.id > key[1])))
+            stmt = stmt.order_by(rank.desc(), Item.id.asc()).limit(need + 1)
+            rows = [(r.Item, (r.rank, r.Item.id)) for r in (await db.execute(stmt)).all()]
+            next_phase = "ilike" if fallback else None
+        else:
+            stmt = select(Item).options(selectinload(Item.category)).where(ilike_only)
+            if key:
+                stmt = stmt.where(tuple_(Item.name, Item.id) > tuple_(key[0], key[1]))
+            stmt = stmt.order_by(Item.name.asc(), Item.id.asc()).limit(need + 1)
+            rows = [(it, (it.name, it.id)) for it in (await db.execute(stmt)).scalars().all()]
+            next_phase = None
+
+        if len(rows) > need:
+            rows = rows[:need]
+            results_ordered.extend(it for it, _ in rows)
+            next_cursor = encode_cursor({"p": phase, "k": list(rows[-1][1]), "fb": fallback})
+            break
+        results_ordered.extend(it for it, _ in rows)
+        phase, key = next_phase, None
+        if phase and len(results_ordered) >= page_size:
+            next_cursor = encode_cursor({"p": phase, "fb": fallback})
+            break
 
     items_out = [ItemOut.model_validate(it) for it in results_ordered]
-    return ItemSearchOut(Items=items_out, Total=total_count)
+    return ItemSearchOut(Items=items_out, Total=total_count, NextCursor=next_cursor)
 
 
 async def get_top_active_items(session: AsyncSession, days: int = 7, limit: int = 15,
@@ -1,11 +1,49 @@
-from datetime import datetime, timedelta, date
-from typing import List, Optional, Union
-from sqlalchemy import select, desc, func, text
+import asyncio
+import re
+from datetime import datetime, timedelta, date, timezone
+from typing import AsyncIterator, List, Optional, Sequence, Union
+from sqlalchemy import select, desc, func, text, true, values, column, BigInteger
+from sqlalchemy.dialects.postgresql import ARRAY, aggregate_order_by, insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.models.price import PriceHistory, DailyPriceStats
+from app.config import get_classification_lookback_days
+from app.db import archive
+from app.db.models.price import PriceHistory, DailyPriceStats, DailyEnchantPriceStats, HourlyPriceStats, CoinRate
 from app.db.schemas.price import PriceCreate
-import numpy as np
+from app.db.types import CurrencyType, EnchantLevel
+
+EXPORT_CHUNK_SIZE = 5000
+# Монета: её цена в адене и есть курс coin -> adena
+COIN_ITEM_ID = 793
+COIN_RATE_RESOLUTIONS = ("hour", "day")
+PARTITION_MONTHS_AHEAD = 3
+# Ключей (item, currency, mod) на один запрос: три параметра на ключ, лимит asyncpg — 32767
+CLASSIFICATION_KEYS_CHUNK = 5000
+# Представление rollup -> колонка времени. {view} = {view}_archive UNION ALL активный буфер
+# {view}_a / {view}_b; активный буфер и SELECT для пересборки лежат в rollup_buffers
+ROLLUP_VIEWS = {
+    "daily_price_stats": "day",
+    "daily_enchant_price_stats": "day",
+    "hourly_price_stats": "hour",
+}
+# Ключ строки rollup (первичный ключ {view}_archive)
+ROLLUP_KEYS = {
+    "daily_price_stats": ("item_id", "currency", "day"),
+    "daily_enchant_price_stats": ("item_id", "enchant_level", "currency", "day"),
+    "hourly_price_stats": ("item_id", "currency", "hour"),
+}
+# Переключение представления ждёт завершения текущих чтений не дольше этого
+ROLLUP_SWAP_LOCK_TIMEOUT = "5s"
+_PARTITION_RE = re.compile(r"^price_history_y(\d{4})m(\d{2})$")
+
+CANDLE_INTERVALS = {
+    "1h": timedelta(hours=1),
+    "4h": timedelta(hours=4),
+    "1d": timedelta(days=1),
+    "1w": timedelta(weeks=1),
+}
+# Понедельник: недельные свечи начинаются с понедельника
+CANDLE_ORIGIN = datetime(2000, 1, 3, tzinfo=timezone.utc)
 
 
 async def add_prices_batch(
@@ -26,26 +64,129 @@ async def add_prices_batch(
         for price in prices
     ]
     db.add_all(db_prices)
+    # Курс монеты обновляется в той же транзакции, что и сами сделки
+    await refresh_coin_rates(db, prices)
     await db.commit()
 
 
 def iqr_filter(prices):
     if len(prices) < 4:
         return prices
-    arr = np.array(prices)
-    q1 = np.percentile(arr, 25)
-    q3 = np.percentile(arr, 75)
-    iqr = q3 - q1
-    filtered = arr[(arr >= q1 - 1.5 * iqr) & (arr <= q3 + 1.5 * iqr)]
-    # Additionally: filter values that differ from the median by more than 3 times
-    med = np.median(filtered) if len(filtered) > 0 else np.median(arr)
-    filtered = filtered[np.abs(filtered - med) <= 3 * med]
-    return filtered.tolist() if len(filtered) > 0 else arr.tolist()
-
-
-async def refresh_daily_price_stats(db: AsyncSession, concurrently: bool = True):
-    stmt = text("REFRESH MATERIALIZED VIEW {} daily_price_stats".format("CONCURRENTLY" if concurrently else ""))
-    await db.execute(stmt)
+    # NumPy грузится только там, где реально фильтруют: импорт crud остаётся лёгким
+    from app.utils.stats import iqr_filter as _iqr_filter
+    return _iqr_filter(prices)
+
+
+async def ensure_price_history_partitions(db: AsyncSession, months_ahead: int = PARTITION_MONTHS_AHEAD):
+    await db.execute(text("SELECT ensure_price_history_partitions(:months)"), {"months": months_ahead})
+    await db.commit()
+
+
+async def _swap_rollups(db: AsyncSession):
+    # Собираем теневые буферы, затем переключаем представления в той же транзакции: читатели
+    # видят старые буферы до коммита, блокировка представлений держится только на переключение,
+    # ошибка сборки оставляет прежние данные.
+    # FOR UPDATE сериализует параллельные пересборки (воркер, архивация, скрипты): вторая ждёт
+    # коммита первой и читает уже переключённые active, иначе обе писали бы в один теневой буфер
+    result = await db.execute(text("SELECT name, active, definition FROM rollup_buffers ORDER BY name FOR UPDATE"))
+    shadows = {}
+    conn = await db.connection()
+    for name, active, definition in result.all():
+        shadow = "b" if active == "a" else "a"
+        await db.execute(text(f"TRUNCATE {name}_{shadow}"))
+        # Сделки за уже замороженный месяц (досланные задним числом, повторный разбор dead_letters)
+        # попадают в price_history_default: ключи из {name}_archive не берём, иначе представление
+        # отдаст две строки на один день/час
+        match = " AND ".join(f"a.{c} = d.{c}" for c in ROLLUP_KEYS[name])
+        # Определение из pg_matviews: без разбора bind-параметров, в нём есть "::" и литералы
+        await conn.exec_driver_sql(
+            f"INSERT INTO {name}_{shadow} SELECT * FROM ({definition.rstrip().rstrip(';')}) AS d "
+            f"WHERE NOT EXISTS (SELECT 1 FROM {name}_archive a WHERE {match})"
+        )
+        await db.execute(text(f"ANALYZE {name}_{shadow}"))
+        shadows[name] = shadow
+
+    await db.execute(text(f"SET LOCAL lock_timeout = '{ROLLUP_SWAP_LOCK_TIMEOUT}'"))
+    for name, shadow in shadows.items():
+        await db.execute(text(
+            f"CREATE OR REPLACE VIEW {name} AS "
+            f"SELECT * FROM {name}_archive UNION ALL SELECT * FROM {name}_{shadow}"
+        ))
+        await db.execute(
+            text("UPDATE rollup_buffers SET active = :active, built_at = now() WHERE name = :name"),
+            {"active": shadow, "name": name},
+        )
+
+
+async def refresh_price_rollups(db: AsyncSession):
+    await _swap_rollups(db)
+    await db.commit()
+
+
+async def list_price_history_partitions(db: AsyncSession) -> list[tuple[str, date]]:
+    """Месячные партиции price_history (без default) по возрастанию месяца."""
+    result = await db.execute(text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = 'price_history'::regclass"
+    ))
+    partitions = []
+    for name in result.scalars():
+        m = _PARTITION_RE.match(name)
+        if m:
+            partitions.append((name, date(int(m.group(1)), int(m.group(2)), 1)))
+    return sorted(partitions, key=lambda p: p[1])
+
+
+async def stream_price_history_month(
+        db: AsyncSession,
+        start: datetime,
+        end: datetime,
+        chunk_size: int = EXPORT_CHUNK_SIZE,
+) -> AsyncIterator[Sequence]:
+    # Порядок (item_id, timestamp): архивный файл читается по item_id через статистику row group
+    PH = PriceHistory
+    stmt = (
+        select(PH.id, PH.item_id, PH.price, PH.currency, PH.enchant_level, PH.source, PH.timestamp)
+        .where(PH.timestamp >= start, PH.timestamp < end)
+        .order_by(PH.item_id, PH.timestamp, PH.id)
+        .execution_options(yield_per=chunk_size)
+    )
+    result = await db.stream(stmt)
+    async for partition in result.partitions(chunk_size):
+        yield partition
+
+
+async def freeze_price_history_month(
+        db: AsyncSession,
+        partition: str,
+        start: datetime,
+        end: datetime,
+        expected_rows: int,
+) -> None:
+    """Переносит rollup месяца в *_archive и удаляет партицию — одной транзакцией.
+
+    Если в партиции оказалось не expected_rows строк (досланные задним числом сделки),
+    транзакция откатывается, партиция остаётся на месте.
+    """
+    await db.execute(text(f"LOCK TABLE {partition} IN EXCLUSIVE MODE"))
+    count = (await db.execute(text(f"SELECT count(*) FROM {partition}"))).scalar_one()
+    if count != expected_rows:
+        await db.rollback()
+        raise RuntimeError(f"{partition}: {count} rows in table, {expected_rows} archived")
+
+    for view, column in ROLLUP_VIEWS.items():
+        # Уже замороженные строки из {view}_archive отсекает ON CONFLICT
+        await db.execute(
+            text(
+                f"INSERT INTO {view}_archive SELECT * FROM {view} "
+                f"WHERE {column} >= :start AND {column} < :end ON CONFLICT DO NOTHING"
+            ),
+            {"start": start, "end": end},
+        )
+    await db.execute(text(f"ALTER TABLE price_history DETACH PARTITION {partition}"))
+    await db.execute(text(f"DROP TABLE {partition}"))
+    # Месяц уходит из активного буфера в той же транзакции, читатели не видят ни дыры, ни дублей
+    await _swap_rollups(db)
     await db.commit()
 
 
@@ -55,9 +196,13 @@ async def get_prices_by_item(
         limit: int = 100,
         enchant_level: Optional[Union[int, str]] = None,
         currency: Optional[str] = None,
+        since: Optional[datetime] = None,
 ) -> List[PriceHistory]:
     stmt = select(PriceHistory).where(PriceHistory.item_id == item_id)
 
+    if since is not None:
+        stmt = stmt.where(PriceHistory.timestamp >= since)
+
     if enchant_level is not None:
         stmt = stmt.where(PriceHistory.enchant_level == str(enchant_level))
 
@@ -70,164 +215,241 @@ async def get_prices_by_item(
     return result.scalars().all()
 
 
+async def stream_price_history(
+        db: AsyncSession,
+        item_id: Optional[int] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        currency: Optional[str] = None,
+        source: Optional[str] = None,
+        enchant_level: Optional[str] = None,
+        chunk_size: int = EXPORT_CHUNK_SIZE,
+) -> AsyncIterator[Sequence]:
+    # Server-side cursor: rows are fetched in chunks of chunk_size, memory does not grow with the range
+    PH = PriceHistory
+    stmt = select(PH.id, PH.item_id, PH.price, PH.currency, PH.enchant_level, PH.source, PH.timestamp)
+    if item_id is not None:
+        stmt = stmt.where(PH.item_id == item_id)
+    if start is not None:
+        stmt = stmt.where(PH.timestamp >= start)
+    if end is not None:
+        stmt = stmt.where(PH.timestamp <= end)
+    if currency is not None:
+        stmt = stmt.where(PH.currency == currency)
+    if source is not None:
+        stmt = stmt.where(PH.source == source)
+    if enchant_level is not None:
+        stmt = stmt.where(PH.enchant_level == str(enchant_level))
+    stmt = stmt.order_by(PH.timestamp, PH.id).execution_options(yield_per=chunk_size)
+
+    result = await db.stream(stmt)
+    async for partition in result.partitions(chunk_size):
+        yield partition
+
+
 async def get_latest_price(
         db: AsyncSession,
         item_id: int,
         enchant_level: Optional[Union[int, str]] = None,
         currency: Optional[str] = None,
+        since: Optional[datetime] = None,
 ) -> Optional[PriceHistory]:
     prices = await get_prices_by_item(
-        db, item_id=item_id, limit=1, enchant_level=enchant_level, currency=currency
+        db, item_id=item_id, limit=1, enchant_level=enchant_level, currency=currency, since=since
     )
     return prices[0] if prices else None
 
 
-async def get_latest_prices_for_classification(
+async def _latest_prices_by_key(
         session: AsyncSession,
-        item_id: int,
-        currency: str,
-        mods: list[int],
-        per_mod_limit: int = 3
-) -> list[tuple[int, int]]:
-    prices = []
-    for mod in mods:
-        stmt = (
-            select(PriceHistory.enchant_level, PriceHistory.price)
-            .where(
-                PriceHistory.item_id == item_id,
-                PriceHistory.currency == currency,
-                PriceHistory.enchant_level == str(mod)
-            )
+        keys: list[tuple[int, str, str]],
+        per_mod_limit: int,
+        since: Optional[datetime],
+) -> list[tuple[int, str, str, int]]:
+    rows = []
+    for start in range(0, len(keys), CLASSIFICATION_KEYS_CHUNK):
+        chunk = keys[start:start + CLASSIFICATION_KEYS_CHUNK]
+        k = values(
+            column("item_id", BigInteger), column("currency", CurrencyType), column("enchant_level", EnchantLevel),
+            name="k",
+        ).data(chunk)
+        conditions = [
+            PriceHistory.item_id == k.c.item_id,
+            PriceHistory.currency == k.c.currency,
+            PriceHistory.enchant_level == k.c.enchant_level,
+        ]
+        if since is not None:
+            # Ограничение по времени отсекает старые месячные партиции
+            conditions.append(PriceHistory.timestamp >= since)
+        latest = (
+            select(PriceHistory.price, PriceHistory.timestamp)
+            .where(*conditions)
             .order_by(desc(PriceHistory.timestamp))
             .limit(per_mod_limit)
+            .lateral("latest")
+        )
+        stmt = (
+            select(k.c.item_id, k.c.currency, k.c.enchant_level, latest.c.price)
+            .select_from(k.join(latest, true()))
+            .order_by(k.c.item_id, k.c.currency, k.c.enchant_level, desc(latest.c.timestamp))
         )
-        result = await session.execute(stmt)
-        prices.extend([(int(row[0]), row[1]) for row in result.fetchall()])
+        rows.extend((await session.execute(stmt)).all())
+    return rows
 
-    return prices
 
+async def get_latest_prices_for_classification_many(
+        session: AsyncSession,
+        wanted: dict[tuple[int, str], list[int]],
+        per_mod_limit: int = 3
+) -> dict[tuple[int, str], list[tuple[int, int]]]:
+    """Последние цены по каждой заточке для набора (item_id, currency) -> mods.
 
-async def get_coin_price(db: AsyncSession, to_date: Optional[datetime] = None, aggregate: str = "avg") -> Optional[int]:
-    if to_date is None:
-        to_date = datetime.utcnow()
-    DPS = DailyPriceStats
-    stmt = (
-        select(DPS.day, DPS.avg_price, DPS.min_price)
-        .where(
-            DPS.item_id == 793,
-            DPS.currency == "adena",
-            DPS.day <= func.date_trunc('day', to_date)
+    Один запрос на пачку: VALUES с ключами и LATERAL ... LIMIT по индексу
+    (item_id, currency, enchant_level, timestamp DESC) вместо запроса на каждую заточку.
+    Сначала в окне CLASSIFICATION_LOOKBACK_DAYS; заточки без сделок в окне — по всей истории
+    (ещё один запрос только для них), затем в Parquet-архиве.
+    """
+    keys = [(item_id, currency, str(mod)) for (item_id, currency), mods in wanted.items() for mod in mods]
+    history: dict[tuple[int, str], list[tuple[int, int]]] = {key: [] for key in wanted}
+    found = set()
+    lookback_days = get_classification_lookback_days()
+    since = datetime.now(timezone.utc) - timedelta(days=lookback_days) if lookback_days else None
+    missing = keys
+    for bound in ((since, None) if since is not None else (None,)):
+        if not missing:
+            break
+        for item_id, currency, level, price in await _latest_prices_by_key(session, missing, per_mod_limit, bound):
+            history[(item_id, currency)].append((int(level), price))
+            found.add((item_id, currency, level))
+        missing = [key for key in missing if key not in found]
+
+    if missing and archive.archived_months():
+        # Горизонт хранения короче истории: добираем из Parquet-архива одним проходом
+        archived = await asyncio.to_thread(archive.latest_archived_prices_many, missing, per_mod_limit, None)
+        for (item_id, currency, level), prices in archived.items():
+            history[(item_id, currency)].extend([(int(level), price) for price in prices])
+    return history
+
+
+def _coin_bucket(ts: datetime, resolution: str) -> datetime:
+    ts = ts.replace(tzinfo=timezone.utc) if ts.tzinfo is None else ts.astimezone(timezone.utc)
+    ts = ts.replace(minute=0, second=0, microsecond=0)
+    return ts.replace(hour=0) if resolution == "day" else ts
+
+
+def coin_rate_rows(trades: Sequence[tuple[datetime, int]]) -> list[dict]:
+    """Строки coin_rate по сделкам (время, цена) продажи монеты за адену: часовые и дневные бакеты.
+
+    Выбросы отсекаются тем же IQR-правилом, что и в остальных агрегатах, по всем сделкам бакета.
+    """
+    if not trades:
+        return []
+    import numpy as np
+    from app.utils.stats import grouped_iqr_stats
+
+    keys: dict[tuple[str, datetime], int] = {}
+    group_ids, prices = [], []
+    for ts, price in trades:
+        for resolution in COIN_RATE_RESOLUTIONS:
+            group_ids.append(keys.setdefault((resolution, _coin_bucket(ts, resolution)), len(keys)))
+            prices.append(price)
+    stats = grouped_iqr_stats(prices, group_ids)
+    # Группы занумерованы подряд с нуля: массивы stats выровнены по номеру группы
+    kept = np.asarray(group_ids)[stats["mask"]]
+    kept_prices = np.asarray(prices, dtype=np.int64)[stats["mask"]]
+    volume = np.bincount(kept, minlength=len(keys))
+    price_sum = np.zeros(len(keys), dtype=np.int64)
+    np.add.at(price_sum, kept, kept_prices)
+    return [
+        dict(
+            resolution=resolution,
+            bucket=bucket,
+            price_sum=int(price_sum[g]),
+            volume=int(volume[g]),
+            min_price=int(stats["min"][g]),
+            max_price=int(stats["max"][g]),
         )
-        .order_by(DPS.day.desc())
-        .limit(1)
-    )
-    result = await db.execute(stmt)
-    row = result.first()
-    if not row:
-        return None
-    avg_price = int(row.avg_price)
-    min_price = int(row.min_price)
-    return avg_price if aggregate == "avg" else min_price
+        for (resolution, bucket), g in keys.items()
+    ]
 
 
-async def get_coin_price_on_day(db: AsyncSession, day: date, aggregate: str = "avg") -> Optional[int]:
-    DPS = DailyPriceStats
-    stmt = (
-        select(DPS.avg_price, DPS.min_price)
-        .where(
-            DPS.item_id == 793,
-            DPS.currency == "adena",
-            DPS.day == day
+async def refresh_coin_rates(db: AsyncSession, prices: List[PriceCreate]) -> None:
+    """Пересчитывает бакеты coin_rate, которых коснулась пачка.
+
+    IQR по одной пачке не совпадает с IQR бакета (а пачка из 1-3 цен не фильтруется вовсе),
+    поэтому затронутые дни пересчитываются целиком по price_history, вместе с их часами.
+    """
+    days = {
+        _coin_bucket(price.timestamp, "day") for price in prices
+        if price.item.id == COIN_ITEM_ID and price.currency == "adena"
+    }
+    if not days:
+        return
+    PH = PriceHistory
+    # autoflush: строки текущей пачки тоже попадают в выборку
+    result = await db.execute(
+        select(PH.timestamp, PH.price).where(
+            PH.item_id == COIN_ITEM_ID,
+            PH.currency == "adena",
+            PH.timestamp >= min(days),
+            PH.timestamp < max(days) + timedelta(days=1),
         )
-        .limit(1)
     )
-    result = await db.execute(stmt)
-    row = result.first()
-    if not row:
-        return None
-    avg_price = int(row.avg_price)
-    min_price = int(row.min_price)
-    return avg_price if aggregate == "avg" else min_price
+    trades = [(ts, price) for ts, price in result.all() if _coin_bucket(ts, "day") in days]
+    await upsert_coin_rates(db, coin_rate_rows(trades))
 
 
-async def get_coin_price_map(db: AsyncSession, start: date, end: date, aggregate: str = "avg") -> dict[date, int]:
-    DPS = DailyPriceStats
-    stmt = (
-        select(DPS.day, DPS.avg_price, DPS.min_price)
-        .where(
-            DPS.item_id == 793,
-            DPS.currency == "adena",
-            DPS.day >= start,
-            DPS.day <= end
-        )
-        .order_by(DPS.day)
+async def upsert_coin_rates(db: AsyncSession, rows: list[dict]) -> None:
+    if not rows:
+        return
+    stmt = pg_insert(CoinRate).values([dict(row, updated_at=func.clock_timestamp()) for row in rows])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[CoinRate.resolution, CoinRate.bucket],
+        set_={
+            "price_sum": stmt.excluded.price_sum,
+            "volume": stmt.excluded.volume,
+            "min_price": stmt.excluded.min_price,
+            "max_price": stmt.excluded.max_price,
+            # Не now(): это начало транзакции, а сбор держит её открытой между страницами.
+            # Время самой записи; add_prices_batch коммитит сразу после неё
+            "updated_at": func.clock_timestamp(),
+        },
     )
-    result = await db.execute(stmt)
-    rows = result.fetchall()
-    out = {}
-    for r in rows:
-        avg_price = int(r.avg_price)
-        min_price = int(r.min_price)
-        out[r.day] = avg_price if aggregate == "avg" else min_price
-    return out
+    await db.execute(stmt)
+
+
+async def get_coin_rates(db: AsyncSession, updated_since: Optional[datetime] = None) -> List[CoinRate]:
+    stmt = select(CoinRate)
+    if updated_since is not None:
+        stmt = stmt.where(CoinRate.updated_at >= updated_since)
+    result = await db.execute(stmt.order_by(CoinRate.resolution, CoinRate.bucket))
+    return result.scalars().all()
 
 
 async def get_item_price_history(
         db: AsyncSession,
         item_id: int,
-        period: int,
+        period: Optional[int],
         modification: Optional[str] = None
 ) -> list:
-    if modification is not None:
-        from collections import defaultdict
-        end_date = datetime.utcnow()
-        start_date = end_date - timedelta(days=period)
-        PH = PriceHistory
-        base_query = select(
-            PH.price,
-            PH.currency,
-            func.date(PH.timestamp).label("day")
-        ).where(
-            PH.item_id == item_id,
-            PH.timestamp >= start_date,
-            PH.timestamp <= end_date,
-            PH.price > 10,
-            PH.enchant_level == modification
-        ).order_by(func.date(PH.timestamp), PH.currency)
-        result = await db.execute(base_query)
-        rows = result.mappings().all()
-        grouped = defaultdict(lambda: {"timestamp": None, "adena": None, "coin": None, "_prices": {"adena": [], "coin": []}})
-        for row in rows:
-            day = row["day"]
-            currency = row["currency"]
-            price = int(row["price"])
-            grouped[day]["timestamp"] = day
-            grouped[day]["_prices"][currency].append(price)
-        out = []
-        for day, data in grouped.items():
-            for currency in ("adena", "coin"):
-                prices = data["_prices"][currency]
-                filtered = iqr_filter(prices)
-                avg = int(sum(filtered) / len(filtered)) if filtered else (int(sum(prices) / len(prices)) if prices else None)
-                min_v = min(filtered) if filtered else (min(prices) if prices else None)
-                volume = len(prices)
-                data[currency] = {"avg": avg, "min": min_v, "volume": volume}
-            del data["_prices"]
-            out.append(data)
-        return sorted(out, key=lambda x: x["timestamp"])
-
+    # period=None — вся история
     end_date = datetime.utcnow().date()
-    start_date = end_date - timedelta(days=period)
-    DPS = DailyPriceStats
+    if modification is not None:
+        DPS = DailyEnchantPriceStats
+        filters = [DPS.item_id == item_id, DPS.enchant_level == modification]
+    else:
+        DPS = DailyPriceStats
+        filters = [DPS.item_id == item_id]
     stmt = (
         select(DPS.day, DPS.currency, DPS.avg_price, DPS.min_price, DPS.volume)
         .where(
-            DPS.item_id == item_id,
-            DPS.day >= start_date,
+            *filters,
             DPS.day <= end_date
         )
         .order_by(DPS.day, DPS.currency)
     )
+    if period is not None:
+        stmt = stmt.where(DPS.day >= end_date - timedelta(days=period))
     result = await db.execute(stmt)
     rows = result.fetchall()
 
@@ -243,3 +465,76 @@ async def get_item_price_history(
             "volume": int(r.volume) if r.volume is not None else None,
         }
     return [grouped[d] for d in sorted(grouped.keys())]
+
+
+async def get_item_candles(
+        db: AsyncSession,
+        item_id: int,
+        interval: str,
+        start: datetime,
+        currency: Optional[str] = None,
+) -> list:
+    # Свечи собираются из часовых агрегатов: стоимость O(число часов), а не O(число сделок)
+    HPS = HourlyPriceStats
+    filters = [HPS.item_id == item_id, HPS.hour >= start]
+    if currency is not None:
+        filters.append(HPS.currency == currency)
+
+    if interval == "1h":
+        stmt = (
+            select(
+                HPS.hour.label("bucket"),
+                HPS.currency,
+                HPS.open_price,
+                HPS.high_price,
+                HPS.low_price,
+                HPS.close_price,
+                HPS.volume,
+            )
+            .where(*filters)
+            .order_by(HPS.hour, HPS.currency)
+        )
+    else:
+        bucket = func.date_bin(CANDLE_INTERVALS[interval], HPS.hour, CANDLE_ORIGIN).label("bucket")
+        stmt = (
+            select(
+                bucket,
+                HPS.currency,
+                func.array_agg(aggregate_order_by(HPS.open_price, HPS.hour.asc()), type_=ARRAY(BigInteger))[1]
+                .label("open_price"),
+                func.max(HPS.high_price).label("high_price"),
+                func.min(HPS.low_price).label("low_price"),
+                func.array_agg(aggregate_order_by(HPS.close_price, HPS.hour.desc()), type_=ARRAY(BigInteger))[1]
+                .label("close_price"),
+                func.sum(HPS.volume).label("volume"),
+            )
+            .where(*filters)
+            .group_by(bucket, HPS.currency)
+            .order_by(bucket, HPS.currency)
+        )
+    result = await db.execute(stmt)
+    return result.fetchall()
+
+
+async def get_daily_activity(db: AsyncSession, since: date):
+    DPS = DailyPriceStats
+    stmt = (
+        select(
+            DPS.item_id,
+            DPS.currency,
+            DPS.day.label("bucket"),
+            DPS.volume,
+            (DPS.avg_price * DPS.volume).label("price_sum"),
+        )
+        .where(DPS.day >= since)
+    )
+    result = await db.execute(stmt)
+    return result.all()
+
+
+async def get_trades_since(db: AsyncSession, since: datetime):
+    """Сырые сделки (item_id, currency, timestamp, price): часовые бакеты фильтруются по IQR в Python."""
+    PH = PriceHistory
+    stmt = select(PH.item_id, PH.currency, PH.timestamp, PH.price).where(PH.timestamp >= since)
+    result = await db.execute(stmt)
+    return result.all()
@@ -3,3 +3,4 @@ from .category import Category
 from .price import PriceHistory
 from .invite import InviteCode
 from .user import User
+from .dead_letter import DeadLetter
@@ -0,0 +1,24 @@
+from datetime import datetime
+from sqlalchemy import BigInteger, DateTime, Identity, Index, SmallInteger, String, Text, func
+from sqlalchemy.orm import Mapped, mapped_column
+from app.db.base import Base
+
+DEAD_LETTER_REASONS = ("parse_failed", "unknown_item")
+
+
+class DeadLetter(Base):
+    # Сообщения бота, которые не стали сделками; уже прочитаны в Telegram, поэтому хранятся здесь
+    __tablename__ = "dead_letters"
+    __table_args__ = (
+        Index("ix_dead_letters_reason", "reason"),
+    )
+
+    id: Mapped[int] = mapped_column(BigInteger, Identity(), primary_key=True)
+    # id сообщения в чате с ботом: повторное чтение той же страницы не создаёт дублей
+    message_id: Mapped[int] = mapped_column(BigInteger, unique=True)
+    text: Mapped[str] = mapped_column(Text)
+    reason: Mapped[str] = mapped_column(String(32))
+    item_name: Mapped[str | None] = mapped_column(String(200), nullable=True)
+    message_date: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+    attempts: Mapped[int] = mapped_column(SmallInteger, default=0, server_default="0")
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
@@ -1,28 +1,36 @@
 from datetime import datetime
-from sqlalchemy import ForeignKey, BigInteger, Integer, Text, DateTime, func, Index, Identity
+from sqlalchemy import ForeignKey, BigInteger, Integer, DateTime, String, func, Index, Sequence, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.db.base import Base
+from app.db.types import CurrencyType, SourceType, EnchantLevel
 
 
 class PriceHistory(Base):
+    # Секционирована по месяцам (RANGE по timestamp), поэтому timestamp входит в PK
     __tablename__ = "price_history"
     __table_args__ = (
         Index("ix_price_history_timestamp", "timestamp"),
         Index("ix_price_history_item_ts", "item_id", "timestamp"),
+        Index(
+            "ix_price_history_item_cur_ench_ts",
+            "item_id", "currency", "enchant_level", text('"timestamp" DESC'),
+            postgresql_include=["price"],
+        ),
+        {"postgresql_partition_by": "RANGE (timestamp)"},
     )
 
-    id: Mapped[int] = mapped_column(BigInteger, Identity(), primary_key=True)
-    item_id: Mapped[int] = mapped_column(ForeignKey("items.id"), index=True)
+    id: Mapped[int] = mapped_column(BigInteger, Sequence("price_history_id_seq"), primary_key=True)
+    item_id: Mapped[int] = mapped_column(ForeignKey("items.id"))
 
     price: Mapped[int] = mapped_column(BigInteger)
-    enchant_level: Mapped[int | None] = mapped_column(Text, nullable=True)
-    currency: Mapped[str] = mapped_column(Text, default="adena")
-    source: Mapped[str | None] = mapped_column(Text, nullable=True, default="auction_house")
+    enchant_level: Mapped[str | None] = mapped_column(EnchantLevel, nullable=True)
+    currency: Mapped[str] = mapped_column(CurrencyType, default="adena")
+    source: Mapped[str | None] = mapped_column(SourceType, nullable=True, default="auction_house")
 
     timestamp: Mapped[datetime] = mapped_column(
         DateTime(timezone=True),
         server_default=func.now(),
-        nullable=False
+        primary_key=True
     )
 
     item: Mapped["Item"] = relationship(
@@ -36,9 +44,53 @@ class DailyPriceStats(Base):
     __table_args__ = {"extend_existing": True}
 
     item_id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
-    currency: Mapped[str] = mapped_column(Text, primary_key=True)
+    currency: Mapped[str] = mapped_column(CurrencyType, primary_key=True)
     day: Mapped[datetime] = mapped_column(DateTime, primary_key=True)
     avg_price: Mapped[int] = mapped_column(BigInteger)
     min_price: Mapped[int] = mapped_column(BigInteger)
     max_price: Mapped[int] = mapped_column(BigInteger)
     volume: Mapped[int] = mapped_column(Integer)
+
+
+class DailyEnchantPriceStats(Base):
+    __tablename__ = "daily_enchant_price_stats"
+    __table_args__ = {"extend_existing": True}
+
+    item_id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    currency: Mapped[str] = mapped_column(CurrencyType, primary_key=True)
+    enchant_level: Mapped[str] = mapped_column(EnchantLevel, primary_key=True)
+    day: Mapped[datetime] = mapped_column(DateTime, primary_key=True)
+    avg_price: Mapped[int] = mapped_column(BigInteger)
+    min_price: Mapped[int] = mapped_column(BigInteger)
+    max_price: Mapped[int] = mapped_column(BigInteger)
+    volume: Mapped[int] = mapped_column(Integer)
+
+
+class HourlyPriceStats(Base):
+    __tablename__ = "hourly_price_stats"
+    __table_args__ = {"extend_existing": True}
+
+    item_id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    currency: Mapped[str] = mapped_column(CurrencyType, primary_key=True)
+    hour: Mapped[datetime] = mapped_column(DateTime(timezone=True), primary_key=True)
+    open_price: Mapped[int] = mapped_column(BigInteger)
+    high_price: Mapped[int] = mapped_column(BigInteger)
+    low_price: Mapped[int] = mapped_column(BigInteger)
+    close_price: Mapped[int] = mapped_column(BigInteger)
+    volume: Mapped[int] = mapped_column(Integer)
+
+
+class CoinRate(Base):
+    # Курс coin -> adena по часам и дням; среднее = price_sum / volume
+    __tablename__ = "coin_rate"
+    __table_args__ = (
+        Index("ix_coin_rate_updated_at", "updated_at"),
+    )
+
+    resolution: Mapped[str] = mapped_column(String, primary_key=True)
+    bucket: Mapped[datetime] = mapped_column(DateTime(timezone=True), primary_key=True)
+    price_sum: Mapped[int] = mapped_column(BigInteger)
+    volume: Mapped[int] = mapped_column(Integer)
+    min_price: Mapped[int] = mapped_column(BigInteger)
+    max_price: Mapped[int] = mapped_column(BigInteger)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
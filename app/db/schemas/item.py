@@ -41,11 +41,18 @@ class ItemOut(BaseModel):
 
 class ItemSearchOut(BaseModel):
     Items: List[ItemOut]
-    Total: int
+    Total: Optional[int] = Field(default=None, description="Only computed for the first page")
+    NextCursor: Optional[str] = None
 
     class Config:
         from_attributes = True
 
+class ItemSuggestion(BaseModel):
+    id: int
+    name: str
+    category: Optional[CategoryShort] = None
+
+
 class ItemActivity(BaseModel):
     id: int
     origin_id: Optional[int] = Field(default=None, example=12345)
@@ -36,3 +36,28 @@ class PriceHistory(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+
+class PriceCandle(BaseModel):
+    timestamp: datetime = Field(..., example="2023-10-01T12:00:00Z")
+    currency: str = Field(..., example="adena")
+    open: int = Field(..., example=3600000)
+    high: int = Field(..., example=3700000)
+    low: int = Field(..., example=3500000)
+    close: int = Field(..., example=3650000)
+    volume: int = Field(..., example=12)
+
+    class Config:
+        from_attributes = True
+
+
+class CoinRatePoint(BaseModel):
+    timestamp: datetime = Field(..., example="2023-10-01T12:00:00Z")
+    avg: int = Field(..., example=1000)
+    min: int = Field(..., example=950)
+    max: int = Field(..., example=1100)
+    volume: int = Field(..., example=8)
+
+    class Config:
+        from_attributes = True
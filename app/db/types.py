@@ -0,0 +1,59 @@
+from typing import Optional
+
+from sqlalchemy import SmallInteger
+from sqlalchemy.dialects.postgresql import ENUM
+from sqlalchemy.types import TypeDecorator
+
+CURRENCIES = ("adena", "coin", "unknown")
+SOURCES = ("auction_house", "world_trade", "private_store", "private_trade", "unknown")
+
+CurrencyType = ENUM(*CURRENCIES, name="price_currency", create_type=False)
+SourceType = ENUM(*SOURCES, name="price_source", create_type=False)
+
+# enchant_level хранится в smallint:
+#   0..99          — уровень заточки как есть
+#   100*(a+1) + b  — диапазон "a-b" от классификатора
+#   -1             — "Сет"
+SET_LABEL = "Сет"
+SET_CODE = -1
+RANGE_BASE = 100
+
+
+def encode_enchant_level(label) -> Optional[int]:
+    if label is None:
+        return None
+    if isinstance(label, int):
+        return label
+    label = str(label).strip()
+    if not label or label == "None":
+        return None
+    if label == SET_LABEL:
+        return SET_CODE
+    if label.isdigit() and int(label) < RANGE_BASE:
+        return int(label)
+    low, sep, high = label.partition("-")
+    if sep and low.isdigit() and high.isdigit() and int(low) < RANGE_BASE and int(high) < RANGE_BASE:
+        return RANGE_BASE * (int(low) + 1) + int(high)
+    raise ValueError(f"Unsupported enchant level: {label!r}")
+
+
+def decode_enchant_level(code: Optional[int]) -> Optional[str]:
+    if code is None:
+        return None
+    if code == SET_CODE:
+        return SET_LABEL
+    if 0 <= code < RANGE_BASE:
+        return str(code)
+    return f"{code // RANGE_BASE - 1}-{code % RANGE_BASE}"
+
+
+class EnchantLevel(TypeDecorator):
+    """Строковые метки заточки ("7", "3-5", "Сет") поверх smallint-кода."""
+    impl = SmallInteger
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return encode_enchant_level(value)
+
+    def process_result_value(self, value, dialect):
+        return decode_enchant_level(value)
@@ -1,23 +1,22 @@
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.api.router import api_router
 from app.config import is_production, origins_map
-from app.core.db import init_db
-from app.core.logger import setup_logging
+from app.core.db import init_db, AsyncSessionLocal
+from app.core.logger import setup_logging, stop_logging
 from app.core.redis import startup_redis
-from app.services import controls
+from app.core.timing import TimingMiddleware
+from app.services import search_index
 
-setup_logging()
 app = FastAPI(
     title="L2 Market API",
     description="Userbot-based Telegram price tracker",
     version="0.1.0",
-    on_startup=[startup_redis]
+    # Логи настраиваются при старте, а не при импорте: импорт app.main не пишет на диск
+    on_startup=[setup_logging, startup_redis],
+    on_shutdown=[stop_logging],
 )
 
-scheduler = AsyncIOScheduler()
-
 origins = origins_map["production" if is_production() else "development"]
 
 app.include_router(api_router)
@@ -26,15 +25,14 @@ app.add_middleware(
     allow_origins=origins,
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-    allow_headers=["Content-Type", "Authorization", "Accept"]
+    allow_headers=["Content-Type", "Authorization", "Accept"],
+    expose_headers=["X-Next-Cursor"]
 )
+# Снаружи CORS: в Server-Timing попадает всё время обработки
+app.add_middleware(TimingMiddleware)
 
 @app.on_event("startup")
 async def on_startup():
     await init_db()
-    scheduler.add_job(controls.collect_prices,
-                      trigger="interval",
-                      minutes=30,
-                      max_instances=1,
-                      id="collect_prices")
-    scheduler.start()
+    async with AsyncSessionLocal() as session:
+        await search_index.rebuild_index(session)
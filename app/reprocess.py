@@ -0,0 +1,31 @@
+"""Re-run dead-lettered bot messages after parser fixes or catalog additions.
+
+    python -m app.reprocess [--reason parse_failed|unknown_item] [--batch-size 2500]
+
+Telegram is not touched: messages come from the dead_letters table. Run one instance at a time.
+"""
+import argparse
+import asyncio
+
+from app.core.logger import setup_logging, stop_logging
+from app.core.redis import startup_redis
+from app.db.models.dead_letter import DEAD_LETTER_REASONS
+from app.telegram.service import PARTIAL_SAVE_SIZE, reprocess_dead_letters
+
+
+async def main(reason: str | None, batch_size: int):
+    setup_logging()
+    await startup_redis()
+    try:
+        stats = await reprocess_dead_letters(reason=reason, batch_size=batch_size)
+        print(f"dead letters {stats.messages}, saved {stats.saved}, still unresolved {stats.dead_letters}")
+    finally:
+        stop_logging()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--reason", choices=DEAD_LETTER_REASONS)
+    parser.add_argument("--batch-size", type=int, default=PARTIAL_SAVE_SIZE)
+    args = parser.parse_args()
+    asyncio.run(main(args.reason, args.batch_size))
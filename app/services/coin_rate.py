@@ -0,0 +1,123 @@
+import asyncio
+import time
+from bisect import bisect_left, bisect_right, insort
+from datetime import date, datetime, timedelta, timezone
+from typing import Literal, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.crud import price as crud
+from app.db.schemas.price import CoinRatePoint
+from app.core import logger
+
+logger = logger.get_logger(__name__)
+
+# Ingest может идти в другом процессе: раз в интервал догружаем изменившиеся бакеты
+SYNC_INTERVAL = 60
+# Строки коммитятся чуть позже своего updated_at: перекрытие не даёт пропустить такие строки
+SYNC_OVERLAP = timedelta(minutes=5)
+# Страховка от коммитов позже перекрытия: раз в интервал серия перечитывается целиком
+FULL_SYNC_INTERVAL = 3600
+
+Resolution = Literal["hour", "day"]
+
+
+class CoinRateSeries:
+    def __init__(self):
+        self.points: dict[str, dict[datetime, CoinRatePoint]] = {"hour": {}, "day": {}}
+        self._buckets: dict[str, list[datetime]] = {"hour": [], "day": []}
+        self.watermark: Optional[datetime] = None
+        self.synced_at = float("-inf")
+        self.full_synced_at = float("-inf")
+
+    def apply(self, rows) -> None:
+        for row in rows:
+            points = self.points[row.resolution]
+            if row.bucket not in points:
+                insort(self._buckets[row.resolution], row.bucket)
+            points[row.bucket] = CoinRatePoint(
+                timestamp=row.bucket,
+                avg=row.price_sum // row.volume,
+                min=row.min_price,
+                max=row.max_price,
+                volume=row.volume,
+            )
+            if self.watermark is None or row.updated_at > self.watermark:
+                self.watermark = row.updated_at
+
+    def at(self, resolution: Resolution, ts: datetime) -> Optional[CoinRatePoint]:
+        """Последний бакет, начавшийся не позже ts."""
+        buckets = self._buckets[resolution]
+        pos = bisect_right(buckets, ts)
+        return self.points[resolution][buckets[pos - 1]] if pos else None
+
+    def range(self, resolution: Resolution, start: datetime, end: Optional[datetime] = None) -> list[CoinRatePoint]:
+        buckets = self._buckets[resolution]
+        lo = bisect_left(buckets, start)
+        hi = bisect_right(buckets, end) if end is not None else len(buckets)
+        return [self.points[resolution][b] for b in buckets[lo:hi]]
+
+
+_series = CoinRateSeries()
+_sync_lock = asyncio.Lock()
+
+
+def _utc(ts: datetime) -> datetime:
+    return ts.replace(tzinfo=timezone.utc) if ts.tzinfo is None else ts
+
+
+async def sync(db: AsyncSession, force: bool = False) -> CoinRateSeries:
+    if not force and time.monotonic() - _series.synced_at < SYNC_INTERVAL:
+        return _series
+    async with _sync_lock:
+        if not force and time.monotonic() - _series.synced_at < SYNC_INTERVAL:
+            return _series
+        now = time.monotonic()
+        first = _series.watermark is None
+        full = first or now - _series.full_synced_at >= FULL_SYNC_INTERVAL
+        since = None if full else _series.watermark - SYNC_OVERLAP
+        rows = await crud.get_coin_rates(db, updated_since=since)
+        _series.apply(rows)
+        _series.synced_at = now
+        if full:
+            _series.full_synced_at = now
+        if first:
+            logger.info(f"Coin rate series loaded: {len(_series.points['hour'])} hours, "
+                        f"{len(_series.points['day'])} days")
+    return _series
+
+
+async def get_rate(
+        db: AsyncSession,
+        at: Optional[datetime] = None,
+        resolution: Resolution = "hour",
+        aggregate: str = "avg",
+) -> Optional[int]:
+    series = await sync(db)
+    point = series.at(resolution, _utc(at or datetime.now(timezone.utc)))
+    if point is None:
+        return None
+    return point.avg if aggregate == "avg" else point.min
+
+
+async def get_rate_on_day(db: AsyncSession, day: date, aggregate: str = "avg") -> Optional[int]:
+    series = await sync(db)
+    point = series.points["day"].get(datetime(day.year, day.month, day.day, tzinfo=timezone.utc))
+    if point is None:
+        return None
+    return point.avg if aggregate == "avg" else point.min
+
+
+async def get_daily_rates(db: AsyncSession, start: date, end: date, aggregate: str = "avg") -> dict[date, int]:
+    series = await sync(db)
+    points = series.range(
+        "day",
+        datetime(start.year, start.month, start.day, tzinfo=timezone.utc),
+        datetime(end.year, end.month, end.day, tzinfo=timezone.utc),
+    )
+    return {p.timestamp.date(): p.avg if aggregate == "avg" else p.min for p in points}
+
+
+async def get_history(db: AsyncSession, resolution: Resolution, period: int) -> list[CoinRatePoint]:
+    series = await sync(db)
+    return series.range(resolution, datetime.now(timezone.utc) - timedelta(days=period))
@@ -1,23 +1,102 @@
 import asyncio
+from datetime import datetime, timezone
 
-from app.telegram.service import fetch_and_store_messages
+from redis import RedisError
+
+from app.core.leader import lease, INSTANCE_ID, LeaseLost
+from app.core.redis import get_redis_client
 from app.core import logger
 
 logger = logger.get_logger(__name__)
 
+# Статус сбора общий для всех процессов: любой воркер API отдаёт состояние лидера
+STATUS_KEY = "ingest:status"
+# Запросы на сбор от не-лидеров; лидер забирает их BLPOP
+TRIGGER_KEY = "ingest:trigger"
+
 collect_prices_task = None
+
+
+async def _set_status(**fields) -> None:
+    try:
+        redis = await get_redis_client()
+        await redis.hset(STATUS_KEY, mapping=fields)
+    except RedisError as e:
+        logger.warning(f"Cannot update ingestion status: {e}")
+
+
 async def collect_prices():
+    # Telethon нужен только воркеру: API импортирует этот модуль ради триггера и статуса
+    from app.services import leaderboard
+    from app.telegram.service import fetch_and_store_messages
+
+    await _set_status(state="running", instance=INSTANCE_ID,
+                      started_at=datetime.now(timezone.utc).isoformat(), error="")
+    error = ""
     try:
-        await fetch_and_store_messages()
+        # Пересборка лидерборда не идёт посреди сбора
+        async with leaderboard.ingest_lock:
+            # Продление аренды в цикле выборов может не успеть за долгим flush: перед commit проверяем сами
+            await fetch_and_store_messages(confirm=lease.confirm)
     except asyncio.CancelledError:
+        error = "cancelled"
         raise
+    except LeaseLost as e:
+        # Незакоммиченная пачка откатится, сообщения остались непрочитанными — их соберёт новый лидер
+        error = str(e)
+        logger.warning(f"collect_prices aborted: {e}")
     except Exception as e:
+        error = str(e)
         logger.exception(f"collect_prices error: {e}")
+    finally:
+        await _set_status(state="idle", finished_at=datetime.now(timezone.utc).isoformat(), error=error)
+
 
 def start_collect_prices():
+    if not lease.is_leader:
+        return False
     loop = asyncio.get_event_loop()
     global collect_prices_task
     if collect_prices_task is None or collect_prices_task.done():
         collect_prices_task = loop.create_task(collect_prices())
         return True
     return False
+
+
+async def scheduled_collect_prices():
+    start_collect_prices()
+
+
+async def cancel_collect_prices():
+    # Лидерство потеряно: сбор продолжит новый лидер
+    if collect_prices_task is not None and not collect_prices_task.done():
+        collect_prices_task.cancel()
+
+
+async def wait_for_trigger(timeout: float):
+    redis = await get_redis_client()
+    if await redis.blpop([TRIGGER_KEY], timeout=int(timeout)):
+        start_collect_prices()
+
+
+async def get_status() -> dict:
+    redis = await get_redis_client()
+    status = await redis.hgetall(STATUS_KEY)
+    status["leader"] = await lease.holder()
+    return status
+
+
+async def request_collect_prices() -> tuple[str, dict]:
+    if lease.is_leader:
+        result = "started" if start_collect_prices() else "running"
+        return result, await get_status()
+    status = await get_status()
+    if status.get("state") == "running":
+        return "running", status
+    redis = await get_redis_client()
+    pipe = redis.pipeline()
+    pipe.rpush(TRIGGER_KEY, INSTANCE_ID)
+    # Повторные запросы до старта сбора схлопываются в один
+    pipe.ltrim(TRIGGER_KEY, 0, 0)
+    await pipe.execute()
+    return ("requested" if status["leader"] else "queued"), status
@@ -1,18 +1,22 @@
+from redis import RedisError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db.crud import item as crud
 from app.db.schemas.category import CategoryShort
-from app.db.schemas.item import ItemCreate, ItemUpdate, ItemOut, ItemActivity, ItemSearchOut
+from app.db.schemas.item import ItemCreate, ItemUpdate, ItemOut, ItemActivity, ItemSearchOut, ItemSuggestion
 from app.core.redis import redis_cache
+from app.services import leaderboard, search_index
 
 
 async def create_item(db: AsyncSession, item_in: ItemCreate) -> ItemOut:
-    return await crud.create_item(db, item_in)
+    item = await crud.create_item(db, item_in)
+    await search_index.rebuild_index(db)
+    return item
 
 
-async def get_items(db: AsyncSession, page: int, page_size: int) -> list[ItemOut]:
-    items = await crud.get_items(db, page, page_size)
-    return [ItemOut.model_validate(item) for item in items]
+async def get_items(db: AsyncSession, page_size: int, cursor: str | None = None) -> tuple[list[ItemOut], str | None]:
+    items, next_cursor = await crud.get_items(db, page_size, cursor)
+    return [ItemOut.model_validate(item) for item in items], next_cursor
 
 
 async def get_item(db: AsyncSession, item_id: int) -> ItemOut | None:
@@ -20,16 +24,38 @@ async def get_item(db: AsyncSession, item_id: int) -> ItemOut | None:
 
 
 async def update_item(db: AsyncSession, item_id: int, item_in: ItemUpdate) -> ItemOut | None:
-    return await crud.update_item(db, item_id, item_in)
+    item = await crud.update_item(db, item_id, item_in)
+    if item:
+        await search_index.rebuild_index(db)
+    return item
 
 
 async def delete_item(db: AsyncSession, item_id: int) -> bool:
-    return await crud.delete_item(db, item_id)
+    deleted = await crud.delete_item(db, item_id)
+    if deleted:
+        await search_index.rebuild_index(db)
+    return deleted
+
+
+async def get_top_active_items(
+        db: AsyncSession,
+        category_id: int | None = None,
+        window: leaderboard.Window = "7d",
+) -> list[ItemActivity]:
+    try:
+        top = await leaderboard.top(db, window=window, category_id=category_id)
+    except RedisError:
+        top = None
+    if top is not None:
+        return top
+    return await _get_top_active_items_sql(db, category_id=category_id, window=window)
 
 
 @redis_cache(ttl=7200, model=ItemActivity, is_list=True)
-async def get_top_active_items(db: AsyncSession, category_id: int | None = None) -> list[ItemActivity]:
-    volatility = await crud.get_top_active_items(db, category_id=category_id)
+async def _get_top_active_items_sql(db: AsyncSession, category_id: int | None, window: str) -> list[ItemActivity]:
+    volatility = await crud.get_top_active_items(
+        db, days=leaderboard.WINDOW_DAYS[window], limit=leaderboard.DEFAULT_LIMIT, category_id=category_id
+    )
     return [
         ItemActivity(
             id=row[0],
@@ -43,6 +69,10 @@ async def get_top_active_items(db: AsyncSession, category_id: int | None = None)
     ]
 
 
-async def search_items(db: AsyncSession, query: str, page: int = 1, page_size: int = 20) -> ItemSearchOut:
-    items = await crud.search_items_by_name(db, query, page, page_size)
+async def search_items(db: AsyncSession, query: str, page_size: int = 20, cursor: str | None = None) -> ItemSearchOut:
+    items = await crud.search_items_by_name(db, query, page_size, cursor)
     return items
+
+
+async def autocomplete(db: AsyncSession, query: str, limit: int = 10) -> list[ItemSuggestion]:
+    return await search_index.autocomplete(db, query, limit)
@@ -0,0 +1,229 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Literal, Optional
+
+from redis import RedisError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.redis import get_redis_client, clear_cache
+from app.db.crud import price as crud
+from app.db.schemas.item import ItemActivity
+from app.db.schemas.price import PriceCreate
+from app.services import search_index
+from app.core import logger
+
+logger = logger.get_logger(__name__)
+
+# Ключи:
+#   leaderboard:{h|d}:{bucket}:{category_id|all}  ZSET "{item_id}:{currency}" -> число сделок
+#   leaderboard:{h|d}:{bucket}:price              HASH "{item_id}:{currency}" -> сумма цен
+#   leaderboard:w:{window}:{category_id|all}      ZSET объединение бакетов окна, живёт WINDOW_TTL
+#   leaderboard:built                             признак того, что бакеты полные
+#   leaderboard:staging:...                       бакеты пересборки до переименования в живые
+PREFIX = "leaderboard"
+BUILT_KEY = f"{PREFIX}:built"
+STAGING = f"{PREFIX}:staging"
+# Сбор и пересборка идут в процессе-лидере и не пересекаются: сделки, закоммиченные до чтения
+# пересборкой, но дописанные в Redis после него, иначе посчитались бы дважды или потерялись
+ingest_lock = asyncio.Lock()
+ALL = "all"
+
+Window = Literal["24h", "7d", "30d"]
+# окно -> (разрешение бакета, число бакетов)
+WINDOWS: dict[str, tuple[str, int]] = {"24h": ("h", 24), "7d": ("d", 7), "30d": ("d", 30)}
+WINDOW_DAYS = {"24h": 1, "7d": 7, "30d": 30}
+BUCKET_TTL = {"h": timedelta(hours=25), "d": timedelta(days=31)}
+WINDOW_TTL = 300
+DEFAULT_LIMIT = 15
+
+
+def _bucket(ts: datetime, resolution: str) -> datetime:
+    ts = ts.replace(tzinfo=timezone.utc) if ts.tzinfo is None else ts.astimezone(timezone.utc)
+    ts = ts.replace(minute=0, second=0, microsecond=0)
+    return ts.replace(hour=0) if resolution == "d" else ts
+
+
+def _bucket_id(bucket: datetime, resolution: str) -> str:
+    return bucket.strftime("%Y%m%d%H" if resolution == "h" else "%Y%m%d")
+
+
+def _member(item_id: int, currency: str) -> str:
+    return f"{item_id}:{currency}"
+
+
+def _window_buckets(window: str, now: datetime) -> tuple[str, list[str]]:
+    resolution, count = WINDOWS[window]
+    step = timedelta(hours=1) if resolution == "h" else timedelta(days=1)
+    last = _bucket(now, resolution)
+    return resolution, [_bucket_id(last - i * step, resolution) for i in range(count)]
+
+
+async def _write(redis, groups: dict[tuple, tuple[int, int]], prefix: str = PREFIX) -> set[str]:
+    # groups: (resolution, bucket, item_id, currency, category_id) -> (volume, price_sum)
+    now = datetime.now(timezone.utc)
+    written = set()
+    pipe = redis.pipeline(transaction=False)
+    for (resolution, bucket, item_id, currency, category_id), (volume, price_sum) in groups.items():
+        expire_at = bucket + BUCKET_TTL[resolution]
+        if expire_at <= now or not volume:
+            continue
+        bucket_id = _bucket_id(bucket, resolution)
+        member = _member(item_id, currency)
+        for category in (ALL, category_id):
+            key = f"{prefix}:{resolution}:{bucket_id}:{category}"
+            pipe.zincrby(key, volume, member)
+            pipe.expireat(key, expire_at)
+            written.add(key)
+        price_key = f"{prefix}:{resolution}:{bucket_id}:price"
+        pipe.hincrby(price_key, member, int(price_sum))
+        pipe.expireat(price_key, expire_at)
+        written.add(price_key)
+    await pipe.execute()
+    return written
+
+
+def _filtered_groups(keys: list[tuple], prices: list[int]) -> dict[tuple, tuple[int, int]]:
+    """(объём, сумма цен) по группам после IQR-фильтра; одна векторная проходка на все группы."""
+    if not keys:
+        return {}
+    import numpy as np
+    from app.utils.stats import grouped_iqr_stats
+
+    numbers: dict[tuple, int] = {}
+    group_ids = np.fromiter((numbers.setdefault(k, len(numbers)) for k in keys), dtype=np.int64, count=len(keys))
+    stats = grouped_iqr_stats(prices, group_ids)
+    # Как в daily_price_stats: выбросы не попадают ни в объём, ни в цену
+    kept = group_ids[stats["mask"]]
+    volume = np.bincount(kept, minlength=len(numbers))
+    price_sum = np.zeros(len(numbers), dtype=np.int64)
+    np.add.at(price_sum, kept, np.asarray(prices, dtype=np.int64)[stats["mask"]])
+    return {k: (int(volume[g]), int(price_sum[g])) for k, g in numbers.items()}
+
+
+async def record_prices(prices: Iterable[PriceCreate]) -> None:
+    """Добавляет пачку сделок в бакеты лидерборда; ошибка Redis переводит чтение на SQL до ребилда."""
+    keys, values = [], []
+    for price in prices:
+        item = price.item
+        if item is None or item.category is None:
+            continue
+        for resolution in ("h", "d"):
+            keys.append((resolution, _bucket(price.timestamp, resolution), item.id, price.currency, item.category.id))
+            values.append(price.price)
+    groups = _filtered_groups(keys, values)
+    try:
+        redis = await get_redis_client()
+        await _write(redis, groups)
+        await clear_cache(redis, prefix=f"{PREFIX}:w")
+    except RedisError as e:
+        logger.warning(f"Leaderboard update failed, falling back to SQL until rebuild: {e}")
+        try:
+            await (await get_redis_client()).delete(BUILT_KEY)
+        except RedisError:
+            pass
+
+
+async def rebuild(db: AsyncSession) -> None:
+    """Пересобирает бакеты: дни из daily_price_stats, часы из price_history за последние сутки.
+
+    Новые бакеты пишутся в staging-ключи и одной транзакцией переименовываются поверх живых:
+    top() не видит пустых или наполовину собранных бакетов.
+    """
+    async with ingest_lock:
+        index = await search_index.get_index(db)
+        now = datetime.now(timezone.utc)
+        day_rows = await crud.get_daily_activity(db, (now - BUCKET_TTL["d"]).date())
+        trades = await crud.get_trades_since(db, _bucket(now - BUCKET_TTL["h"], "h"))
+
+        groups = {}
+        for r in day_rows:
+            entry = index.get(r.item_id)
+            if entry is None or entry.category is None:
+                continue
+            groups[("d", _bucket(r.bucket, "d"), r.item_id, r.currency, entry.category.id)] = (
+                int(r.volume), int(r.price_sum)
+            )
+        # Часы из сырых сделок: тот же IQR-фильтр, что и при записи пачек
+        keys, values = [], []
+        for r in trades:
+            entry = index.get(r.item_id)
+            if entry is None or entry.category is None:
+                continue
+            keys.append(("h", _bucket(r.timestamp, "h"), r.item_id, r.currency, entry.category.id))
+            values.append(r.price)
+        groups.update(_filtered_groups(keys, values))
+
+        redis = await get_redis_client()
+        await clear_cache(redis, prefix=STAGING)
+        staged = await _write(redis, groups, prefix=STAGING)
+        live = {staging_key.replace(STAGING, PREFIX, 1): staging_key for staging_key in staged}
+        stale = [key async for key in redis.scan_iter(match=f"{PREFIX}:[hd]:*", count=500) if key not in live]
+        pipe = redis.pipeline(transaction=True)
+        if stale:
+            pipe.unlink(*stale)
+        for key, staging_key in live.items():
+            pipe.rename(staging_key, key)
+        # Признак готовности — последним, в той же транзакции
+        pipe.set(BUILT_KEY, now.isoformat())
+        await pipe.execute()
+    await clear_cache(redis, prefix=f"{PREFIX}:w")
+    logger.info(f"Leaderboard rebuilt: {len(groups)} buckets")
+
+
+async def ensure_built(db: AsyncSession) -> None:
+    try:
+        if not await (await get_redis_client()).exists(BUILT_KEY):
+            await rebuild(db)
+    except RedisError as e:
+        logger.warning(f"Leaderboard rebuild skipped: {e}")
+
+
+async def top(
+        db: AsyncSession,
+        window: Window = "7d",
+        category_id: Optional[int] = None,
+        limit: int = DEFAULT_LIMIT,
+) -> Optional[list[ItemActivity]]:
+    """Топ по числу сделок за окно; None — лидерборд не собран, нужен SQL."""
+    redis = await get_redis_client()
+    if not await redis.exists(BUILT_KEY):
+        return None
+    resolution, bucket_ids = _window_buckets(window, datetime.now(timezone.utc))
+    category = category_id if category_id is not None else ALL
+    window_key = f"{PREFIX}:w:{window}:{category}"
+    if not await redis.exists(window_key):
+        keys = [f"{PREFIX}:{resolution}:{b}:{category}" for b in bucket_ids]
+        pipe = redis.pipeline()
+        pipe.zunionstore(window_key, keys)
+        pipe.expire(window_key, WINDOW_TTL)
+        await pipe.execute()
+
+    ranked = await redis.zrevrange(window_key, 0, limit - 1, withscores=True)
+    if not ranked:
+        return []
+    members = [m for m, _ in ranked]
+    pipe = redis.pipeline(transaction=False)
+    for b in bucket_ids:
+        pipe.hmget(f"{PREFIX}:{resolution}:{b}:price", members)
+    price_sums = [0] * len(members)
+    for values in await pipe.execute():
+        for i, v in enumerate(values):
+            if v is not None:
+                price_sums[i] += int(v)
+
+    index = await search_index.get_index(db)
+    out = []
+    for (member, volume), price_sum in zip(ranked, price_sums):
+        item_id, currency = member.split(":", 1)
+        entry = index.get(int(item_id))
+        if entry is None or entry.category is None:
+            continue
+        out.append(ItemActivity(
+            id=entry.id,
+            name=entry.name,
+            category=entry.category,
+            currency=currency,
+            activity=int(volume),
+            price=round(price_sum / volume) if volume else None,
+        ))
+    return out
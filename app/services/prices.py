@@ -1,17 +1,25 @@
+import asyncio
+import csv
+import io
+import json
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List, Optional, Literal
-from datetime import date, timedelta, datetime, time
+from typing import AsyncIterator, List, Optional, Literal
+from datetime import date, timedelta, datetime, time, timezone
 
+from app.core.db import get_read_sessionmaker
+from app.db import archive
 from app.db.crud import price as crud
-from app.db.schemas.price import PriceHistory
+from app.db.schemas.price import PriceHistory, PriceCandle, CoinRatePoint
 from app.core.redis import redis_cache
+from app.services import coin_rate
 
+FULL_HISTORY_MAX_POINTS = 500
 
-@redis_cache(ttl=7200, is_list=True)
-async def get_coin_price_map_cached(db: AsyncSession, start_day: date, end_day: date, aggregate: str = "avg"):
-    raw_map = await crud.get_coin_price_map(db, start_day, end_day, aggregate)
-    coin_map = { (dt.date() if isinstance(dt, datetime) else dt).isoformat(): price for dt, price in raw_map.items() }
-    return coin_map
+
+def _as_utc(ts: Optional[datetime]) -> Optional[datetime]:
+    if ts is None:
+        return None
+    return ts.replace(tzinfo=timezone.utc) if ts.tzinfo is None else ts.astimezone(timezone.utc)
 
 
 @redis_cache(ttl=7200, model=PriceHistory, is_list=True)
@@ -19,30 +27,33 @@ async def get_item_price_history(
     db: AsyncSession,
     item_id: int,
     period: int | Literal["all"],
-    modification: str = None
+    modification: str = None,
+    max_points: Optional[int] = None
 ) -> Optional[List[PriceHistory]]:
     if period == "all":
-        period = 90
+        period = None
+        if max_points is None:
+            max_points = FULL_HISTORY_MAX_POINTS
     rows = await crud.get_item_price_history(db, item_id, period, modification)
     if not rows:
         return None
+    if max_points:
+        from app.utils.series import downsample_history
+        rows = downsample_history(rows, max_points)
 
     min_day = min(r["timestamp"] for r in rows)
     max_day = max(r["timestamp"] for r in rows)
     start_day = min_day if isinstance(min_day, date) and not isinstance(min_day, datetime) else min_day.date()
     end_day = max_day if isinstance(max_day, date) and not isinstance(max_day, datetime) else max_day.date()
 
-    coin_map = await get_coin_price_map_cached(db, start_day, end_day, aggregate="avg")
+    coin_map = await coin_rate.get_daily_rates(db, start_day, end_day, aggregate="avg")
 
     result: List[PriceHistory] = []
     for row in rows:
         ts = row["timestamp"]
         if isinstance(ts, date) and not isinstance(ts, datetime):
             ts = datetime.combine(ts, time.min)
-        coin_price = None
-        day_key = ts.date().isoformat()
-        if day_key in coin_map:
-            coin_price = coin_map[day_key]
+        coin_price = coin_map.get(ts.date())
         out = PriceHistory(
             adena_avg=row.get("adena", {}).get("avg") if row.get("adena") else None,
             adena_min=row.get("adena", {}).get("min") if row.get("adena") else None,
@@ -57,14 +68,39 @@ async def get_item_price_history(
     return result
 
 
+@redis_cache(ttl=7200, model=PriceCandle, is_list=True)
+async def get_item_candles(
+    db: AsyncSession,
+    item_id: int,
+    interval: Literal["1h", "4h", "1d", "1w"] = "1d",
+    period: int = 30,
+    currency: Optional[str] = None
+) -> List[PriceCandle]:
+    start = datetime.combine(date.today() - timedelta(days=period), time.min, tzinfo=timezone.utc)
+    rows = await crud.get_item_candles(db, item_id, interval, start, currency)
+    return [
+        PriceCandle(
+            timestamp=r.bucket,
+            currency=r.currency,
+            open=r.open_price,
+            high=r.high_price,
+            low=r.low_price,
+            close=r.close_price,
+            volume=r.volume,
+        )
+        for r in rows
+    ]
+
+
 @redis_cache(ttl=7200, model=PriceHistory)
 async def get_coin_price_on_day(
     db: AsyncSession,
     aggregate: str = "avg"
 ) -> Optional[PriceHistory]:
-    coin = await crud.get_coin_price_on_day(db, date.today(), aggregate=aggregate)
+    today = datetime.now(timezone.utc).date()
+    coin = await coin_rate.get_rate_on_day(db, today, aggregate=aggregate)
     if not coin:
-        coin = await crud.get_coin_price_on_day(db, date.today() - timedelta(days=1), "avg")
+        coin = await coin_rate.get_rate_on_day(db, today - timedelta(days=1), "avg")
     return PriceHistory(
         adena_avg=None,
         adena_min=None,
@@ -79,16 +115,10 @@ async def get_coin_price_on_day(
 
 async def get_coin_price(
     db: AsyncSession,
-    to_date: Optional[str] = None,
+    to_date: Optional[datetime] = None,
     aggregate: str = "avg"
 ) -> Optional[PriceHistory]:
-    dt_to = None
-    if to_date:
-        try:
-            dt_to = datetime.fromisoformat(to_date)
-        except:
-            dt_to = None
-    price = await crud.get_coin_price(db, dt_to, aggregate)
+    price = await coin_rate.get_rate(db, to_date, "hour", aggregate)
     if not price:
         return None
     return PriceHistory(
@@ -101,3 +131,56 @@ async def get_coin_price(
         coin_price=price,
         timestamp=datetime.combine(date.today(), time.min)
     )
+
+
+async def get_coin_history(
+    db: AsyncSession,
+    resolution: Literal["hour", "day"] = "day",
+    period: int = 30
+) -> List[CoinRatePoint]:
+    return await coin_rate.get_history(db, resolution, period)
+
+
+TRADE_FIELDS = ("id", "item_id", "price", "currency", "enchant_level", "source", "timestamp")
+
+
+def _format_trades(rows, fmt: str) -> str:
+    if fmt == "csv":
+        buf = io.StringIO()
+        csv.writer(buf).writerows((*r[:6], r[6].isoformat()) for r in rows)
+        return buf.getvalue()
+    return "".join(
+        json.dumps(dict(zip(TRADE_FIELDS, r)), default=str, ensure_ascii=False) + "\n"
+        for r in rows
+    )
+
+
+async def export_trades(
+    fmt: Literal["ndjson", "csv"] = "ndjson",
+    item_id: Optional[int] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    currency: Optional[str] = None,
+    source: Optional[str] = None,
+    enchant_level: Optional[str] = None,
+) -> AsyncIterator[str]:
+    # Время в архиве и в БД с зоной: наивные границы из запроса считаем UTC,
+    # иначе сравнение с timestamp в pyarrow/datetime падает
+    filters = dict(item_id=item_id, start=_as_utc(start), end=_as_utc(end), currency=currency,
+                   source=source, enchant_level=enchant_level)
+    if fmt == "csv":
+        buf = io.StringIO()
+        csv.writer(buf).writerow(TRADE_FIELDS)
+        yield buf.getvalue()
+
+    # Сначала архивные месяцы (их строк в БД уже нет); внутри месяца порядок (item_id, timestamp),
+    # как в файле: сортировка по времени потребовала бы читать месяц в память. Строки из БД — по времени.
+    # Для одного item_id оба источника дают порядок по времени (порядок описан в README)
+    archived = archive.iter_archived_trades(**filters)
+    while (rows := await asyncio.to_thread(next, archived, None)) is not None:
+        yield _format_trades(rows, fmt)
+
+    # Own session: the request-scoped one is closed before StreamingResponse starts sending
+    async with (await get_read_sessionmaker())() as session:
+        async for rows in crud.stream_price_history(session, **filters):
+            yield _format_trades(rows, fmt)
@@ -0,0 +1,66 @@
+import asyncio
+import os
+from datetime import date, datetime, timezone
+from typing import Optional
+
+from app.config import get_archive_retention_months
+from app.core import logger
+from app.core.db import AsyncSessionLocal
+from app.db import archive
+from app.db.crud import price as crud
+
+logger = logger.get_logger(__name__)
+
+
+def _horizon(months: int) -> date:
+    today = datetime.now(timezone.utc).date()
+    total = today.year * 12 + today.month - 1 - months
+    return date(total // 12, total % 12 + 1, 1)
+
+
+async def _archive_partition(name: str, month: date) -> Optional[str]:
+    start, end = archive.month_bounds(month)
+    writer = await asyncio.to_thread(archive.MonthWriter, month)
+    try:
+        async with AsyncSessionLocal() as session:
+            async for rows in crud.stream_price_history_month(session, start, end):
+                await asyncio.to_thread(writer.write, rows)
+    except BaseException:
+        await asyncio.to_thread(writer.abort)
+        raise
+    path = await asyncio.to_thread(writer.close)
+
+    try:
+        async with AsyncSessionLocal() as session:
+            await crud.freeze_price_history_month(session, name, start, end, writer.rows)
+    except Exception:
+        # Партиция осталась в БД — файл не нужен, следующий запуск повторит попытку
+        await asyncio.to_thread(os.remove, path)
+        raise
+    logger.info(f"Archived {name}: {writer.rows} rows -> {path}")
+    return path
+
+
+async def archive_old_partitions(retention_months: Optional[int] = None) -> list[str]:
+    """Выгружает месячные партиции price_history старше горизонта в Parquet и удаляет их из БД."""
+    if retention_months is None:
+        retention_months = get_archive_retention_months()
+    if retention_months <= 0:
+        return []
+    horizon = _horizon(retention_months)
+
+    async with AsyncSessionLocal() as session:
+        partitions = await crud.list_price_history_partitions(session)
+
+    paths = []
+    for name, month in partitions:
+        if month >= horizon:
+            break
+        try:
+            paths.append(await _archive_partition(name, month))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.exception(f"archive {name} error: {e}")
+            break
+    return paths
@@ -0,0 +1,151 @@
+import time
+from bisect import bisect_left
+from collections import Counter
+from dataclasses import dataclass, field
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.crud import item as crud
+from app.db.crud.item import _normalize_query, _split_tokens
+from app.db.models import Category
+from app.db.models.item import Item
+from app.db.schemas.category import CategoryShort
+from app.db.schemas.item import ItemSuggestion
+from app.core import logger
+
+logger = logger.get_logger(__name__)
+
+# Каталог небольшой: после ребилда в другом воркере индекс догоняет по TTL
+INDEX_TTL = 600
+MAX_INDEX_TOKENS = 4
+TRIGRAM_THRESHOLD = 0.3
+
+
+def _trigrams(text: str) -> set[str]:
+    # Как в pg_trgm: каждое слово дополняется двумя пробелами слева и одним справа
+    grams = set()
+    for word in text.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+@dataclass(slots=True)
+class IndexEntry:
+    id: int
+    name: str
+    norm: str
+    category: CategoryShort | None
+    trigrams: set[str] = field(default_factory=set)
+
+
+class ItemSearchIndex:
+    def __init__(self, entries: list[IndexEntry]):
+        self.entries = entries
+        self.built_at = time.monotonic()
+        self._by_id = {e.id: e for e in entries}
+        self._names = sorted((e.norm, i) for i, e in enumerate(entries))
+        self._tokens = sorted(
+            (tok, i) for i, e in enumerate(entries) for tok in set(_split_tokens(e.norm))
+        )
+        self._trigram_postings: dict[str, list[int]] = {}
+        for i, e in enumerate(entries):
+            for gram in e.trigrams:
+                self._trigram_postings.setdefault(gram, []).append(i)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, item_id: int) -> IndexEntry | None:
+        return self._by_id.get(item_id)
+
+    @staticmethod
+    def _prefix_range(keys: list[tuple[str, int]], prefix: str) -> set[int]:
+        out = set()
+        pos = bisect_left(keys, (prefix, -1))
+        while pos < len(keys) and keys[pos][0].startswith(prefix):
+            out.add(keys[pos][1])
+            pos += 1
+        return out
+
+    def suggest(self, norm: str, limit: int) -> list[IndexEntry]:
+        tokens = _split_tokens(norm)
+        if not tokens:
+            return []
+
+        # 1. Каждый токен запроса — префикс какого-то слова названия
+        matched: set[int] | None = None
+        for tok in tokens:
+            ids = self._prefix_range(self._tokens, tok)
+            matched = ids if matched is None else matched & ids
+            if not matched:
+                break
+        full_prefix = self._prefix_range(self._names, norm)
+        ranked = sorted(
+            (matched or set()) | full_prefix,
+            key=lambda i: (i not in full_prefix, len(self.entries[i].norm), self.entries[i].norm),
+        )
+        result = ranked[:limit]
+        if len(result) >= limit:
+            return [self.entries[i] for i in result]
+
+        # 2. Опечатки: похожесть по триграммам
+        query_grams = _trigrams(norm)
+        shared = Counter()
+        for gram in query_grams:
+            shared.update(self._trigram_postings.get(gram, ()))
+        seen = set(result)
+        fuzzy = []
+        for i, common in shared.items():
+            if i in seen:
+                continue
+            similarity = common / (len(query_grams) + len(self.entries[i].trigrams) - common)
+            if similarity >= TRIGRAM_THRESHOLD:
+                fuzzy.append((-similarity, self.entries[i].norm, i))
+        fuzzy.sort()
+        result.extend(i for _, _, i in fuzzy[:limit - len(result)])
+        return [self.entries[i] for i in result]
+
+
+_index: ItemSearchIndex | None = None
+
+
+async def rebuild_index(db: AsyncSession) -> ItemSearchIndex:
+    global _index
+    stmt = (
+        select(Item.id, Item.name, Category.id, Category.name)
+        .outerjoin(Category, Category.id == Item.category_id)
+    )
+    rows = (await db.execute(stmt)).all()
+    entries = []
+    for item_id, name, category_id, category_name in rows:
+        norm = _normalize_query(name)
+        entries.append(IndexEntry(
+            id=item_id,
+            name=name,
+            norm=norm,
+            category=CategoryShort(id=category_id, name=category_name) if category_id is not None else None,
+            trigrams=_trigrams(norm),
+        ))
+    _index = ItemSearchIndex(entries)
+    logger.info(f"Item search index built: {len(entries)} items")
+    return _index
+
+
+async def get_index(db: AsyncSession) -> ItemSearchIndex:
+    if _index is None or time.monotonic() - _index.built_at > INDEX_TTL:
+        return await rebuild_index(db)
+    return _index
+
+
+async def autocomplete(db: AsyncSession, query: str, limit: int = 10) -> list[ItemSuggestion]:
+    norm = _normalize_query(query)
+    if not norm:
+        return []
+    if len(_split_tokens(norm)) > MAX_INDEX_TOKENS:
+        # Длинные запросы отдаём полнотекстовому поиску PostgreSQL
+        found = await crud.search_items_by_name(db, query, page_size=limit)
+        return [ItemSuggestion(id=it.id, name=it.name, category=it.category) for it in found.Items]
+    index = await get_index(db)
+    return [ItemSuggestion(id=e.id, name=e.name, category=e.category) for e in index.suggest(norm, limit)]
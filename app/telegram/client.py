@@ -1,5 +1,3 @@
-from telethon import TelegramClient
-from telethon.errors import SessionPasswordNeededError
 import asyncio
 
 from app.config import get_tg_api_id, get_tg_api_hash, get_tg_session_name
@@ -7,20 +5,23 @@ from app.core import logger
 
 logger = logger.get_logger(__name__)
 
-API_ID = get_tg_api_id()
-API_HASH = get_tg_api_hash()
-SESSION_NAME = get_tg_session_name()
+_client = None
+_client_lock = asyncio.Lock()
 
-# Initialize client
-client = TelegramClient(
-    SESSION_NAME,
-    API_ID,
-    API_HASH
-)
 
-_client_lock = asyncio.Lock()
+def get_client():
+    """TelegramClient создаётся при первом обращении: Telethon и TG_* нужны только воркеру."""
+    global _client
+    if _client is None:
+        from telethon import TelegramClient
+        _client = TelegramClient(get_tg_session_name(), get_tg_api_id(), get_tg_api_hash())
+    return _client
+
 
 async def start_client(retries: int = 3):
+    from telethon.errors import SessionPasswordNeededError
+
+    client = get_client()
     if client.is_connected():
         return
     async with _client_lock:
@@ -46,6 +47,6 @@ async def start_client(retries: int = 3):
                 await asyncio.sleep(delay)
 
 async def close_client():
-    if client.is_connected():
-        await client.disconnect()
+    if _client is not None and _client.is_connected():
+        await _client.disconnect()
         logger.info("✅ Telegram client disconnected")
@@ -1,138 +1,313 @@
 import asyncio
+import time
 from collections import deque, defaultdict
-from typing import Optional
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Optional
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db.schemas.price import PriceCreate
-from app.services.items import get_top_active_items
 from app.telegram.classifier import classify_from_history
-from app.telegram.client import client, start_client, close_client
+from app.telegram.source import BOT_USERNAME, FloodWait, MessageSource, SourceMessage, TelegramSource
 from app.telegram.parser import parse_price_message
-from app.db.crud.item import get_item_by_name
-from app.db.crud.price import add_prices_batch, get_latest_prices_for_classification, refresh_daily_price_stats
-from app.core.db import get_async_session
+from app.db.crud.item import get_items_by_names
+from app.db.crud.price import add_prices_batch, get_latest_prices_for_classification_many, refresh_price_rollups, \
+    ensure_price_history_partitions
+from app.core import metrics
+from app.core.leader import LeaseLost
+from app.core.timing import QueryBudgetExceeded, count_queries
+from app.core.db import get_async_session, AsyncSessionLocal
+from app.db.crud.dead_letter import add_dead_letters, get_dead_letters, delete_dead_letters, \
+    mark_dead_letters_retried
+from app.services import coin_rate, leaderboard
 from app.services.prices import get_coin_price
 from app.core.redis import get_redis_client, clear_cache
 from app.core import logger
+from app.core.logger import WarningSummary
 
 logger = logger.get_logger(__name__)
 
-BOT_USERNAME = "forgame_bot"
 BATCH_SIZE = 100
 PARTIAL_SAVE_SIZE = 2500
+# Дольше ждать не имеет смысла: следующий запуск по расписанию наступит раньше
+MAX_FLOOD_WAIT = 300
+# Бюджеты SQL-запросов: рост числа запросов с размером пачки — признак N+1
+PAGE_QUERY_BUDGET = 2
+FLUSH_QUERY_BUDGET = 10
 
 
-async def fetch_and_store_messages():
+@dataclass
+class IngestStats:
+    messages: int = 0
+    saved: int = 0
+    dead_letters: int = 0
+    flood_waits: int = 0
+    # Суммарное время по этапам, секунды
+    stages: dict[str, float] = field(default_factory=lambda: defaultdict(float))
+
+    @contextmanager
+    def stage(self, name: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - t0
+            self.stages[name] += seconds
+            metrics.INGEST_STAGE_SECONDS.labels(name).inc(seconds)
+
+
+async def _get_page(source: MessageSource, stats: IngestStats, limit: int, min_id: int):
+    while True:
+        try:
+            return await source.get_messages(limit=limit, min_id=min_id)
+        except FloodWait as e:
+            stats.flood_waits += 1
+            if e.seconds > MAX_FLOOD_WAIT:
+                raise
+            logger.warning(f"Flood wait {e.seconds}s while fetching messages")
+            await asyncio.sleep(e.seconds)
+
+
+async def fetch_and_store_messages(
+        source: Optional[MessageSource] = None,
+        confirm: Optional[Callable[[], Awaitable]] = None,
+) -> IngestStats:
+    """Сбор непрочитанных сообщений; confirm вызывается перед каждым commit и прерывает сбор исключением."""
+    source = source or TelegramSource()
+    stats = IngestStats()
     try:
-        await start_client()
+        await source.start()
     except asyncio.CancelledError:
         raise
     except Exception:
         logger.error("Cannot start Telegram client. Skipping.")
-        return
+        return stats
 
     try:
-        unread_count = await get_undead_count()
+        unread_count = await source.unread_count()
         if unread_count == 0:
             logger.info("No new unread messages")
-            return
+            return stats
         logger.info(f"Fetching {unread_count} unread messages from {BOT_USERNAME}")
 
-        entity = await client.get_entity(BOT_USERNAME)
-        offset_id = 0
+        # Читаем от старых к новым: ack на id последней сохранённой страницы не задевает непрочитанные
+        min_id = await source.read_max_id()
         fetched = 0
         parsed_batch: list[PriceCreate] = []
-        total_saved = 0
+        dead_batch: list[dict] = []
         last_processed_msg_id: int | None = None
+        # На бэклоге таких сообщений тысячи: пишем несколько примеров и сводку на пачку
+        issues = WarningSummary(logger, "Skipped messages in batch")
 
         async def flush_prices(session: AsyncSession):
-            nonlocal total_saved
-
-            if not parsed_batch:
+            if not parsed_batch and not dead_batch:
                 return
-
-            logger.info("Classifing...")
-            await classify_prices(session, parsed_batch)
-            logger.info("Adding into Db...")
-            await add_prices_batch(session, parsed_batch)
+            with count_queries("ingest flush", budget=FLUSH_QUERY_BUDGET):
+                # Сообщения прочитаются в Telegram после этого сохранения: недоразобранные — в dead_letters
+                with stats.stage("dead_letters"):
+                    await add_dead_letters(session, dead_batch)
+                stats.dead_letters += len(dead_batch)
+                await save_prices(session, parsed_batch, stats, confirm)
             if last_processed_msg_id:
                 try:
-                    await client.send_read_acknowledge(entity, max_id=last_processed_msg_id)
+                    await source.ack(last_processed_msg_id)
                 except Exception as e:
                     logger.warning(f"Read ack (flush) failed: {e}")
 
-            total_saved += len(parsed_batch)
-            logger.info(f"✅ Saved {total_saved}.")
+            logger.info(f"✅ Saved {stats.saved}.")
+            issues.flush()
 
             parsed_batch.clear()
+            dead_batch.clear()
 
         async for session in get_async_session():
+            await ensure_price_history_partitions(session)
             while fetched < unread_count:
                 remaining = unread_count - fetched
                 limit = min(BATCH_SIZE, remaining)
-                batch_msgs = await client.get_messages(BOT_USERNAME, limit=limit, offset_id=offset_id)
+                try:
+                    with stats.stage("fetch"):
+                        batch_msgs = await _get_page(source, stats, limit, min_id)
+                except FloodWait as e:
+                    logger.error(f"Flood wait {e.seconds}s is too long, stopping at {fetched}/{unread_count}")
+                    break
                 if not batch_msgs:
                     break
                 fetched += len(batch_msgs)
-                offset_id = min(msg.id for msg in batch_msgs)
-                batch_max_id = max(m.id for m in batch_msgs)
-                if not last_processed_msg_id or batch_max_id > last_processed_msg_id:
-                    last_processed_msg_id = batch_max_id
+                metrics.INGEST_MESSAGES_FETCHED.inc(len(batch_msgs))
                 batch_msgs = sorted(batch_msgs, key=lambda m: m.id)
+                min_id = last_processed_msg_id = batch_msgs[-1].id
 
-                for msg in batch_msgs:
-                    if not msg.text:
-                        continue
-                    parsed = parse_price_message(msg.text)
-                    if not parsed:
-                        logger.warning(f"❌ Failed to parse message: {msg.text}")
-                        continue
-                    if parsed["currency"] == "unknown":
-                        logger.warning(f"❌ Unknown currency in message: {msg.text}")
-                    item = await get_item_by_name(session, parsed["item_name"])
-                    if not item:
-                        logger.warning(f"❌ Unknown item: {parsed['item_name']}")
-                        continue
-                    price_obj = PriceCreate(item=item, **parsed, timestamp=msg.date)
-                    parsed_batch.append(price_obj)
+                with stats.stage("parse"):
+                    prices, dead = await resolve_messages(session, batch_msgs, issues)
+                parsed_batch.extend(prices)
+                dead_batch.extend(dead)
 
                 # Flush if batch size reached or all fetched
-                if parsed_batch and (len(parsed_batch) >= PARTIAL_SAVE_SIZE or fetched >= unread_count):
+                pending = len(parsed_batch) + len(dead_batch)
+                if pending and (pending >= PARTIAL_SAVE_SIZE or fetched >= unread_count):
                     await flush_prices(session)
+            stats.messages = fetched
+            # Сообщения, прочитанные до остановки по FloodWait, тоже сохраняем
+            await flush_prices(session)
+            issues.flush()
 
             if last_processed_msg_id:
                 try:
-                    await client.send_read_acknowledge(entity, max_id=last_processed_msg_id)
+                    await source.ack(last_processed_msg_id)
                 except Exception as e:
                     logger.warning(f"Final read ack failed: {e}")
 
-            redis = await get_redis_client()
-            await clear_cache(redis)
-            if total_saved > 0:
-                try:
-                    await refresh_daily_price_stats(session, concurrently=False)
-                    logger.info("Materialized view daily_price_stats refreshed.")
-                except Exception as e:
-                    logger.error(f"Failed to refresh daily_price_stats: {e}")
-            await get_top_active_items(session)
+            await refresh_after_ingest(session, stats)
             break
 
-        logger.info(f"📦 Finished. Total saved: {total_saved}")
-    except asyncio.CancelledError:
+        logger.info(f"📦 Finished. Total saved: {stats.saved}")
+    except (asyncio.CancelledError, QueryBudgetExceeded, LeaseLost):
+        # QueryBudgetExceeded бывает только с QUERY_BUDGET_STRICT=1: прогон должен упасть
         raise
     except Exception as e:
         logger.exception(f"fetch_and_store_messages error: {e}")
+    return stats
 
 
-async def get_undead_count():
-    dialogs = await client.get_dialogs()
-    unread_count = 0
-    for d in dialogs:
-        if getattr(d.entity, "username", None) == BOT_USERNAME:
-            unread_count = d.unread_count or 0
-            break
-    return unread_count
+def _dead_letter(msg: SourceMessage, reason: str, item_name: Optional[str] = None) -> dict:
+    return {"message_id": msg.id, "text": msg.text, "reason": reason,
+            "item_name": item_name, "message_date": msg.date}
+
+
+async def resolve_messages(
+        session: AsyncSession,
+        messages: list[SourceMessage],
+        issues: WarningSummary,
+        record_metrics: bool = True,
+) -> tuple[list[PriceCreate], list[dict]]:
+    """Разбор и поиск предметов для страницы сообщений: сделки и записи для dead_letters."""
+    prices, dead, page = [], [], []
+    for msg in messages:
+        if not msg.text:
+            continue
+        parsed = parse_price_message(msg.text)
+        if not parsed:
+            if record_metrics:
+                metrics.INGEST_PARSE_FAILURES.inc()
+            issues.add("Failed to parse message", msg.text)
+            dead.append(_dead_letter(msg, "parse_failed"))
+            continue
+        if record_metrics:
+            metrics.INGEST_MESSAGES_PARSED.inc()
+        if parsed["currency"] == "unknown":
+            if record_metrics:
+                metrics.INGEST_UNKNOWN_CURRENCY.inc()
+            issues.add("Unknown currency in message", msg.text)
+        page.append((msg, parsed))
+    # Все предметы страницы одним запросом, а не по запросу на сообщение
+    with count_queries("ingest page", budget=PAGE_QUERY_BUDGET):
+        items = await get_items_by_names(session, (parsed["item_name"] for _, parsed in page))
+    for msg, parsed in page:
+        item = items.get(parsed["item_name"])
+        if not item:
+            if record_metrics:
+                metrics.INGEST_UNKNOWN_ITEMS.inc()
+            issues.add("Unknown item", parsed["item_name"])
+            dead.append(_dead_letter(msg, "unknown_item", parsed["item_name"]))
+            continue
+        prices.append(PriceCreate(item=item, **parsed, timestamp=msg.date))
+    return prices, dead
+
+
+async def save_prices(
+        session: AsyncSession,
+        prices: list[PriceCreate],
+        stats: IngestStats,
+        confirm: Optional[Callable[[], Awaitable]] = None,
+) -> None:
+    """Классификация, вставка (commit) и инкрементальные агрегаты: курс монеты и лидерборд."""
+    if prices:
+        logger.info("Classifing...")
+        with stats.stage("classify"):
+            await classify_prices(session, prices)
+        _count_classified(prices)
+    # Классификация — самая долгая часть flush: аренду проверяем уже после неё, прямо перед commit
+    if confirm:
+        await confirm()
+    if not prices:
+        await session.commit()
+        return
+    logger.info("Adding into Db...")
+    with stats.stage("insert"):
+        await add_prices_batch(session, prices)
+    metrics.INGEST_ROWS_INSERTED.inc(len(prices))
+    with stats.stage("aggregates"):
+        await coin_rate.sync(session, force=True)
+        await leaderboard.record_prices(prices)
+    stats.saved += len(prices)
+
+
+async def refresh_after_ingest(session: AsyncSession, stats: IngestStats) -> None:
+    if stats.saved > 0:
+        try:
+            with stats.stage("rollup"):
+                await refresh_price_rollups(session)
+            logger.info("Price rollups refreshed.")
+        except Exception as e:
+            await session.rollback()
+            logger.error(f"Failed to refresh price rollups: {e}")
+    # Кеш сбрасываем после переключения rollup, иначе он успеет заполниться старыми данными
+    with stats.stage("invalidate"):
+        redis = await get_redis_client()
+        await clear_cache(redis)
+
+
+async def reprocess_dead_letters(reason: Optional[str] = None, batch_size: int = PARTIAL_SAVE_SIZE) -> IngestStats:
+    """Прогоняет dead_letters через разбор и сохранение заново, без Telegram.
+
+    Восстановленные сообщения удаляются в той же транзакции, где вставляются их сделки;
+    остальные получают attempts + 1 и актуальную причину.
+    """
+    stats = IngestStats()
+    issues = WarningSummary(logger, "Still unresolved dead letters")
+    async with AsyncSessionLocal() as session:
+        await ensure_price_history_partitions(session)
+        after_id = 0
+        while True:
+            letters = await get_dead_letters(session, after_id=after_id, limit=batch_size, reason=reason)
+            if not letters:
+                break
+            after_id = letters[-1].id
+            stats.messages += len(letters)
+            messages = [SourceMessage(letter.message_id, letter.text, letter.message_date) for letter in letters]
+            with stats.stage("parse"):
+                prices, dead = await resolve_messages(session, messages, issues, record_metrics=False)
+            unresolved = {d["message_id"]: d for d in dead}
+            await mark_dead_letters_retried(session, [
+                {"id": letter.id, **unresolved[letter.message_id]}
+                for letter in letters if letter.message_id in unresolved
+            ])
+            await delete_dead_letters(session, [
+                letter.id for letter in letters if letter.message_id not in unresolved
+            ])
+            stats.dead_letters += len(unresolved)
+            await save_prices(session, prices, stats)
+            issues.flush()
+            logger.info(f"Reprocessed {stats.messages} dead letters: {stats.saved} saved, {stats.dead_letters} left")
+
+        await refresh_after_ingest(session, stats)
+    return stats
+
+
+def _count_classified(prices: list[PriceCreate]) -> None:
+    outcomes = defaultdict(int)
+    for price in prices:
+        if not price.item or not price.item.modifications:
+            outcomes["no_modifications"] += 1
+        elif price.enchant_level in (None, "None"):
+            # classify_prices пишет str(None), когда уровень не угадан
+            outcomes["unclassified"] += 1
+        else:
+            outcomes["classified"] += 1
+    for outcome, count in outcomes.items():
+        metrics.INGEST_CLASSIFIED.labels(outcome).inc(count)
 
 
 async def classify_prices(session: AsyncSession, prices: list[PriceCreate], buffer_size: int = 10):
@@ -141,6 +316,17 @@ async def classify_prices(session: AsyncSession, prices: list[PriceCreate], buff
     current_currency: Optional[str] = None
 
     prices.sort(key=lambda p: (p.item.name if p.item else '', p.currency or '', p.timestamp))
+    # История всех пар (предмет, валюта) пачки одним запросом; монетам нужна ещё и адена
+    wanted: dict[tuple[int, str], list[int]] = {}
+    for price in prices:
+        if price.item and price.item.modifications:
+            mods = [int(x) for x in price.item.modifications if str(x).isdigit()]
+            if len(mods) > 1:
+                wanted[(price.item.id, price.currency)] = mods
+                if price.currency == "coin":
+                    wanted[(price.item.id, "adena")] = mods
+    histories = await get_latest_prices_for_classification_many(session, wanted, buffer_size)
+
     for price in prices:
         item = price.item
 
@@ -157,9 +343,7 @@ async def classify_prices(session: AsyncSession, prices: list[PriceCreate], buff
         use_coin_buffer = True
         if price.currency == "coin":
             if (price.item.id, price.currency) != (current_item_id, current_currency):
-                history = await get_latest_prices_for_classification(session, price.item.id, price.currency, mods,
-                                                                     buffer_size)
-                buffer = build_buffer(history, buffer_size)
+                buffer = build_buffer(histories[(price.item.id, price.currency)], buffer_size)
                 current_item_id = price.item.id
                 current_currency = price.currency
             empty_mods = [mod for mod in mods if len(buffer[mod]) == 0]
@@ -167,9 +351,7 @@ async def classify_prices(session: AsyncSession, prices: list[PriceCreate], buff
                 coin_history = await get_coin_price(session, price.timestamp)
                 if coin_history:
                     coin_to_adena = coin_history.coin_price
-                    adena_history = await get_latest_prices_for_classification(session, price.item.id, "adena", mods,
-                                                                               buffer_size)
-                    adena_buffer = build_buffer(adena_history, buffer_size)
+                    adena_buffer = build_buffer(histories[(price.item.id, "adena")], buffer_size)
                     try:
                         adena_price = price.price * coin_to_adena
                         mod_guess = classify_from_history(
@@ -185,9 +367,7 @@ async def classify_prices(session: AsyncSession, prices: list[PriceCreate], buff
                         price.enchant_level = str(mod_guess)
         if use_coin_buffer:
             if (price.item.id, price.currency) != (current_item_id, current_currency):
-                history = await get_latest_prices_for_classification(session, price.item.id, price.currency, mods,
-                                                                     buffer_size)
-                buffer = build_buffer(history, buffer_size)
+                buffer = build_buffer(histories[(price.item.id, price.currency)], buffer_size)
                 current_item_id = price.item.id
                 current_currency = price.currency
             try:
@@ -0,0 +1,136 @@
+import json
+from bisect import bisect_right
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional, Protocol
+
+from app.telegram.client import get_client, start_client
+
+BOT_USERNAME = "forgame_bot"
+
+
+@dataclass(frozen=True)
+class SourceMessage:
+    id: int
+    text: Optional[str]
+    date: datetime
+
+
+class FloodWait(Exception):
+    """Источник просит подождать seconds секунд перед следующим запросом."""
+
+    def __init__(self, seconds: float):
+        super().__init__(f"Flood wait for {seconds}s")
+        self.seconds = seconds
+
+
+class MessageSource(Protocol):
+    """Переписка с ботом: непрочитанные сообщения, страницы от старых к новым, отметка о прочтении.
+
+    Страницы идут от старых к новым, поэтому ack(max_id) после сохранения страницы безопасен:
+    всё, что не старше max_id, уже прочитано этим прогоном.
+    """
+
+    async def start(self) -> None: ...
+
+    async def unread_count(self) -> int: ...
+
+    async def read_max_id(self) -> int: ...
+
+    async def get_messages(self, limit: int, min_id: int = 0) -> list[SourceMessage]: ...
+
+    async def ack(self, max_id: int) -> None: ...
+
+
+class TelegramSource:
+    def __init__(self, username: str = BOT_USERNAME):
+        self.username = username
+        self._entity = None
+
+    async def start(self) -> None:
+        await start_client()
+        client = get_client()
+        if not client.is_connected():
+            raise ConnectionError("Telegram client is not connected")
+        self._entity = await client.get_entity(self.username)
+
+    async def _dialog(self):
+        for d in await get_client().get_dialogs():
+            if getattr(d.entity, "username", None) == self.username:
+                return d
+        return None
+
+    async def unread_count(self) -> int:
+        d = await self._dialog()
+        return (d.unread_count or 0) if d else 0
+
+    async def read_max_id(self) -> int:
+        d = await self._dialog()
+        return d.dialog.read_inbox_max_id if d else 0
+
+    async def get_messages(self, limit: int, min_id: int = 0) -> list[SourceMessage]:
+        from telethon.errors import FloodWaitError
+
+        try:
+            # reverse=True: от старых к новым, offset_id становится исключающей нижней границей
+            messages = await get_client().get_messages(self._entity, limit=limit, offset_id=min_id, reverse=True)
+        except FloodWaitError as e:
+            # Короткие ожидания Telethon отсыпает сам, сюда доходят только длинные
+            raise FloodWait(e.seconds) from e
+        return [SourceMessage(m.id, m.text, m.date) for m in messages]
+
+    async def ack(self, max_id: int) -> None:
+        await get_client().send_read_acknowledge(self._entity, max_id=max_id)
+
+
+class FakeMessageSource:
+    """Локальная замена Telegram для нагрузочных прогонов: сообщения из памяти или записанного JSONL.
+
+    Повторяет семантику get_messages (страницы от старых к новым, min_id исключительно),
+    считает непрочитанные по последнему ack и каждый flood_wait_every-й запрос отвечает FloodWait.
+    """
+
+    def __init__(
+            self,
+            messages: list[SourceMessage],
+            read_max_id: int = 0,
+            flood_wait_every: int = 0,
+            flood_wait_seconds: float = 0.0,
+    ):
+        self.messages = sorted(messages, key=lambda m: m.id)
+        self._ids = [m.id for m in self.messages]
+        self._read_max_id = read_max_id
+        self.flood_wait_every = flood_wait_every
+        self.flood_wait_seconds = flood_wait_seconds
+        self.requests = 0
+        self.flood_waits = 0
+        self.acks: list[int] = []
+
+    @classmethod
+    def from_file(cls, path: str, **kwargs) -> "FakeMessageSource":
+        """JSONL с полями id, text, date (ISO 8601)."""
+        with open(path, encoding="utf-8") as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+        messages = [SourceMessage(r["id"], r.get("text"), datetime.fromisoformat(r["date"])) for r in rows]
+        return cls(messages, **kwargs)
+
+    async def start(self) -> None:
+        return None
+
+    async def unread_count(self) -> int:
+        return len(self.messages) - bisect_right(self._ids, self._read_max_id)
+
+    async def read_max_id(self) -> int:
+        return self._read_max_id
+
+    async def get_messages(self, limit: int, min_id: int = 0) -> list[SourceMessage]:
+        self.requests += 1
+        if self.flood_wait_every and self.requests % self.flood_wait_every == 0:
+            self.flood_waits += 1
+            raise FloodWait(self.flood_wait_seconds)
+        start = bisect_right(self._ids, min_id)
+        return self.messages[start:start + limit]
+
+    async def ack(self, max_id: int) -> None:
+        self.acks.append(max_id)
+        self._read_max_id = max(self._read_max_id, max_id)
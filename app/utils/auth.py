@@ -4,15 +4,23 @@ import inspect
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config import security, config
-from app.core.db import get_async_session
+from app.core import timing
+from app.core.db import get_read_session
 from app.db.crud.user import get_user_by_id
 
 
 async def auth_or_403(
     request: Request,
     response: Response,
-    db: AsyncSession = Depends(get_async_session),
+    # Проверка пользователя — чтение: та же сессия, что у read-only роута (зависимость кешируется на запрос)
+    db: AsyncSession = Depends(get_read_session),
 ):
+    # Проверка токена и пользователя в БД — отдельный этап Server-Timing
+    with timing.phase("auth"):
+        return await _auth_or_403(request, response, db)
+
+
+async def _auth_or_403(request: Request, response: Response, db: AsyncSession):
     if request.method == "OPTIONS":
         return None
 
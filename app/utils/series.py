@@ -0,0 +1,64 @@
+from datetime import date, datetime
+
+import numpy as np
+
+CURRENCIES = ("adena", "coin")
+
+
+def _column(rows: list[dict], currency: str, key: str) -> np.ndarray:
+    return np.array(
+        [
+            r[currency][key] if r.get(currency) and r[currency].get(key) is not None else np.nan
+            for r in rows
+        ],
+        dtype=np.float64,
+    )
+
+
+def _seconds(ts: date | datetime) -> float:
+    if isinstance(ts, datetime):
+        return ts.timestamp()
+    return ts.toordinal() * 86400.0
+
+
+def downsample_history(rows: list[dict], max_points: int) -> list[dict]:
+    """Min/avg bucketing of a daily series into at most max_points buckets of equal time span.
+
+    Buckets cover equal stretches of time, not equal numbers of rows: days without trades
+    stay gaps on the chart instead of squeezing busy periods. Each bucket keeps the lowest
+    min, the volume-weighted avg and the summed volume, so dips and activity spikes survive
+    the reduction. Rows must be sorted by timestamp.
+    """
+    n = len(rows)
+    if max_points <= 0 or n <= max_points:
+        return rows
+
+    seconds = np.array([_seconds(r["timestamp"]) for r in rows])
+    span = (seconds[-1] - seconds[0]) / max_points
+    if span > 0:
+        bucket = np.minimum(((seconds - seconds[0]) / span).astype(np.int64), max_points - 1)
+    else:
+        bucket = np.zeros(n, dtype=np.int64)
+    starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    out = [{"timestamp": rows[i]["timestamp"], "adena": None, "coin": None} for i in starts]
+
+    for currency in CURRENCIES:
+        avg = _column(rows, currency, "avg")
+        low = _column(rows, currency, "min")
+        volume = _column(rows, currency, "volume")
+
+        has_avg = ~np.isnan(avg)
+        weight = np.where(has_avg, np.where(np.isnan(volume) | (volume <= 0), 1.0, volume), 0.0)
+        weight_sum = np.add.reduceat(weight, starts)
+        weighted_avg = np.add.reduceat(np.where(has_avg, avg * weight, 0.0), starts)
+        bucket_min = np.minimum.reduceat(np.where(np.isnan(low), np.inf, low), starts)
+        bucket_volume = np.add.reduceat(np.nan_to_num(volume), starts)
+        present = np.add.reduceat((has_avg | ~np.isnan(low)).astype(np.int64), starts) > 0
+
+        for i in np.flatnonzero(present):
+            out[i][currency] = {
+                "avg": int(weighted_avg[i] / weight_sum[i]) if weight_sum[i] > 0 else None,
+                "min": int(bucket_min[i]) if np.isfinite(bucket_min[i]) else None,
+                "volume": int(bucket_volume[i]),
+            }
+    return out
@@ -0,0 +1,78 @@
+import numpy as np
+
+
+def _sorted_quantile(values: np.ndarray, starts: np.ndarray, counts: np.ndarray, q: float) -> np.ndarray:
+    # Линейная интерполяция, как np.percentile по умолчанию; values отсортированы внутри групп
+    pos = q * (counts - 1)
+    lo = np.floor(pos).astype(np.int64)
+    hi = np.ceil(pos).astype(np.int64)
+    low_v = values[starts + lo]
+    return low_v + (pos - lo) * (values[starts + hi] - low_v)
+
+
+def _group_bounds(groups: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    n = len(groups)
+    starts = np.flatnonzero(np.r_[True, groups[1:] != groups[:-1]]) if n else np.empty(0, dtype=np.int64)
+    counts = np.diff(np.r_[starts, n])
+    return starts, counts
+
+
+def grouped_iqr_stats(prices, group_ids) -> dict[str, np.ndarray]:
+    """Per-group IQR statistics in a few vectorized passes.
+
+    Same semantics as iqr_filter applied to every group: groups of fewer than 4 prices
+    are not filtered, values outside 1.5 IQR and further than 3 medians from the median
+    are dropped, an empty result falls back to the whole group. Returns arrays aligned
+    with the sorted unique group ids: group, q1, q3, median, mean, min, max, volume, mask
+    (mask is aligned with the input prices).
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    group_ids = np.asarray(group_ids)
+    order = np.lexsort((prices, group_ids))
+    p = prices[order]
+    g = group_ids[order]
+    starts, counts = _group_bounds(g)
+    member = np.repeat(np.arange(len(starts)), counts)
+
+    q1 = _sorted_quantile(p, starts, counts, 0.25)
+    q3 = _sorted_quantile(p, starts, counts, 0.75)
+    iqr = q3 - q1
+    keep = (p >= (q1 - 1.5 * iqr)[member]) & (p <= (q3 + 1.5 * iqr)[member])
+
+    # Медиана по прошедшим IQR-фильтр; в пределах группы они по-прежнему отсортированы
+    kept_counts = np.bincount(member[keep], minlength=len(starts))
+    kept_starts = np.r_[0, np.cumsum(kept_counts)[:-1]]
+    median = np.empty(len(starts))
+    has_kept = kept_counts > 0
+    median[has_kept] = _sorted_quantile(p[keep], kept_starts[has_kept], kept_counts[has_kept], 0.5)
+    median[~has_kept] = _sorted_quantile(p, starts[~has_kept], counts[~has_kept], 0.5)
+
+    keep &= np.abs(p - median[member]) <= 3 * median[member]
+    small_or_empty = (counts < 4) | (np.bincount(member[keep], minlength=len(starts)) == 0)
+    keep |= small_or_empty[member]
+
+    kept = p[keep]
+    kept_member = member[keep]
+    volume_kept = np.bincount(kept_member, minlength=len(starts))
+    kept_starts = np.r_[0, np.cumsum(volume_kept)[:-1]]
+    mask = np.empty(len(p), dtype=bool)
+    mask[order] = keep
+    return {
+        "group": g[starts],
+        "q1": q1,
+        "q3": q3,
+        "median": median,
+        "mean": np.bincount(kept_member, weights=kept, minlength=len(starts)) / volume_kept,
+        "min": kept[kept_starts],
+        "max": kept[kept_starts + volume_kept - 1],
+        "volume": counts,
+        "mask": mask,
+    }
+
+
+def iqr_filter(prices):
+    if len(prices) < 4:
+        return prices
+    arr = np.asarray(prices)
+    mask = grouped_iqr_stats(arr, np.zeros(len(arr), dtype=np.int64))["mask"]
+    return arr[mask].tolist()
@@ -1,5 +1,23 @@
+import base64
 import hashlib
+import json
 
 
 def get_md5_hash(text: str) -> str:
-    return hashlib.md5(text.encode('utf-8')).hexdigest()
\ No newline at end of file
+    return hashlib.md5(text.encode('utf-8')).hexdigest()
+
+
+def encode_cursor(data: dict) -> str:
+    raw = json.dumps(data, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> dict:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, UnicodeError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(data, dict):
+        raise ValueError("Invalid cursor")
+    return data
@@ -0,0 +1,103 @@
+"""Ingestion worker: Telegram collection, rollups, leaderboard and archive jobs.
+
+    python -m app.worker
+
+Several workers may run at once: only the holder of the Redis lease ingests.
+The API never ingests, it pushes triggers and reads status through Redis.
+"""
+import asyncio
+import signal
+
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+
+from app.core.db import init_db, AsyncSessionLocal
+from app.core.leader import lease, leader_only, run_election
+from app.core import metrics
+from app.core.logger import setup_logging, stop_logging
+from app.core.redis import startup_redis
+from app.services import controls, leaderboard, retention
+from app.core import logger
+
+logger = logger.get_logger(__name__)
+
+COLLECT_INTERVAL_MINUTES = 30
+
+
+@leader_only
+async def rebuild_leaderboard():
+    # Бакеты, пропущенные при сбоях Redis, восстанавливаются из rollup
+    async with AsyncSessionLocal() as session:
+        await leaderboard.rebuild(session)
+
+
+_ensure_task: asyncio.Task | None = None
+
+
+async def _ensure_leaderboard():
+    try:
+        async with AsyncSessionLocal() as session:
+            await leaderboard.ensure_built(session)
+    except Exception as e:
+        logger.exception(f"leaderboard ensure_built error: {e}")
+
+
+async def on_elected():
+    # Лидерборд проверяет только лидер: пересборка под ingest_lock не пересекается с его сбором.
+    # Фоновой задачей, чтобы не задерживать продление аренды
+    global _ensure_task
+    if _ensure_task is None or _ensure_task.done():
+        _ensure_task = asyncio.create_task(_ensure_leaderboard())
+
+
+def create_scheduler() -> AsyncIOScheduler:
+    scheduler = AsyncIOScheduler()
+    scheduler.add_job(controls.scheduled_collect_prices,
+                      trigger="interval",
+                      minutes=COLLECT_INTERVAL_MINUTES,
+                      max_instances=1,
+                      id="collect_prices")
+    scheduler.add_job(rebuild_leaderboard,
+                      trigger="cron",
+                      hour=3,
+                      max_instances=1,
+                      id="rebuild_leaderboard")
+    scheduler.add_job(leader_only(retention.archive_old_partitions),
+                      trigger="cron",
+                      hour=4,
+                      max_instances=1,
+                      id="archive_old_partitions")
+    return scheduler
+
+
+async def main():
+    setup_logging()
+    metrics.start_worker_server()
+    await startup_redis()
+    await init_db()
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    scheduler = create_scheduler()
+    scheduler.start()
+    election = asyncio.create_task(
+        run_election(on_demoted=controls.cancel_collect_prices, on_tick=controls.wait_for_trigger,
+                     on_elected=on_elected)
+    )
+    logger.info("Ingestion worker started")
+    await stop.wait()
+
+    logger.info("Ingestion worker stopping")
+    scheduler.shutdown(wait=False)
+    election.cancel()
+    await controls.cancel_collect_prices()
+    if controls.collect_prices_task is not None:
+        await asyncio.gather(controls.collect_prices_task, return_exceptions=True)
+    await lease.release()
+    stop_logging()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
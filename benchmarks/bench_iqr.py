@@ -0,0 +1,88 @@
+"""IQR statistics: per-group iqr_filter calls vs the grouped kernel.
+
+    python -m benchmarks.bench_iqr --groups 20000
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.utils.stats import grouped_iqr_stats
+
+
+def iqr_filter_reference(prices):
+    # Прежняя реализация: отдельный массив и три прохода percentile/median на каждую группу
+    if len(prices) < 4:
+        return prices
+    arr = np.array(prices)
+    q1 = np.percentile(arr, 25)
+    q3 = np.percentile(arr, 75)
+    iqr = q3 - q1
+    filtered = arr[(arr >= q1 - 1.5 * iqr) & (arr <= q3 + 1.5 * iqr)]
+    med = np.median(filtered) if len(filtered) > 0 else np.median(arr)
+    filtered = filtered[np.abs(filtered - med) <= 3 * med]
+    return filtered.tolist() if len(filtered) > 0 else arr.tolist()
+
+
+def make_groups(n_groups: int, seed: int = 42) -> tuple[np.ndarray, np.ndarray]:
+    # Большинство (item, day, currency) групп — единицы сделок, редкие популярные — сотни
+    rng = np.random.default_rng(seed)
+    sizes = np.clip(rng.lognormal(mean=1.0, sigma=1.2, size=n_groups), 1, 3000).astype(np.int64)
+    centers = rng.lognormal(mean=13.0, sigma=2.0, size=n_groups)
+    group_ids = np.repeat(np.arange(n_groups), sizes)
+    prices = np.round(rng.normal(centers[group_ids], centers[group_ids] * 0.08))
+    # Выбросы: опечатки продавцов и «не та» заточка
+    outliers = rng.random(len(prices)) < 0.03
+    prices[outliers] *= rng.choice([0.01, 10.0, 100.0], size=outliers.sum())
+    perm = rng.permutation(len(prices))
+    return np.abs(prices[perm]).astype(np.int64), group_ids[perm]
+
+
+def per_group(prices: np.ndarray, group_ids: np.ndarray) -> dict:
+    buckets: dict[int, list[int]] = {}
+    for price, group in zip(prices.tolist(), group_ids.tolist()):
+        buckets.setdefault(group, []).append(price)
+    out = {}
+    for group, values in buckets.items():
+        filtered = iqr_filter_reference(values)
+        out[group] = (sum(filtered) / len(filtered), min(filtered), max(filtered), len(values))
+    return out
+
+
+def check(reference: dict, stats: dict) -> None:
+    for i, group in enumerate(stats["group"].tolist()):
+        mean, low, high, volume = reference[group]
+        assert np.isclose(stats["mean"][i], mean), group
+        assert stats["min"][i] == low and stats["max"][i] == high and stats["volume"][i] == volume, group
+
+
+def run(n_groups: int, repeat: int) -> dict:
+    prices, group_ids = make_groups(n_groups)
+    timings = {"per_group": [], "grouped": []}
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        reference = per_group(prices, group_ids)
+        timings["per_group"].append(time.perf_counter() - t0)
+        t0 = time.perf_counter()
+        stats = grouped_iqr_stats(prices, group_ids)
+        timings["grouped"].append(time.perf_counter() - t0)
+    check(reference, stats)
+    return {
+        "groups": n_groups,
+        "prices": int(len(prices)),
+        "per_group_s": min(timings["per_group"]),
+        "grouped_s": min(timings["grouped"]),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--groups", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    result = run(args.groups, args.repeat)
+    print(
+        f"{result['groups']} groups / {result['prices']} prices: "
+        f"per-group {result['per_group_s'] * 1000:.1f} ms, grouped {result['grouped_s'] * 1000:.1f} ms "
+        f"(x{result['per_group_s'] / result['grouped_s']:.1f})"
+    )
@@ -0,0 +1,30 @@
+"""Read routing check: reports replica lag and which engine read-only routes use.
+Works with a real replica or with DATABASE_READ_URL pointing at the primary itself.
+
+    DATABASE_READ_URL=postgresql+asyncpg://... python -m benchmarks.check_read_replica
+"""
+import asyncio
+import sys
+
+from sqlalchemy import text
+
+from app.config import get_db_read_max_lag
+from app.core.db import AsyncReadSessionLocal, get_read_engine, get_read_sessionmaker, get_replica_lag
+
+
+async def main() -> int:
+    if get_read_engine() is None:
+        print("DATABASE_READ_URL is not set, all reads go to the primary")
+        return 0
+    lag = await get_replica_lag()
+    print(f"replica lag: {lag:.2f}s (max {get_db_read_max_lag():.0f}s)")
+    maker = await get_read_sessionmaker()
+    async with maker() as session:
+        in_recovery = (await session.execute(text("SELECT pg_is_in_recovery()"))).scalar_one()
+    routed = "replica" if maker is AsyncReadSessionLocal else "primary"
+    print(f"read-only routes use: {routed} (in recovery: {in_recovery})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
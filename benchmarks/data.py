@@ -0,0 +1,164 @@
+"""Seeded synthetic market data for the benchmarks.
+
+Catalog items get Russian names, a category and an enchant ladder; trades follow a
+geometric enchant distribution (most sales are low levels) with log-normal price noise,
+and every trade can be rendered as the bot message that parse_price_message reads.
+The same seed always yields the same catalog, trades and texts.
+"""
+import random
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+
+from app.db.schemas.category import CategoryShort
+from app.db.schemas.item import ItemOut
+from app.db.schemas.price import PriceCreate
+
+CATEGORIES = ("Оружие", "Доспехи", "Бижутерия", "Ресурсы", "Расходники")
+ADJECTIVES = ("Древний", "Кровавый", "Тёмный", "Священный", "Проклятый", "Ледяной", "Огненный", "Небесный")
+NOUNS = {
+    "Оружие": ("Меч", "Лук", "Посох", "Кинжал", "Топор", "Копьё"),
+    "Доспехи": ("Шлем", "Нагрудник", "Перчатки", "Сапоги", "Щит", "Плащ"),
+    "Бижутерия": ("Амулет", "Перстень", "Ожерелье", "Серьга", "Талисман"),
+    "Ресурсы": ("Кристалл", "Слиток", "Свиток", "Камень", "Эссенция"),
+    "Расходники": ("Эликсир", "Зелье", "Заряд души", "Свиток телепорта"),
+}
+OWNERS = ("Валакаса", "Антараса", "Баюма", "Фринтезы", "Закена", "Орфен", "Ядовитой Королевы")
+ENCHANT_LADDERS = ((0, 4, 7, 10), (0, 3, 5, 7, 10, 12), (0, 6, 8, 10), (0, 1, 2, 3))
+# Геометрическое распределение уровней: чем выше заточка, тем реже продажа
+ENCHANT_DECAY = 0.55
+COIN_RATE = 25_000
+
+TEMPLATES = {
+    "auction_house": (
+        'Предмет "{name}" выставлен на Комиссионную Торговлю.\n'
+        "Цена: {price} аден\nПродавец: {seller}"
+    ),
+    "world_trade": (
+        'Предмет "{name}" выставлен на площадку Всемирной Торговли.\n'
+        "Цена: {price} монет\nСервер: {seller}"
+    ),
+    "private_store": (
+        'В личной торговой лавке продан Предмет "{name}".\n'
+        "Цена: {price} аден\nТорговец: {seller}"
+    ),
+}
+SOURCE_WEIGHTS = {"auction_house": 0.7, "world_trade": 0.2, "private_store": 0.1}
+
+
+@dataclass(frozen=True)
+class CatalogItem:
+    id: int
+    origin_id: int
+    name: str
+    category_id: int
+    category: str
+    modifications: tuple[int, ...]
+    base_price: int
+    tolerance: float
+
+    def to_out(self) -> ItemOut:
+        return ItemOut(
+            id=self.id,
+            origin_id=self.origin_id,
+            name=self.name,
+            modifications=list(self.modifications),
+            category=CategoryShort(id=self.category_id, name=self.category),
+            tolerance=self.tolerance,
+        )
+
+
+@dataclass(frozen=True)
+class Trade:
+    item: CatalogItem
+    enchant_level: int | None
+    price: int
+    currency: str
+    source: str
+    timestamp: datetime
+
+
+def _group_digits(value: int) -> str:
+    return f"{value:,}".replace(",", " ")
+
+
+def make_catalog(n_items: int, seed: int = 42, first_id: int = 1) -> list[CatalogItem]:
+    rng = random.Random(seed)
+    items, seen = [], set()
+    while len(items) < n_items:
+        category_id = rng.randrange(len(CATEGORIES))
+        category = CATEGORIES[category_id]
+        name = f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS[category])} {rng.choice(OWNERS)}"
+        if name in seen:
+            name = f"{name} {len(items)}"
+        seen.add(name)
+        enchantable = category in ("Оружие", "Доспехи", "Бижутерия")
+        items.append(CatalogItem(
+            id=first_id + len(items),
+            origin_id=100_000 + len(items),
+            name=name,
+            category_id=category_id + 1,
+            category=category,
+            modifications=rng.choice(ENCHANT_LADDERS) if enchantable else (),
+            base_price=int(rng.lognormvariate(14, 1.5)),
+            tolerance=0.35,
+        ))
+    return items
+
+
+def enchant_price(item: CatalogItem, level: int | None, rng: random.Random) -> int:
+    ladder_step = 1.0 if level is None else 1.8 ** (item.modifications.index(level) if item.modifications else 0)
+    return max(1, int(item.base_price * ladder_step * rng.lognormvariate(0, 0.12)))
+
+
+def make_trades(
+        catalog: list[CatalogItem],
+        n_trades: int,
+        seed: int = 42,
+        end: datetime | None = None,
+        days: int = 30,
+) -> list[Trade]:
+    rng = random.Random(seed)
+    end = end or datetime.now(timezone.utc).replace(microsecond=0)
+    # Популярность предметов тоже неравномерна: немного хитов и длинный хвост
+    weights = [1 / (rank + 1) for rank in range(len(catalog))]
+    sources, source_weights = zip(*SOURCE_WEIGHTS.items())
+    trades = []
+    for item in rng.choices(catalog, weights=weights, k=n_trades):
+        level = None
+        if item.modifications:
+            level_weights = [ENCHANT_DECAY ** i for i in range(len(item.modifications))]
+            level = rng.choices(item.modifications, weights=level_weights)[0]
+        price = enchant_price(item, level, rng)
+        source = rng.choices(sources, weights=source_weights)[0]
+        currency = "coin" if source == "world_trade" else "adena"
+        if currency == "coin":
+            price = max(1, price // COIN_RATE)
+        timestamp = end - timedelta(seconds=rng.randrange(days * 86_400))
+        trades.append(Trade(item, level, price, currency, source, timestamp))
+    trades.sort(key=lambda t: t.timestamp)
+    return trades
+
+
+def message_text(trade: Trade, rng: random.Random) -> str:
+    name = trade.item.name
+    # Бот указывает id предмета не всегда
+    if rng.random() < 0.5:
+        name = f"[{trade.item.origin_id}] {name}"
+    seller = f"Игрок{rng.randrange(10_000)}"
+    return TEMPLATES[trade.source].format(name=name, price=_group_digits(trade.price), seller=seller)
+
+
+def make_messages(trades: list[Trade], seed: int = 42) -> list[str]:
+    rng = random.Random(seed)
+    return [message_text(t, rng) for t in trades]
+
+
+def to_price_create(trade: Trade, classified: bool = True) -> PriceCreate:
+    return PriceCreate(
+        item=trade.item.to_out(),
+        price=trade.price,
+        enchant_level=trade.enchant_level if classified else None,
+        currency=trade.currency,
+        source=trade.source,
+        timestamp=trade.timestamp,
+    )
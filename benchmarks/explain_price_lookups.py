@@ -0,0 +1,71 @@
+"""EXPLAIN regression check: classification and latest-price lookups must use
+ix_price_history_item_cur_ench_ts. Needs a migrated database (POSTGRES_* env).
+
+    python -m benchmarks.explain_price_lookups
+"""
+import asyncio
+import sys
+from datetime import datetime, timezone
+
+from sqlalchemy import select, desc, text
+from sqlalchemy.dialects import postgresql
+
+from app.core.db import get_engine
+from app.db.crud.price import CLASSIFICATION_LOOKBACK
+from app.db.models.price import PriceHistory
+
+INDEX_NAME = "ix_price_history_item_cur_ench_ts"
+
+
+def _lookups(item_id: int, currency: str, enchant_level: str) -> dict[str, object]:
+    PH = PriceHistory
+    since = datetime.now(timezone.utc) - CLASSIFICATION_LOOKBACK
+    return {
+        "classification": (
+            select(PH.enchant_level, PH.price)
+            .where(PH.item_id == item_id, PH.currency == currency, PH.enchant_level == enchant_level,
+                   PH.timestamp >= since)
+            .order_by(desc(PH.timestamp))
+            .limit(10)
+        ),
+        "latest_price": (
+            select(PH)
+            .where(PH.item_id == item_id, PH.enchant_level == enchant_level, PH.currency == currency)
+            .order_by(desc(PH.timestamp))
+            .limit(1)
+        ),
+    }
+
+
+async def main() -> int:
+    failed = 0
+    engine = get_engine()
+    async with engine.connect() as conn:
+        sample = (await conn.execute(text(
+            "SELECT item_id, currency, enchant_level FROM price_history "
+            "WHERE enchant_level IS NOT NULL ORDER BY timestamp DESC LIMIT 1"
+        ))).first()
+        if sample is None:
+            print("price_history has no enchanted rows, nothing to check")
+            return 0
+        # Индексы партиций получают свои имена; собираем все, что привязаны к родительскому
+        index_names = {INDEX_NAME, *(await conn.execute(text(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = to_regclass(:name)"
+        ), {"name": INDEX_NAME})).scalars().all()}
+        # Без seq scan планировщик на маленькой dev-базе не прячет проблему с индексом
+        await conn.execute(text("SET enable_seqscan = off"))
+        for name, stmt in _lookups(*sample).items():
+            sql = stmt.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True})
+            plan = "\n".join((await conn.execute(text(f"EXPLAIN {sql}"))).scalars().all())
+            ok = any(f" {name} " in plan for name in index_names)
+            failed += not ok
+            print(f"{'OK  ' if ok else 'FAIL'} {name}")
+            if not ok:
+                print(plan)
+    await engine.dispose()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
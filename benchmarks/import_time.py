@@ -0,0 +1,71 @@
+"""Import-time budget for the API: `import app.main` must stay fast and side-effect free.
+
+Runs the import in a clean subprocess (no POSTGRES_*/TG_* variables, temporary cwd)
+with `python -X importtime`, takes the best of several runs and fails when it exceeds
+the budget or pulls in modules that only the worker or rare paths need.
+
+    python -m benchmarks.import_time [--budget-ms 1500] [--runs 5]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TARGET = "app.main"
+DEFAULT_BUDGET_MS = 1500
+# Тяжёлые или с побочными эффектами: должны грузиться лениво
+FORBIDDEN = ("numpy", "pyarrow", "telethon", "apscheduler", "asyncpg")
+ENV_KEEP = ("PATH", "HOME", "LANG", "SYSTEMROOT")
+
+
+def measure() -> tuple[float, dict[str, int]]:
+    env = {k: os.environ[k] for k in ENV_KEEP if k in os.environ}
+    env["PYTHONPATH"] = ROOT
+    env["PYTHONDONTWRITEBYTECODE"] = "1"
+    with tempfile.TemporaryDirectory() as cwd:
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {TARGET}"],
+            cwd=cwd, env=env, capture_output=True, text=True,
+        )
+        leftovers = os.listdir(cwd)
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {TARGET} failed:\n{proc.stderr[-2000:]}")
+    if leftovers:
+        raise RuntimeError(f"import {TARGET} created files: {leftovers}")
+
+    modules = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        modules[name] = int(cumulative)
+    return modules[TARGET] / 1000, modules
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--budget-ms", type=float, default=float(os.getenv("IMPORT_BUDGET_MS", DEFAULT_BUDGET_MS)))
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    best, modules = min((measure() for _ in range(args.runs)), key=lambda r: r[0])
+    top = sorted(((us, name) for name, us in modules.items() if "." not in name), reverse=True)[:8]
+    print(f"import {TARGET}: {best:.0f} ms (budget {args.budget_ms:.0f} ms, best of {args.runs})")
+    for us, name in top:
+        print(f"  {us / 1000:8.1f} ms  {name}")
+
+    failed = False
+    loaded = [m for m in FORBIDDEN if m in modules]
+    if loaded:
+        print(f"FAIL: eagerly imported {', '.join(loaded)}")
+        failed = True
+    if best > args.budget_ms:
+        print("FAIL: import time over budget")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
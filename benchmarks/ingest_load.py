@@ -0,0 +1,62 @@
+"""End-to-end ingestion load test through a fake Telegram source.
+
+Pushes generated bot messages through fetch -> parse -> classify -> insert -> rollup ->
+cache invalidation (fetch_and_store_messages with FakeMessageSource) and reports
+trades/sec plus time per stage. Needs Postgres (POSTGRES_* env, migrated scratch
+database) and Redis; seeded 'bench' rows are removed afterwards.
+
+    python -m benchmarks.ingest_load --messages 100000 --flood-wait-every 200
+"""
+import argparse
+import asyncio
+import sys
+import time
+
+from benchmarks import data
+from benchmarks.suite import _cleanup, _seed_catalog
+
+
+async def run(args) -> int:
+    from app.core.db import AsyncSessionLocal
+    from app.telegram.service import fetch_and_store_messages
+    from app.telegram.source import FakeMessageSource, SourceMessage
+
+    async with AsyncSessionLocal() as session:
+        await _cleanup(session)
+        catalog = await _seed_catalog(session, data.make_catalog(args.items, seed=args.seed))
+    try:
+        trades = data.make_trades(catalog, args.messages, seed=args.seed)
+        texts = data.make_messages(trades, seed=args.seed)
+        source = FakeMessageSource(
+            [SourceMessage(i, text, t.timestamp) for i, (t, text) in enumerate(zip(trades, texts), start=1)],
+            flood_wait_every=args.flood_wait_every,
+            flood_wait_seconds=args.flood_wait_seconds,
+        )
+
+        t0 = time.perf_counter()
+        stats = await fetch_and_store_messages(source)
+        elapsed = time.perf_counter() - t0
+    finally:
+        async with AsyncSessionLocal() as session:
+            await _cleanup(session)
+
+    print(f"messages {stats.messages}, saved {stats.saved}, flood waits {stats.flood_waits}, "
+          f"requests {source.requests}, unread left {await source.unread_count()}")
+    print(f"total {elapsed:.2f}s, {stats.saved / elapsed:,.0f} trades/s")
+    for name, seconds in sorted(stats.stages.items(), key=lambda kv: -kv[1]):
+        print(f"  {name:12s} {seconds:8.2f}s  {seconds / elapsed:6.1%}")
+    return 0 if stats.saved == len(trades) else 1
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=100_000)
+    parser.add_argument("--items", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--flood-wait-every", type=int, default=0, help="every N-th page request gets a FloodWait")
+    parser.add_argument("--flood-wait-seconds", type=float, default=0.1)
+    return asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,127 @@
+"""Query budget check: fails when ingestion or an API route makes more SQL queries than allowed.
+
+Runs with QUERY_BUDGET_STRICT=1: ingestion of generated messages through
+FakeMessageSource (page and flush budgets in app.telegram.service), then the read
+routes through the ASGI app (REQUEST_QUERY_BUDGET per request). Needs Postgres
+(POSTGRES_* env, migrated scratch database) and Redis; seeded 'bench' rows are
+removed afterwards. Exit code 1 on any overrun, for CI.
+
+    python -m benchmarks.query_budgets --messages 5000 --items 200
+"""
+import argparse
+import asyncio
+import os
+import sys
+from urllib.parse import urlencode
+
+from benchmarks import data
+from benchmarks.suite import BENCH_PREFIX, _cleanup, _seed_catalog
+
+os.environ["QUERY_BUDGET_STRICT"] = "1"
+
+
+def _routes(catalog: list[data.CatalogItem]) -> list[tuple[str, dict]]:
+    item_id = catalog[0].id
+    query = BENCH_PREFIX
+    return [
+        ("/items/", {}),
+        ("/items/", {"page_size": 100}),
+        ("/items/search", {"query": query}),
+        ("/items/autocomplete", {"query": query}),
+        ("/items/volatility", {"window": "24h"}),
+        ("/items/volatility", {"window": "30d"}),
+        (f"/items/{item_id}", {}),
+        ("/categories/", {}),
+        ("/prices/coin", {}),
+        ("/prices/coin/history", {"resolution": "hour", "period": 7}),
+        (f"/prices/{item_id}", {"period": 30}),
+        (f"/prices/{item_id}", {"period": "all", "max_points": 100}),
+        (f"/prices/{item_id}/candles", {"interval": "1h", "period": 7}),
+        (f"/prices/{item_id}/trades", {}),
+    ]
+
+
+async def _get(app, path: str, params: dict) -> int:
+    """GET through the ASGI app without an HTTP client; streamed bodies are consumed as well."""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "",
+        "query_string": urlencode(params).encode(), "headers": [(b"host", b"bench")],
+        "client": ("127.0.0.1", 0), "server": ("bench", 80),
+    }
+    status = None
+    sent = False
+
+    async def receive():
+        nonlocal sent
+        if sent:
+            await asyncio.Event().wait()
+        sent = True
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(scope, receive, send)
+    return status
+
+
+async def run(args) -> int:
+    from app.core.db import AsyncSessionLocal
+    from app.core.timing import QueryBudgetExceeded
+    from app.main import app
+    from app.telegram.service import fetch_and_store_messages
+    from app.telegram.source import FakeMessageSource, SourceMessage
+    from app.utils.auth import auth_or_403
+
+    failures = []
+    async with AsyncSessionLocal() as session:
+        await _cleanup(session)
+        catalog = await _seed_catalog(session, data.make_catalog(args.items, seed=args.seed))
+    try:
+        trades = data.make_trades(catalog, args.messages, seed=args.seed)
+        texts = data.make_messages(trades, seed=args.seed)
+        source = FakeMessageSource(
+            [SourceMessage(i, text, t.timestamp) for i, (t, text) in enumerate(zip(trades, texts), start=1)]
+        )
+        try:
+            stats = await fetch_and_store_messages(source)
+            print(f"ingest: {stats.messages} messages, {stats.saved} saved — ok")
+        except QueryBudgetExceeded as e:
+            failures.append(f"ingest: {e}")
+
+        # Авторизация проверяется отдельно; здесь важны запросы самих роутов
+        app.dependency_overrides[auth_or_403] = lambda: None
+        await app.router.startup()
+        try:
+            for path, params in _routes(catalog):
+                label = f"GET {path}{'?' + urlencode(params) if params else ''}"
+                try:
+                    status = await _get(app, path, params)
+                    print(f"{label} -> {status} — ok")
+                except QueryBudgetExceeded as e:
+                    failures.append(f"{label}: {e}")
+        finally:
+            app.dependency_overrides.clear()
+            await app.router.shutdown()
+    finally:
+        async with AsyncSessionLocal() as session:
+            await _cleanup(session)
+
+    for failure in failures:
+        print(f"FAIL {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=5000)
+    parser.add_argument("--items", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    return asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,287 @@
+"""Benchmark suite for the ingestion and analytics hot paths.
+
+CPU benchmarks always run. With --db the suite seeds a synthetic catalog into the
+configured Postgres (POSTGRES_* env, migrated schema), times the DB paths and removes
+its rows afterwards; with --redis it times the redis_cache round trip. Use a scratch
+database: the rollup swap runs over the whole table.
+
+Results go to benchmarks/results/<UTC time>-<commit>.json; --compare prints the
+ratio against an earlier result file.
+
+    python -m benchmarks.suite --db --redis --compare benchmarks/results/<previous>.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict, deque
+from dataclasses import replace
+from datetime import datetime, timezone
+
+from benchmarks import data
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+BENCH_PREFIX = "bench"
+
+
+def _summary(samples: list[float], ops: int) -> dict:
+    best = min(samples)
+    return {
+        "ops": ops,
+        "repeat": len(samples),
+        "best_s": best,
+        "median_s": statistics.median(samples),
+        "per_op_us": best / ops * 1e6 if ops else None,
+    }
+
+
+def timeit(fn, ops: int, repeat: int) -> dict:
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return _summary(samples, ops)
+
+
+async def atimeit(fn, ops: int, repeat: int) -> dict:
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        await fn()
+        samples.append(time.perf_counter() - t0)
+    return _summary(samples, ops)
+
+
+def _buffers(trades: list[data.Trade], size: int = 10) -> dict[int, dict[int, deque]]:
+    buffers: dict[int, dict[int, deque]] = defaultdict(lambda: defaultdict(lambda: deque(maxlen=size)))
+    for t in trades:
+        if t.enchant_level is not None and t.currency == "adena":
+            buffers[t.item.id][t.enchant_level].append(t.price)
+    return buffers
+
+
+def cpu_benchmarks(trades: list[data.Trade], messages: list[str], repeat: int) -> dict:
+    from app.db.crud.price import iqr_filter
+    from app.telegram.classifier import classify_from_history
+    from app.telegram.parser import parse_price_message
+    from app.utils.stats import grouped_iqr_stats
+
+    results = {}
+    results["parse_price_message"] = timeit(
+        lambda: [parse_price_message(m) for m in messages], len(messages), repeat
+    )
+
+    history, recent = trades[: len(trades) // 2], trades[len(trades) // 2:]
+    buffers = _buffers(history)
+    prices = [data.to_price_create(t, classified=False) for t in recent if t.item.modifications]
+    results["classify_from_history"] = timeit(
+        lambda: [classify_from_history(p, buffers[p.item.id], tolerance=p.item.tolerance) for p in prices],
+        len(prices), repeat,
+    )
+
+    # Группы как в rollup: предмет x валюта x день
+    groups: dict[tuple, list[int]] = defaultdict(list)
+    for t in trades:
+        groups[(t.item.id, t.currency, t.timestamp.date())].append(t.price)
+    group_lists = list(groups.values())
+    results["iqr_filter"] = timeit(lambda: [iqr_filter(g) for g in group_lists], len(group_lists), repeat)
+    flat = [p for g in group_lists for p in g]
+    ids = [i for i, g in enumerate(group_lists) for _ in g]
+    results["grouped_iqr_stats"] = timeit(lambda: grouped_iqr_stats(flat, ids), len(group_lists), repeat)
+    return results
+
+
+async def _seed_catalog(session, catalog: list[data.CatalogItem]) -> list[data.CatalogItem]:
+    from app.db.models import Category, Item
+
+    categories = {}
+    for name in data.CATEGORIES:
+        category = Category(name=f"{BENCH_PREFIX} {name}")
+        session.add(category)
+        categories[name] = category
+    await session.flush()
+    rows = []
+    for entry in catalog:
+        item = Item(
+            name=f"{BENCH_PREFIX} {entry.name}",
+            category_id=categories[entry.category].id,
+            tolerance=entry.tolerance,
+        )
+        item.modifications = list(entry.modifications)
+        session.add(item)
+        rows.append((entry, item))
+    await session.commit()
+    return [
+        replace(entry, id=item.id, origin_id=item.id, name=item.name, category_id=item.category_id)
+        for entry, item in rows
+    ]
+
+
+async def _cleanup(session) -> None:
+    from sqlalchemy import text
+
+    from app.db.crud.price import refresh_price_rollups
+
+    params = {"pattern": f"{BENCH_PREFIX} %"}
+    await session.execute(text(
+        "DELETE FROM price_history WHERE item_id IN (SELECT id FROM items WHERE name LIKE :pattern)"
+    ), params)
+    await session.execute(text("DELETE FROM items WHERE name LIKE :pattern"), params)
+    await session.execute(text("DELETE FROM categories WHERE name LIKE :pattern"), params)
+    await session.commit()
+    await refresh_price_rollups(session)
+
+
+async def db_benchmarks(catalog: list[data.CatalogItem], n_trades: int, seed: int, repeat: int) -> dict:
+    from app.core.db import AsyncSessionLocal
+    from app.db.crud import price as crud
+    from app.telegram.service import PARTIAL_SAVE_SIZE, classify_prices
+
+    results = {}
+    async with AsyncSessionLocal() as session:
+        await _cleanup(session)
+        await crud.ensure_price_history_partitions(session)
+        catalog = await _seed_catalog(session, catalog)
+        trades = data.make_trades(catalog, n_trades, seed=seed)
+        batches = [
+            [data.to_price_create(t) for t in trades[i:i + PARTIAL_SAVE_SIZE]]
+            for i in range(0, len(trades), PARTIAL_SAVE_SIZE)
+        ]
+        try:
+            samples = []
+            for batch in batches:
+                t0 = time.perf_counter()
+                await crud.add_prices_batch(session, batch)
+                samples.append(time.perf_counter() - t0)
+            results["add_prices_batch"] = _summary(samples, PARTIAL_SAVE_SIZE)
+
+            fresh = data.make_trades(catalog, PARTIAL_SAVE_SIZE, seed=seed + 1)
+
+            async def classify():
+                batch = [data.to_price_create(t, classified=False) for t in fresh]
+                await classify_prices(session, batch)
+
+            results["classify_prices"] = await atimeit(classify, PARTIAL_SAVE_SIZE, repeat)
+            results["refresh_price_rollups"] = await atimeit(
+                lambda: crud.refresh_price_rollups(session), 1, repeat
+            )
+
+            sample_items = [e.id for e in catalog[:20]]
+
+            async def history():
+                for item_id in sample_items:
+                    await crud.get_item_price_history(session, item_id, 30, None)
+
+            results["get_item_price_history"] = await atimeit(history, len(sample_items), repeat)
+        finally:
+            await _cleanup(session)
+    return results
+
+
+async def redis_benchmarks(repeat: int, points: int = 365) -> dict:
+    from app.core.redis import clear_cache, get_redis_client, redis_cache
+    from app.db.schemas.price import PriceHistory
+
+    rng = random.Random(0)
+    series = [
+        PriceHistory(adena_avg=rng.randrange(10**6, 10**7), adena_min=rng.randrange(10**6), adena_volume=rng.randrange(100),
+                     coin_price=25_000, timestamp=datetime(2025, 1, 1, tzinfo=timezone.utc))
+        for _ in range(points)
+    ]
+
+    @redis_cache(ttl=60, model=PriceHistory, is_list=True, prefix=f"{BENCH_PREFIX}-cache")
+    async def cached_history(key: int):
+        return series
+
+    redis = await get_redis_client()
+    keys = list(range(50))
+
+    async def miss():
+        await clear_cache(redis, prefix=f"{BENCH_PREFIX}-cache")
+        for k in keys:
+            await cached_history(k)
+
+    async def hit():
+        for k in keys:
+            await cached_history(k)
+
+    results = {"redis_cache_miss": await atimeit(miss, len(keys), repeat)}
+    results["redis_cache_hit"] = await atimeit(hit, len(keys), repeat)
+    await clear_cache(redis, prefix=f"{BENCH_PREFIX}-cache")
+    return results
+
+
+def _commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(current: dict, previous_path: str) -> None:
+    with open(previous_path, encoding="utf-8") as f:
+        previous = json.load(f)
+    print(f"\ncompared to {previous['commit']} ({previous['timestamp']}):")
+    for name, result in current["benchmarks"].items():
+        before = previous["benchmarks"].get(name)
+        if not before:
+            continue
+        ratio = result["best_s"] / before["best_s"]
+        flag = "  <-- slower" if ratio > 1.1 else ""
+        print(f"  {name:28s} x{ratio:5.2f}{flag}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--items", type=int, default=500)
+    parser.add_argument("--trades", type=int, default=20_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--db", action="store_true", help="time Postgres paths (POSTGRES_* env)")
+    parser.add_argument("--redis", action="store_true", help="time the redis_cache round trip")
+    parser.add_argument("--output", help="result file (default: benchmarks/results/<time>-<commit>.json)")
+    parser.add_argument("--compare", help="earlier result file to compare with")
+    args = parser.parse_args()
+
+    catalog = data.make_catalog(args.items, seed=args.seed)
+    trades = data.make_trades(catalog, args.trades, seed=args.seed)
+    messages = data.make_messages(trades, seed=args.seed)
+
+    benchmarks = cpu_benchmarks(trades, messages, args.repeat)
+    if args.db:
+        benchmarks.update(asyncio.run(db_benchmarks(catalog, args.trades, args.seed, args.repeat)))
+    if args.redis:
+        benchmarks.update(asyncio.run(redis_benchmarks(args.repeat)))
+
+    now = datetime.now(timezone.utc)
+    result = {
+        "commit": _commit(),
+        "timestamp": now.isoformat(),
+        "python": platform.python_version(),
+        "params": {"seed": args.seed, "items": args.items, "trades": args.trades, "repeat": args.repeat},
+        "benchmarks": benchmarks,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"{now:%Y%m%d-%H%M%S}-{result['commit']}.json")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2, ensure_ascii=False)
+
+    for name, r in benchmarks.items():
+        print(f"{name:28s} {r['best_s'] * 1000:10.2f} ms  {r['per_op_us']:10.2f} us/op  ({r['ops']} ops)")
+    print(f"saved {output}")
+    if args.compare:
+        compare(result, args.compare)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -8,7 +8,7 @@ from alembic import context
 import os
 import sys
 
-from app.core.db import DATABASE_URL
+from app.config import get_database_url
 
 sys.path.append(os.path.join(sys.path[0], 'src'))
 
@@ -23,7 +23,7 @@ config = context.config
 if config.config_file_name is not None:
     fileConfig(config.config_file_name)
 
-config.set_main_option("sqlalchemy.url", DATABASE_URL+"?async_fallback=True")
+config.set_main_option("sqlalchemy.url", get_database_url()+"?async_fallback=True")
 
 # add your model's MetaData object here
 # for 'autogenerate' support
@@ -0,0 +1,84 @@
+"""double-buffered rollups: tables X_a/X_b behind the X view instead of X_live MV
+
+Revision ID: 0a7c5e9d2b64
+Revises: f4b8d1e7c392
+Create Date: 2025-12-27 18:03:11.274519
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0a7c5e9d2b64'
+down_revision: Union[str, None] = 'f4b8d1e7c392'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# rollup -> (ключ, колонка времени)
+ROLLUPS = {
+    "daily_price_stats": ("item_id, currency, day", "day"),
+    "daily_enchant_price_stats": ("item_id, enchant_level, currency, day", "day"),
+    "hourly_price_stats": ("item_id, currency, hour", "hour"),
+}
+
+
+def _create_view(name: str, buffer: str) -> None:
+    op.execute(
+        f"""
+        CREATE OR REPLACE VIEW {name} AS
+        SELECT * FROM {name}_archive
+        UNION ALL
+        SELECT * FROM {name}_{buffer};
+        """
+    )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Определение агрегата хранится в БД: приложение пересобирает теневой буфер тем же SELECT
+    op.execute(
+        """
+        CREATE TABLE rollup_buffers (
+            name TEXT PRIMARY KEY,
+            active CHAR(1) NOT NULL CHECK (active IN ('a', 'b')),
+            definition TEXT NOT NULL,
+            built_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now()
+        );
+        """
+    )
+    conn = op.get_bind()
+    for name, (key, time_column) in ROLLUPS.items():
+        definition = conn.execute(
+            sa.text("SELECT definition FROM pg_matviews WHERE matviewname = :name"), {"name": f"{name}_live"}
+        ).scalar_one()
+        conn.execute(
+            sa.text("INSERT INTO rollup_buffers (name, active, definition) VALUES (:name, 'a', :definition)"),
+            {"name": name, "definition": definition.strip().rstrip(";")},
+        )
+        op.execute(f"CREATE TABLE {name}_a AS SELECT * FROM {name}_live;")
+        op.execute(f"ALTER TABLE {name}_a ADD PRIMARY KEY ({key});")
+        op.execute(f"CREATE INDEX ix_{name}_a_{time_column} ON {name}_a ({time_column});")
+        op.execute(f"CREATE TABLE {name}_b (LIKE {name}_a INCLUDING ALL);")
+        op.execute(f"DROP VIEW {name};")
+        op.execute(f"DROP MATERIALIZED VIEW {name}_live;")
+        _create_view(name, "a")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    conn = op.get_bind()
+    for name, (key, time_column) in ROLLUPS.items():
+        definition = conn.execute(
+            sa.text("SELECT definition FROM rollup_buffers WHERE name = :name"), {"name": name}
+        ).scalar_one()
+        op.execute(f"DROP VIEW {name};")
+        op.execute(f"DROP TABLE {name}_a;")
+        op.execute(f"DROP TABLE {name}_b;")
+        op.execute(f"CREATE MATERIALIZED VIEW {name}_live AS {definition};")
+        op.execute(f"CREATE UNIQUE INDEX idx_{name}_key ON {name}_live ({key});")
+        op.execute(f"CREATE INDEX idx_{name}_{time_column} ON {name}_live ({time_column});")
+        _create_view(name, "live")
+    op.execute("DROP TABLE rollup_buffers;")
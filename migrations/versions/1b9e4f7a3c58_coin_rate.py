@@ -0,0 +1,100 @@
+"""coin_rate: hourly and daily coin -> adena rate maintained on ingest
+
+Revision ID: 1b9e4f7a3c58
+Revises: 0a7c5e9d2b64
+Create Date: 2026-01-05 17:41:02.318446
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1b9e4f7a3c58'
+down_revision: Union[str, None] = '0a7c5e9d2b64'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COIN_ITEM_ID = 793
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Сумма и объём после IQR-фильтра: среднее = price_sum / volume; ingest пересчитывает затронутые дни
+    op.execute(
+        """
+        CREATE TABLE coin_rate (
+            resolution TEXT NOT NULL CHECK (resolution IN ('hour', 'day')),
+            bucket TIMESTAMP WITH TIME ZONE NOT NULL,
+            price_sum BIGINT NOT NULL,
+            volume INTEGER NOT NULL,
+            min_price BIGINT NOT NULL,
+            max_price BIGINT NOT NULL,
+            updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+            PRIMARY KEY (resolution, bucket)
+        );
+        """
+    )
+    op.execute("CREATE INDEX ix_coin_rate_updated_at ON coin_rate (updated_at);")
+    # IQR-правило app.utils.stats.grouped_iqr_stats, замороженное в SQL: бакеты меньше 4 цен
+    # не фильтруются; вне 1.5 IQR и дальше 3 медиан (медиана по прошедшим IQR) от медианы — выброс;
+    # если не осталось ничего, бакет берётся целиком
+    for resolution in ("hour", "day"):
+        op.execute(
+            f"""
+            WITH raw AS (
+                SELECT date_trunc('{resolution}', "timestamp" AT TIME ZONE 'UTC') AT TIME ZONE 'UTC' AS bucket,
+                       price
+                FROM price_history
+                WHERE item_id = {COIN_ITEM_ID} AND currency = 'adena'
+            ),
+            quartiles AS (
+                SELECT bucket,
+                       count(*) AS n,
+                       percentile_cont(0.25) WITHIN GROUP (ORDER BY price) AS q1,
+                       percentile_cont(0.75) WITHIN GROUP (ORDER BY price) AS q3
+                FROM raw
+                GROUP BY bucket
+            ),
+            fenced AS (
+                SELECT r.bucket, r.price, q.n,
+                       r.price BETWEEN q.q1 - 1.5 * (q.q3 - q.q1) AND q.q3 + 1.5 * (q.q3 - q.q1) AS in_fence
+                FROM raw r
+                JOIN quartiles q USING (bucket)
+            ),
+            medians AS (
+                SELECT bucket,
+                       coalesce(
+                           percentile_cont(0.5) WITHIN GROUP (ORDER BY price) FILTER (WHERE in_fence),
+                           percentile_cont(0.5) WITHIN GROUP (ORDER BY price)
+                       ) AS median
+                FROM fenced
+                GROUP BY bucket
+            ),
+            marked AS (
+                SELECT f.bucket, f.price, f.n,
+                       f.in_fence AND abs(f.price - m.median) <= 3 * m.median AS keep
+                FROM fenced f
+                JOIN medians m USING (bucket)
+            ),
+            kept AS (
+                SELECT bucket, price
+                FROM (
+                    SELECT bucket, price, n, keep, bool_or(keep) OVER (PARTITION BY bucket) AS any_kept
+                    FROM marked
+                ) t
+                WHERE n < 4 OR keep OR NOT any_kept
+            )
+            INSERT INTO coin_rate (resolution, bucket, price_sum, volume, min_price, max_price)
+            SELECT '{resolution}', bucket, sum(price), count(*), min(price), max(price)
+            FROM kept
+            GROUP BY bucket;
+            """
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TABLE coin_rate;")
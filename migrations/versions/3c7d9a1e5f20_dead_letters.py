@@ -0,0 +1,42 @@
+"""dead_letters: bot messages that failed parsing or reference unknown items
+
+Revision ID: 3c7d9a1e5f20
+Revises: 1b9e4f7a3c58
+Create Date: 2026-01-19 11:02:47.905113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c7d9a1e5f20'
+down_revision: Union[str, None] = '1b9e4f7a3c58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute(
+        """
+        CREATE TABLE dead_letters (
+            id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+            message_id BIGINT NOT NULL UNIQUE,
+            text TEXT NOT NULL,
+            reason VARCHAR(32) NOT NULL CHECK (reason IN ('parse_failed', 'unknown_item')),
+            item_name VARCHAR(200),
+            message_date TIMESTAMP WITH TIME ZONE NOT NULL,
+            attempts SMALLINT NOT NULL DEFAULT 0,
+            created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now()
+        );
+        """
+    )
+    op.execute("CREATE INDEX ix_dead_letters_reason ON dead_letters (reason);")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TABLE dead_letters;")
@@ -0,0 +1,55 @@
+"""hourly price stats MV for OHLC candles
+
+Revision ID: 5c1e8a2f4b7d
+Revises: 369dbb523c01
+Create Date: 2025-11-28 14:05:12.318207
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c1e8a2f4b7d'
+down_revision: Union[str, None] = '369dbb523c01'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute(
+        """
+        CREATE MATERIALIZED VIEW hourly_price_stats AS
+        SELECT
+            item_id,
+            currency,
+            date_trunc('hour', timestamp) AS hour,
+            (array_agg(price ORDER BY timestamp, id))[1]::bigint AS open_price,
+            MAX(price)::bigint AS high_price,
+            MIN(price)::bigint AS low_price,
+            (array_agg(price ORDER BY timestamp DESC, id DESC))[1]::bigint AS close_price,
+            COUNT(*)::int AS volume
+        FROM price_history
+        GROUP BY item_id, currency, date_trunc('hour', timestamp);
+        """
+    )
+    op.execute(
+        """
+        CREATE UNIQUE INDEX idx_hourly_price_stats_key
+        ON hourly_price_stats (item_id, currency, hour);
+        """
+    )
+    op.execute(
+        """
+        CREATE INDEX idx_hourly_price_stats_hour
+        ON hourly_price_stats (hour);
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP MATERIALIZED VIEW IF EXISTS hourly_price_stats;")
@@ -0,0 +1,85 @@
+"""per enchant level daily price stats MV
+
+Revision ID: 8e4b2d6a9f13
+Revises: 5c1e8a2f4b7d
+Create Date: 2025-12-02 19:47:31.902114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8e4b2d6a9f13'
+down_revision: Union[str, None] = '5c1e8a2f4b7d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Та же IQR-фильтрация, что и в daily_price_stats, но с ключом enchant_level
+    op.execute(
+        """
+        CREATE MATERIALIZED VIEW daily_enchant_price_stats AS
+        WITH raw AS (
+            SELECT
+                item_id,
+                currency,
+                enchant_level,
+                price,
+                date_trunc('day', timestamp) AS day
+            FROM price_history
+            WHERE enchant_level IS NOT NULL
+              AND price > 10
+        ),
+
+        stats AS (
+            SELECT
+                item_id,
+                currency,
+                enchant_level,
+                day,
+                (percentile_cont(0.25) WITHIN GROUP (ORDER BY price)) AS q1,
+                (percentile_cont(0.75) WITHIN GROUP (ORDER BY price)) AS q3
+            FROM raw
+            GROUP BY item_id, currency, enchant_level, day
+        ),
+
+        filtered AS (
+            SELECT r.*
+            FROM raw r
+            JOIN stats s
+                ON r.item_id = s.item_id
+               AND r.currency = s.currency
+               AND r.enchant_level = s.enchant_level
+               AND r.day = s.day
+            WHERE r.price <= s.q3 + 1.5 * (s.q3 - s.q1)
+        )
+
+        SELECT
+            item_id,
+            currency,
+            enchant_level,
+            day,
+            COUNT(*)::int AS volume,
+            AVG(price)::bigint AS avg_price,
+            MIN(price)::bigint AS min_price,
+            MAX(price)::bigint AS max_price
+        FROM filtered
+        GROUP BY item_id, currency, enchant_level, day;
+        """
+    )
+    op.execute(
+        """
+        CREATE UNIQUE INDEX idx_daily_enchant_price_stats_key
+        ON daily_enchant_price_stats (item_id, enchant_level, currency, day);
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP MATERIALIZED VIEW IF EXISTS daily_enchant_price_stats;")
@@ -0,0 +1,191 @@
+"""monthly range partitioning of price_history
+
+Revision ID: c3a9f0d2e6b8
+Revises: 8e4b2d6a9f13
+Create Date: 2025-12-09 21:12:40.551093
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3a9f0d2e6b8'
+down_revision: Union[str, None] = '8e4b2d6a9f13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ROLLUP_VIEWS = ("daily_price_stats", "daily_enchant_price_stats", "hourly_price_stats")
+MONTHS_AHEAD = 3
+
+
+def _drop_rollups() -> list[tuple[str, str, list[str]]]:
+    # MV ссылаются на price_history по OID: сохраняем определения и пересоздаём после замены таблицы
+    conn = op.get_bind()
+    saved = []
+    for name in ROLLUP_VIEWS:
+        definition = conn.execute(
+            sa.text("SELECT definition FROM pg_matviews WHERE matviewname = :name"), {"name": name}
+        ).scalar()
+        if definition is None:
+            continue
+        indexes = conn.execute(
+            sa.text("SELECT indexdef FROM pg_indexes WHERE tablename = :name"), {"name": name}
+        ).scalars().all()
+        saved.append((name, definition, list(indexes)))
+        op.execute(f"DROP MATERIALIZED VIEW {name};")
+    return saved
+
+
+def _restore_rollups(saved: list[tuple[str, str, list[str]]]) -> None:
+    for name, definition, indexes in saved:
+        op.execute(f"CREATE MATERIALIZED VIEW {name} AS {definition}")
+        for indexdef in indexes:
+            op.execute(indexdef)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    saved = _drop_rollups()
+
+    op.execute("ALTER TABLE price_history RENAME TO price_history_old;")
+    op.execute("ALTER TABLE price_history_old RENAME CONSTRAINT price_history_pkey TO price_history_old_pkey;")
+    op.execute("DROP INDEX IF EXISTS ix_price_history_timestamp;")
+    op.execute("DROP INDEX IF EXISTS ix_price_history_item_ts;")
+    op.execute("DROP INDEX IF EXISTS ix_price_history_item_id;")
+
+    op.execute("CREATE SEQUENCE price_history_part_id_seq AS BIGINT;")
+    op.execute(
+        """
+        CREATE TABLE price_history (
+            LIKE price_history_old INCLUDING DEFAULTS
+        ) PARTITION BY RANGE ("timestamp");
+        """
+    )
+    op.execute("ALTER TABLE price_history ALTER COLUMN id SET DEFAULT nextval('price_history_part_id_seq');")
+    op.execute("ALTER TABLE price_history ALTER COLUMN \"timestamp\" SET NOT NULL;")
+    op.execute("ALTER TABLE price_history ADD CONSTRAINT price_history_pkey PRIMARY KEY (id, \"timestamp\");")
+    op.execute(
+        """
+        ALTER TABLE price_history
+            ADD CONSTRAINT price_history_item_id_fkey
+            FOREIGN KEY (item_id) REFERENCES items(id);
+        """
+    )
+
+    # Партиции по месяцам (UTC); строки вне диапазонов попадают в default
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION create_price_history_partition(month_start date)
+        RETURNS text AS $$
+        DECLARE
+            part_start date := date_trunc('month', month_start)::date;
+            part_name text := 'price_history_' || to_char(part_start, '"y"YYYY"m"MM');
+        BEGIN
+            IF to_regclass(part_name) IS NULL THEN
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF price_history FOR VALUES FROM (%L) TO (%L)',
+                    part_name,
+                    part_start::timestamp AT TIME ZONE 'UTC',
+                    (part_start + interval '1 month')::timestamp AT TIME ZONE 'UTC'
+                );
+            END IF;
+            RETURN part_name;
+        END
+        $$ LANGUAGE plpgsql;
+        """
+    )
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION ensure_price_history_partitions(months_ahead int)
+        RETURNS void AS $$
+        BEGIN
+            PERFORM create_price_history_partition(m::date)
+            FROM generate_series(
+                date_trunc('month', now() AT TIME ZONE 'UTC'),
+                date_trunc('month', now() AT TIME ZONE 'UTC') + make_interval(months => months_ahead),
+                interval '1 month'
+            ) AS m;
+        END
+        $$ LANGUAGE plpgsql;
+        """
+    )
+    op.execute("CREATE TABLE price_history_default PARTITION OF price_history DEFAULT;")
+    op.execute(
+        """
+        SELECT create_price_history_partition(m::date)
+        FROM generate_series(
+            date_trunc('month', (SELECT coalesce(min("timestamp"), now()) FROM price_history_old) AT TIME ZONE 'UTC'),
+            date_trunc('month', now() AT TIME ZONE 'UTC'),
+            interval '1 month'
+        ) AS m;
+        """
+    )
+    op.execute(f"SELECT ensure_price_history_partitions({MONTHS_AHEAD});")
+
+    op.execute("INSERT INTO price_history SELECT * FROM price_history_old;")
+    op.execute("SELECT setval('price_history_part_id_seq', coalesce((SELECT max(id) FROM price_history), 0) + 1, false);")
+
+    op.execute('CREATE INDEX ix_price_history_timestamp ON price_history ("timestamp");')
+    op.execute('CREATE INDEX ix_price_history_item_ts ON price_history (item_id, "timestamp");')
+
+    op.execute("DROP TABLE price_history_old;")
+    op.execute("ALTER SEQUENCE price_history_part_id_seq RENAME TO price_history_id_seq;")
+    op.execute("ALTER SEQUENCE price_history_id_seq OWNED BY price_history.id;")
+    op.execute("ALTER TABLE price_history ALTER COLUMN id SET DEFAULT nextval('price_history_id_seq');")
+
+    _restore_rollups(saved)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    saved = _drop_rollups()
+
+    op.execute("ALTER TABLE price_history RENAME TO price_history_part;")
+    op.execute("ALTER TABLE price_history_part RENAME CONSTRAINT price_history_pkey TO price_history_part_pkey;")
+    op.execute("DROP INDEX IF EXISTS ix_price_history_timestamp;")
+    op.execute("DROP INDEX IF EXISTS ix_price_history_item_ts;")
+
+    op.execute(
+        """
+        CREATE TABLE price_history (
+            id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+            item_id BIGINT NOT NULL,
+            price BIGINT NOT NULL,
+            enchant_level TEXT,
+            currency TEXT NOT NULL,
+            source TEXT,
+            "timestamp" TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now()
+        );
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO price_history (id, item_id, price, enchant_level, currency, source, "timestamp")
+        SELECT id, item_id, price, enchant_level, currency, source, "timestamp" FROM price_history_part;
+        """
+    )
+    op.execute(
+        """
+        SELECT setval(pg_get_serial_sequence('price_history', 'id'),
+                      coalesce((SELECT max(id) FROM price_history), 0) + 1, false);
+        """
+    )
+    op.execute(
+        """
+        ALTER TABLE price_history
+            ADD CONSTRAINT price_history_item_id_fkey
+            FOREIGN KEY (item_id) REFERENCES items(id);
+        """
+    )
+    op.execute("CREATE INDEX ix_price_history_item_id ON price_history (item_id);")
+    op.execute('CREATE INDEX ix_price_history_item_ts ON price_history (item_id, "timestamp");')
+    op.execute('CREATE INDEX ix_price_history_timestamp ON price_history ("timestamp");')
+
+    op.execute("DROP TABLE price_history_part CASCADE;")
+    op.execute("DROP FUNCTION IF EXISTS ensure_price_history_partitions(int);")
+    op.execute("DROP FUNCTION IF EXISTS create_price_history_partition(date);")
+
+    _restore_rollups(saved)
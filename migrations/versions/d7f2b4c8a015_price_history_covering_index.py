@@ -0,0 +1,35 @@
+"""covering index for classification and latest-price lookups
+
+Revision ID: d7f2b4c8a015
+Revises: c3a9f0d2e6b8
+Create Date: 2025-12-11 16:31:08.774520
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7f2b4c8a015'
+down_revision: Union[str, None] = 'c3a9f0d2e6b8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Top-N по (item_id, currency, enchant_level) читается только из индекса
+    op.execute(
+        """
+        CREATE INDEX IF NOT EXISTS ix_price_history_item_cur_ench_ts
+        ON price_history (item_id, currency, enchant_level, "timestamp" DESC)
+        INCLUDE (price);
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP INDEX IF EXISTS ix_price_history_item_cur_ench_ts;")
@@ -0,0 +1,183 @@
+"""compact currency/source/enchant_level encoding in price_history
+
+Revision ID: e1a6c9d3f207
+Revises: d7f2b4c8a015
+Create Date: 2025-12-16 20:54:17.093385
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e1a6c9d3f207'
+down_revision: Union[str, None] = 'd7f2b4c8a015'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ROLLUP_VIEWS = ("daily_price_stats", "daily_enchant_price_stats", "hourly_price_stats")
+BATCH_SIZE = 50_000
+
+CURRENCIES = ("adena", "coin", "unknown")
+SOURCES = ("auction_house", "world_trade", "private_store", "private_trade", "unknown")
+
+# Должно совпадать с app.db.types.encode_enchant_level
+ENCHANT_CODE_SQL = """
+    CASE
+        WHEN enchant_level IS NULL OR enchant_level IN ('', 'None') THEN NULL
+        WHEN enchant_level = 'Сет' THEN -1
+        WHEN enchant_level ~ '^[0-9]{1,2}$' THEN enchant_level::smallint
+        WHEN enchant_level ~ '^[0-9]{1,2}-[0-9]{1,2}$'
+            THEN (100 * (split_part(enchant_level, '-', 1)::int + 1) + split_part(enchant_level, '-', 2)::int)::smallint
+    END
+"""
+ENCHANT_LABEL_SQL = """
+    CASE
+        WHEN enchant_level IS NULL THEN NULL
+        WHEN enchant_level = -1 THEN 'Сет'
+        WHEN enchant_level < 100 THEN enchant_level::text
+        ELSE (enchant_level / 100 - 1)::text || '-' || (enchant_level % 100)::text
+    END
+"""
+
+
+def _enum_sql(column: str, values: tuple[str, ...], type_name: str) -> str:
+    listed = ", ".join(f"'{v}'" for v in values)
+    return f"CASE WHEN {column} IN ({listed}) THEN {column} ELSE 'unknown' END::{type_name}"
+
+
+def _drop_rollups() -> list[tuple[str, str, list[str]]]:
+    conn = op.get_bind()
+    saved = []
+    for name in ROLLUP_VIEWS:
+        definition = conn.execute(
+            sa.text("SELECT definition FROM pg_matviews WHERE matviewname = :name"), {"name": name}
+        ).scalar()
+        if definition is None:
+            continue
+        indexes = conn.execute(
+            sa.text("SELECT indexdef FROM pg_indexes WHERE tablename = :name"), {"name": name}
+        ).scalars().all()
+        saved.append((name, definition, list(indexes)))
+        op.execute(f"DROP MATERIALIZED VIEW {name};")
+    return saved
+
+
+def _restore_rollups(saved: list[tuple[str, str, list[str]]]) -> None:
+    for name, definition, indexes in saved:
+        op.execute(f"CREATE MATERIALIZED VIEW {name} AS {definition}")
+        for indexdef in indexes:
+            op.execute(indexdef)
+
+
+def _rewrite_partitions() -> None:
+    # DROP COLUMN не уменьшает строки: переписываем партиции по одной, блокируя каждую ненадолго
+    conn = op.get_bind()
+    partitions = conn.execute(sa.text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = 'price_history'::regclass ORDER BY c.relname"
+    )).scalars().all()
+    with op.get_context().autocommit_block():
+        for name in partitions:
+            op.execute(f"VACUUM (FULL, ANALYZE) {name};")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute(f"CREATE TYPE price_currency AS ENUM ({', '.join(repr(v) for v in CURRENCIES)});")
+    op.execute(f"CREATE TYPE price_source AS ENUM ({', '.join(repr(v) for v in SOURCES)});")
+    op.execute(
+        """
+        ALTER TABLE price_history
+            ADD COLUMN currency_enc price_currency,
+            ADD COLUMN source_enc price_source,
+            ADD COLUMN enchant_level_enc smallint;
+        """
+    )
+
+    conn = op.get_bind()
+    min_id, max_id = conn.execute(sa.text("SELECT min(id), max(id) FROM price_history")).one()
+    backfill = f"""
+        UPDATE price_history SET
+            currency_enc = {_enum_sql('currency', CURRENCIES, 'price_currency')},
+            source_enc = {_enum_sql('source', SOURCES, 'price_source')},
+            enchant_level_enc = {ENCHANT_CODE_SQL}
+    """
+    if min_id is not None:
+        # Пакетами по id с коммитом после каждого: без долгих блокировок и огромной транзакции
+        with op.get_context().autocommit_block():
+            for lo in range(min_id, max_id + 1, BATCH_SIZE):
+                op.execute(f"{backfill} WHERE id >= {lo} AND id < {lo + BATCH_SIZE};")
+    # Строки, вставленные во время пакетной миграции; дальше вставки ждут конца миграции
+    op.execute("LOCK TABLE price_history IN EXCLUSIVE MODE;")
+    op.execute(f"{backfill} WHERE id > {max_id or 0} OR currency_enc IS NULL;")
+
+    saved = _drop_rollups()
+    op.execute(
+        """
+        ALTER TABLE price_history
+            DROP COLUMN currency,
+            DROP COLUMN source,
+            DROP COLUMN enchant_level;
+        """
+    )
+    op.execute("ALTER TABLE price_history RENAME COLUMN currency_enc TO currency;")
+    op.execute("ALTER TABLE price_history RENAME COLUMN source_enc TO source;")
+    op.execute("ALTER TABLE price_history RENAME COLUMN enchant_level_enc TO enchant_level;")
+    op.execute("ALTER TABLE price_history ALTER COLUMN currency SET NOT NULL;")
+    op.execute("ALTER TABLE price_history ALTER COLUMN currency SET DEFAULT 'adena';")
+    op.execute("ALTER TABLE price_history ALTER COLUMN source SET DEFAULT 'auction_house';")
+    op.execute(
+        """
+        CREATE INDEX ix_price_history_item_cur_ench_ts
+        ON price_history (item_id, currency, enchant_level, "timestamp" DESC)
+        INCLUDE (price);
+        """
+    )
+    _restore_rollups(saved)
+    _rewrite_partitions()
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute(
+        """
+        ALTER TABLE price_history
+            ADD COLUMN currency_txt text,
+            ADD COLUMN source_txt text,
+            ADD COLUMN enchant_level_txt text;
+        """
+    )
+    op.execute(
+        f"""
+        UPDATE price_history SET
+            currency_txt = currency::text,
+            source_txt = source::text,
+            enchant_level_txt = {ENCHANT_LABEL_SQL};
+        """
+    )
+    saved = _drop_rollups()
+    op.execute(
+        """
+        ALTER TABLE price_history
+            DROP COLUMN currency,
+            DROP COLUMN source,
+            DROP COLUMN enchant_level;
+        """
+    )
+    op.execute("ALTER TABLE price_history RENAME COLUMN currency_txt TO currency;")
+    op.execute("ALTER TABLE price_history RENAME COLUMN source_txt TO source;")
+    op.execute("ALTER TABLE price_history RENAME COLUMN enchant_level_txt TO enchant_level;")
+    op.execute("ALTER TABLE price_history ALTER COLUMN currency SET NOT NULL;")
+    op.execute(
+        """
+        CREATE INDEX ix_price_history_item_cur_ench_ts
+        ON price_history (item_id, currency, enchant_level, "timestamp" DESC)
+        INCLUDE (price);
+        """
+    )
+    _restore_rollups(saved)
+    op.execute("DROP TYPE price_source;")
+    op.execute("DROP TYPE price_currency;")
@@ -0,0 +1,51 @@
+"""rollup archive tables: rollups survive archiving of raw price_history
+
+Revision ID: f4b8d1e7c392
+Revises: e1a6c9d3f207
+Create Date: 2025-12-22 13:26:45.610937
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f4b8d1e7c392'
+down_revision: Union[str, None] = 'e1a6c9d3f207'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# rollup -> ключ
+ROLLUPS = {
+    "daily_price_stats": "item_id, currency, day",
+    "daily_enchant_price_stats": "item_id, enchant_level, currency, day",
+    "hourly_price_stats": "item_id, currency, hour",
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # MV с сырыми данными становится X_live, архивированные месяцы лежат в X_archive,
+    # а читатели обращаются к представлению X = X_archive UNION ALL X_live
+    for name, key in ROLLUPS.items():
+        op.execute(f"ALTER MATERIALIZED VIEW {name} RENAME TO {name}_live;")
+        op.execute(f"CREATE TABLE {name}_archive AS SELECT * FROM {name}_live WITH NO DATA;")
+        op.execute(f"ALTER TABLE {name}_archive ADD PRIMARY KEY ({key});")
+        op.execute(
+            f"""
+            CREATE VIEW {name} AS
+            SELECT * FROM {name}_archive
+            UNION ALL
+            SELECT * FROM {name}_live;
+            """
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name in ROLLUPS:
+        op.execute(f"DROP VIEW {name};")
+        op.execute(f"DROP TABLE {name}_archive;")
+        op.execute(f"ALTER MATERIALIZED VIEW {name}_live RENAME TO {name};")